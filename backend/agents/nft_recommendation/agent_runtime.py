@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from langchain_core.tools import Tool
+from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import create_react_agent
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from backend.llm_analyzer.llm_providers import DEFAULT_MAX_RETRIES, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT
+
+DEFAULT_AGENT_MODEL = "gpt-4"
+
+_llms: Dict[str, ChatOpenAI] = {}
+_agents: Dict[str, tuple] = {}  # agent name -> (graph, checkpointer)
+_lock = threading.RLock()
+
+
+def get_llm(model: Optional[str] = None) -> ChatOpenAI:
+    """
+    Get the process-wide chat model for a model name. Every agent using the model shares its
+    connection pools (one sync, one async), sized by LLM_POOL_SIZE like the analyzer's providers.
+
+    Args:
+        model (Optional[str]): Model name. If None, uses AGENT_MODEL or gpt-4
+
+    Returns:
+        ChatOpenAI: The shared chat model
+    """
+    model = model or os.getenv('AGENT_MODEL', DEFAULT_AGENT_MODEL)
+    with _lock:
+        if model not in _llms:
+            timeout = float(os.getenv('LLM_TIMEOUT') or DEFAULT_TIMEOUT)
+            pool_size = int(os.getenv('LLM_POOL_SIZE') or DEFAULT_POOL_SIZE)
+            limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            _llms[model] = ChatOpenAI(
+                model=model,
+                timeout=timeout,
+                max_retries=int(os.getenv('LLM_MAX_RETRIES') or DEFAULT_MAX_RETRIES),
+                http_client=httpx.Client(limits=limits, timeout=timeout),
+                http_async_client=httpx.AsyncClient(limits=limits, timeout=timeout)
+            )
+        return _llms[model]
+
+
+def get_agent(name: str, prompt: str, tools_factory: Optional[Callable[[], List[Tool]]] = None,
+              model: Optional[str] = None):
+    """
+    Get the process-wide react agent with a given name, building its graph on first use.
+
+    The graph is stateless between calls: conversations are kept apart by the thread ID in the
+    config (see agent_session), so one graph serves every user concurrently.
+
+    Args:
+        name (str): Name of the agent
+        prompt (str): System prompt of the agent
+        tools_factory (Optional[Callable[[], List[Tool]]]): Creates the agent's tools (called once)
+        model (Optional[str]): Model name. If None, uses AGENT_MODEL or gpt-4
+
+    Returns:
+        CompiledGraph: The shared agent graph
+    """
+    if name not in _agents:
+        with _lock:
+            if name not in _agents:
+                tools = tools_factory() if tools_factory else []
+                llm = get_llm(model)
+                checkpointer = MemorySaver()
+                graph = create_react_agent(llm, tools=tools, checkpointer=checkpointer, state_modifier=prompt)
+                _agents[name] = (graph, checkpointer)
+    return _agents[name][0]
+
+
+def session_config(name: str, session_id: str) -> Dict:
+    """Config that keys an agent's conversation memory by session."""
+    return {"configurable": {"thread_id": f"{name}:{session_id}"}}
+
+
+def end_session(name: str, session_id: str):
+    """Drop the conversation memory of a session."""
+    if name not in _agents:
+        return
+    checkpointer = _agents[name][1]
+    # Older checkpointers can't delete threads; their memory lives as long as the process
+    if hasattr(checkpointer, 'delete_thread'):
+        checkpointer.delete_thread(session_config(name, session_id)["configurable"]["thread_id"])
+
+
+@contextmanager
+def agent_session(name: str, session_id: Optional[str] = None):
+    """
+    Config for one conversation with an agent.
+
+    Args:
+        name (str): Name of the agent
+        session_id (Optional[str]): ID of the user's session, so follow-up calls share memory.
+            If None, the conversation is one-off and its memory is dropped on exit
+
+    Yields:
+        Dict: The config to pass to the agent's invoke/stream
+    """
+    one_off = session_id is None
+    session_id = session_id or uuid.uuid4().hex
+    try:
+        yield session_config(name, session_id)
+    finally:
+        if one_off:
+            end_session(name, session_id)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark the CLIP variants used by VisualImpactAnalyzer (fp32, int8 and onnx) on CPU.
+
+For each variant this reports the load time, the image embedding latency per batch and
+throughput, and its accuracy against fp32: the cosine similarity of the embeddings and
+the difference in impact scores.
+
+Usage:
+    python benchmark_clip.py [image_dir] [--count N] [--batch-size N] [--variants fp32,int8,onnx]
+
+Without an image directory, random images are used (fine for latency, less meaningful for accuracy).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from backend.agents.nft_recommendation.clip_model import VARIANTS, get_clip
+from backend.agents.nft_recommendation.embedding_cache import make_thumbnail
+
+# Same prompts as VisualImpactAnalyzer
+ATTRIBUTES = [
+    "high quality", "professional", "stunning", "eye-catching",
+    "dramatic", "vibrant", "well-composed", "visually striking",
+    "artistic", "creative", "unique", "memorable"
+]
+
+
+def load_images(image_dir, count):
+    """Load up to `count` images from a directory, or generate random ones."""
+    if image_dir:
+        names = sorted(n for n in os.listdir(image_dir) if n.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')))
+        images = [make_thumbnail(Image.open(os.path.join(image_dir, name))) for name in names[:count]]
+        if images:
+            return images
+        print(f"No images found in {image_dir}, using random images")
+
+    rng = np.random.default_rng(0)
+    return [Image.fromarray(rng.integers(0, 256, (256, 256, 3), dtype=np.uint8)) for _ in range(count)]
+
+
+def benchmark_variant(variant, images, batch_size):
+    """Embed and score the images with one variant, returning timings, embeddings and scores."""
+    start_time = time.time()
+    model, processor = get_clip(variant)
+    load_time = time.time() - start_time
+
+    with torch.no_grad():
+        text_inputs = processor(text=ATTRIBUTES, return_tensors="pt", padding=True)
+        text_embeddings = torch.nn.functional.normalize(model.get_text_features(**text_inputs), dim=-1)
+
+        # Warm up, so one-time initialization doesn't count towards the latency
+        model.get_image_features(**processor(images=images[:1], return_tensors="pt"))
+
+        batch_times = []
+        embeddings = []
+        for start in range(0, len(images), batch_size):
+            inputs = processor(images=images[start:start + batch_size], return_tensors="pt")
+            batch_start = time.perf_counter()
+            features = model.get_image_features(**inputs)
+            batch_times.append(time.perf_counter() - batch_start)
+            embeddings.append(torch.nn.functional.normalize(features, dim=-1))
+
+    embeddings = torch.cat(embeddings)
+    scores = ((embeddings @ text_embeddings.T).mean(dim=1) * 100).clamp(0, 100)
+    return {
+        "load_time": load_time,
+        "batch_times": batch_times,
+        "embeddings": embeddings,
+        "scores": scores,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CLIP variants on CPU")
+    parser.add_argument("image_dir", nargs="?", help="Directory of images to embed")
+    parser.add_argument("--count", type=int, default=64, help="Number of images")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per forward pass")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="Comma-separated variants to compare")
+    args = parser.parse_args()
+
+    images = load_images(args.image_dir, args.count)
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    print(f"Benchmarking {', '.join(variants)} on {len(images)} images (batch size {args.batch_size}, "
+          f"{torch.get_num_threads()} threads)")
+
+    results = {}
+    for variant in variants:
+        try:
+            results[variant] = benchmark_variant(variant, images, args.batch_size)
+        except ImportError as e:
+            print(f"Skipping {variant}: {str(e)}")
+
+    # fp32 is the reference for accuracy
+    reference = results.get("fp32") or benchmark_variant("fp32", images, args.batch_size)
+
+    print(f"\n{'variant':<8} {'load s':>8} {'ms/batch':>10} {'img/s':>8} {'cos vs fp32':>12} {'max |score diff|':>17}")
+    for variant, result in results.items():
+        batch_ms = 1000 * float(np.median(result["batch_times"]))
+        throughput = len(images) / sum(result["batch_times"])
+        cosine = float((result["embeddings"] * reference["embeddings"]).sum(dim=1).mean())
+        score_diff = float((result["scores"] - reference["scores"]).abs().max())
+        print(f"{variant:<8} {result['load_time']:>8.2f} {batch_ms:>10.1f} {throughput:>8.1f} {cosine:>12.4f} {score_diff:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import torch
+from transformers import CLIPModel, CLIPProcessor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from backend.agents.nft_recommendation.embedding_cache import DEFAULT_CACHE_DIR
+
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+
+# "fp32" (default), "int8" (dynamically quantized Linear layers) or "onnx" (ONNX Runtime on CPU)
+DEFAULT_VARIANT = "fp32"
+VARIANTS = ("fp32", "int8", "onnx")
+
+_models: Dict[str, Tuple[object, CLIPProcessor]] = {}
+_models_lock = threading.Lock()
+
+
+def get_onnx_dir() -> str:
+    """Directory of the exported ONNX graphs: onnx/ in the embedding cache directory (NFT_CACHE_DIR or its default)."""
+    return os.path.join(os.getenv('NFT_CACHE_DIR', DEFAULT_CACHE_DIR), 'onnx')
+
+
+class _ImageTower(torch.nn.Module):
+    def __init__(self, model: CLIPModel):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model.get_image_features(pixel_values=pixel_values)
+
+
+class _TextTower(torch.nn.Module):
+    def __init__(self, model: CLIPModel):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+
+
+class ONNXCLIPModel:
+    """
+    CLIP image and text towers running on ONNX Runtime. Exposes the same get_image_features and
+    get_text_features methods as CLIPModel, so it can be used in its place for scoring.
+    """
+
+    def __init__(self, model: CLIPModel, onnx_dir: Optional[str] = None):
+        import onnxruntime
+
+        onnx_dir = onnx_dir or get_onnx_dir()
+        os.makedirs(onnx_dir, exist_ok=True)
+        image_path = os.path.join(onnx_dir, 'clip_image.onnx')
+        text_path = os.path.join(onnx_dir, 'clip_text.onnx')
+
+        # Export once; later loads reuse the exported graphs
+        if not os.path.exists(image_path):
+            print(f"Exporting CLIP image tower to {image_path}...")
+            torch.onnx.export(
+                _ImageTower(model), (torch.zeros(1, 3, 224, 224),), image_path,
+                input_names=["pixel_values"], output_names=["image_embeds"],
+                dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+                opset_version=14
+            )
+        if not os.path.exists(text_path):
+            print(f"Exporting CLIP text tower to {text_path}...")
+            dummy = torch.ones(1, 8, dtype=torch.long)
+            torch.onnx.export(
+                _TextTower(model), (dummy, dummy), text_path,
+                input_names=["input_ids", "attention_mask"], output_names=["text_embeds"],
+                dynamic_axes={"input_ids": {0: "batch", 1: "sequence"}, "attention_mask": {0: "batch", 1: "sequence"},
+                              "text_embeds": {0: "batch"}},
+                opset_version=14
+            )
+
+        providers = ["CPUExecutionProvider"]
+        self.image_session = onnxruntime.InferenceSession(image_path, providers=providers)
+        self.text_session = onnxruntime.InferenceSession(text_path, providers=providers)
+
+    def eval(self):
+        return self
+
+    def get_image_features(self, pixel_values: torch.Tensor, **kwargs) -> torch.Tensor:
+        (image_embeds,) = self.image_session.run(None, {"pixel_values": pixel_values.numpy()})
+        return torch.from_numpy(image_embeds)
+
+    def get_text_features(self, input_ids: torch.Tensor, attention_mask: torch.Tensor, **kwargs) -> torch.Tensor:
+        (text_embeds,) = self.text_session.run(None, {
+            "input_ids": input_ids.numpy().astype("int64"),
+            "attention_mask": attention_mask.numpy().astype("int64")
+        })
+        return torch.from_numpy(text_embeds)
+
+
+def _load(variant: str):
+    start_time = time.time()
+    model = CLIPModel.from_pretrained(CLIP_MODEL_NAME)
+    model.eval()
+    processor = CLIPProcessor.from_pretrained(CLIP_MODEL_NAME)
+
+    if variant == "int8":
+        # Linear layers dominate CLIP's CPU time, and int8 weights make them faster and smaller
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif variant == "onnx":
+        try:
+            model = ONNXCLIPModel(model)
+        except ImportError as e:
+            # Rather than quietly serving (or benchmarking) fp32 under the onnx name
+            raise ImportError("The onnx CLIP variant needs onnxruntime. Please install it or use another variant.") from e
+
+    print(f"Loaded {variant} CLIP model in {time.time() - start_time:.2f} seconds")
+    return model, processor
+
+
+def get_clip(variant: str = None):
+    """
+    Get the process-wide CLIP model and processor, loading them on first use.
+
+    Args:
+        variant (str): "fp32", "int8" or "onnx". If None, uses CLIP_VARIANT or fp32
+
+    Returns:
+        Tuple: (model, processor). The model has get_image_features and get_text_features
+
+    Raises:
+        ImportError: If the variant is "onnx" and onnxruntime isn't installed
+    """
+    variant = (variant or os.getenv('CLIP_VARIANT', DEFAULT_VARIANT)).lower()
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown CLIP variant {variant}. Please use one of: {', '.join(VARIANTS)}.")
+
+    if variant not in _models:
+        with _models_lock:
+            if variant not in _models:
+                _models[variant] = _load(variant)
+    return _models[variant]
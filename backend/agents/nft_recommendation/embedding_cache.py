@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.nft_cache')
+
+# CLIP resizes the shortest side to 224 pixels, so larger thumbnails carry no extra information
+THUMBNAIL_SIZE = 224
+
+INITIAL_CAPACITY = 1024
+
+# The index log is folded into the JSON index once it has at least this many entries and at least as
+# many as the index, so rewriting the index costs amortized O(1) per embedding
+MIN_LOG_ENTRIES_TO_COMPACT = 1024
+
+
+def make_thumbnail(image: Image.Image, size: int = THUMBNAIL_SIZE) -> Image.Image:
+    """Convert an image to RGB and shrink it so its shortest side is `size` pixels."""
+    image = image.convert("RGB")
+    scale = size / min(image.size)
+    if scale < 1:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.BICUBIC)
+    return image
+
+
+class EmbeddingCache:
+    """
+    Two-level cache of NFT images keyed by IPFS CID (content at a CID never changes, so entries never expire):
+
+    - decoded thumbnails, stored on disk as uint8 pixel arrays (no network and no image decoding on a hit)
+    - CLIP image embeddings, stored as rows of a memory-mapped float32 matrix with a JSON index
+      mapping each CID to its row (no network and no model on a hit). New rows are recorded in an
+      append-only log (one JSON-encoded CID per line, in row order) that is periodically compacted
+      into the index, so storing a batch never rewrites the whole index
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, dim: int = 512, name: str = 'embeddings'):
+        """
+        Initialize the cache, loading the existing index if there is one.
+
+        Args:
+            cache_dir (Optional[str]): Cache directory. If None, uses NFT_CACHE_DIR or the default
+            dim (int): Dimension of the embeddings
+            name (str): Name of the embedding store, so models with different outputs don't share one
+        """
+        self.cache_dir = cache_dir or os.getenv('NFT_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.thumbnail_dir = os.path.join(self.cache_dir, 'thumbnails')
+        self.embeddings_path = os.path.join(self.cache_dir, f'{name}.f32')
+        self.index_path = os.path.join(self.cache_dir, f'{name}_index.json')
+        self.log_path = os.path.join(self.cache_dir, f'{name}_index.log')
+        os.makedirs(self.thumbnail_dir, exist_ok=True)
+
+        self.dim = dim
+        self.rows: Dict[str, int] = {}
+        self._log_entries = 0
+        self._lock = threading.Lock()
+
+        loaded = False
+        if os.path.exists(self.index_path) and os.path.exists(self.embeddings_path):
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            if index.get('dim') == dim:
+                self.rows = index.get('rows', {})
+                self._read_log()
+                loaded = True
+            else:
+                print(f"Warning: Cached embeddings have dimension {index.get('dim')}, expected {dim}. Rebuilding the cache.")
+        if not loaded:
+            # Start from an empty index, dropping the log of any previous one
+            self._compact()
+        self._cids: List[str] = sorted(self.rows, key=self.rows.get)  # CID of each row, in row order
+
+        capacity = max(INITIAL_CAPACITY, len(self.rows))
+        if loaded:
+            capacity = max(capacity, os.path.getsize(self.embeddings_path) // (4 * dim))
+        self._embeddings = self._open(capacity, keep_existing=loaded)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, cid: str) -> bool:
+        return cid in self.rows
+
+    def _open(self, capacity: int, keep_existing: bool) -> np.memmap:
+        """Open the embeddings file with room for `capacity` rows, growing it if needed."""
+        size = capacity * self.dim * 4
+        mode = 'r+' if keep_existing else 'w+'
+        if keep_existing and os.path.getsize(self.embeddings_path) < size:
+            with open(self.embeddings_path, 'r+b') as f:
+                f.truncate(size)
+        return np.memmap(self.embeddings_path, dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+
+    def _read_log(self):
+        """Add the rows recorded in the index log since the index was last written."""
+        if not os.path.exists(self.log_path):
+            return
+        valid_bytes = 0
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Cut short by a crash; its rows were never referred to
+                cid = json.loads(line)
+                # CIDs already in the index were logged before a compaction that crashed before clearing the log
+                if cid not in self.rows:
+                    self.rows[cid] = len(self.rows)
+                    self._log_entries += 1
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(self.log_path):
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(valid_bytes)
+
+    def _append_log(self, cids: List[str]):
+        """Record new rows (already on disk) in the index log, compacting it once it has grown as large as the index."""
+        with open(self.log_path, 'a') as f:
+            f.write(''.join(json.dumps(cid) + '\n' for cid in cids))
+        self._log_entries += len(cids)
+        if self._log_entries >= max(MIN_LOG_ENTRIES_TO_COMPACT, len(self.rows) - self._log_entries):
+            self._compact()
+
+    def _compact(self):
+        """Write the whole index atomically, then clear the log it now includes."""
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'dim': self.dim, 'rows': self.rows}, f)
+        os.replace(tmp_path, self.index_path)
+        with open(self.log_path, 'w'):
+            pass
+        self._log_entries = 0
+
+    def get_embeddings(self, cids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            cids (List[str]): IPFS CIDs
+
+        Returns:
+            Dict[str, np.ndarray]: Embedding of each cached CID (uncached CIDs are left out)
+        """
+        with self._lock:
+            return {cid: np.array(self._embeddings[self.rows[cid]]) for cid in cids if cid in self.rows}
+
+    def put_embeddings(self, cids: List[str], embeddings: np.ndarray):
+        """
+        Store embeddings, one row per CID.
+
+        Args:
+            cids (List[str]): IPFS CIDs
+            embeddings (np.ndarray): Embeddings (len(cids) x dim)
+        """
+        with self._lock:
+            new_cids = [cid for cid in dict.fromkeys(cids) if cid not in self.rows]
+            needed = len(self.rows) + len(new_cids)
+            if needed > self._embeddings.shape[0]:
+                self._embeddings.flush()
+                capacity = self._embeddings.shape[0]
+                while capacity < needed:
+                    capacity *= 2
+                self._embeddings = self._open(capacity, keep_existing=True)
+
+            for cid in new_cids:
+                self.rows[cid] = len(self.rows)
+                self._cids.append(cid)
+            for cid, embedding in zip(cids, embeddings):
+                self._embeddings[self.rows[cid]] = embedding
+
+            # Rows must be on disk before the index refers to them
+            self._embeddings.flush()
+            if new_cids:
+                self._append_log(new_cids)
+
+    def all_embeddings(self):
+        """
+        Get every cached embedding.
+
+        Returns:
+            Tuple[List[str], np.ndarray]: CIDs and their embeddings (a view of the memmap, only valid until the cache grows)
+        """
+        with self._lock:
+            return self._cids[:], self._embeddings[:len(self._cids)]
+
+    def _thumbnail_path(self, cid: str) -> Optional[str]:
+        # CIDs are base32/base58, so anything else (e.g. a path) is never used as a file name
+        if not cid.isalnum():
+            return None
+        return os.path.join(self.thumbnail_dir, f'{cid}.npy')
+
+    def get_thumbnail(self, cid: str) -> Optional[Image.Image]:
+        """Load a cached thumbnail, or return None."""
+        path = self._thumbnail_path(cid)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            return Image.fromarray(np.load(path))
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not load cached thumbnail for {cid}: {str(e)}")
+            return None
+
+    def put_thumbnail(self, cid: str, image: Image.Image) -> Image.Image:
+        """Store the thumbnail of an image and return it."""
+        thumbnail = make_thumbnail(image)
+        path = self._thumbnail_path(cid)
+        if path is None or os.path.exists(path):
+            return thumbnail
+        tmp_path = path + '.tmp.npy'
+        np.save(tmp_path, np.asarray(thumbnail, dtype=np.uint8))
+        os.replace(tmp_path, path)
+        return thumbnail
+
+
+_caches: Dict[tuple, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(cache_dir: Optional[str] = None, dim: int = 512, name: str = 'embeddings') -> EmbeddingCache:
+    """
+    Get the process-wide cache for a directory and store name, so analyzers never write
+    the same index from two EmbeddingCache objects.
+
+    Args:
+        cache_dir (Optional[str]): Cache directory. If None, uses NFT_CACHE_DIR or the default
+        dim (int): Dimension of the embeddings
+        name (str): Name of the embedding store
+
+    Returns:
+        EmbeddingCache: The shared cache
+    """
+    key = (os.path.abspath(cache_dir or os.getenv('NFT_CACHE_DIR', DEFAULT_CACHE_DIR)), dim, name)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = EmbeddingCache(key[0], dim=dim, name=name)
+        return _caches[key]
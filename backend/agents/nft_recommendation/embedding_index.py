@@ -0,0 +1,184 @@
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Collections up to this size are searched exactly; larger ones use the IVF index
+DEFAULT_FLAT_THRESHOLD = 20000
+
+# The IVF index is rebuilt once the cache has grown by this fraction; newer rows are searched exactly meanwhile
+REBUILD_GROWTH = 0.1
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(similarities: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest similarities, best first (argpartition, then sort only the k)."""
+    k = min(k, len(similarities))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-similarities, k - 1)[:k]
+    return top[np.argsort(-similarities[top])]
+
+
+class FlatIndex:
+    """Exact cosine-similarity search: one matrix-vector product over every embedding."""
+
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = _normalize(embeddings)
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k most similar embeddings.
+
+        Args:
+            query (np.ndarray): Normalized query embedding
+            k (int): Number of results
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row positions and cosine similarities, best first
+        """
+        similarities = self.embeddings @ query
+        top = _top_k(similarities, k)
+        return top, similarities[top]
+
+
+class IVFIndex:
+    """
+    Approximate search with an inverted file index: embeddings are clustered with k-means, and
+    a query is compared only with the embeddings of its `n_probe` closest clusters.
+    """
+
+    def __init__(self, embeddings: np.ndarray, n_lists: Optional[int] = None, n_probe: int = 8,
+                 iterations: int = 10, seed: int = 0):
+        self.embeddings = _normalize(embeddings)
+        # sqrt(n) lists balances centroid comparisons against list scans
+        self.n_lists = n_lists or max(1, int(np.sqrt(len(self.embeddings))))
+        self.n_probe = min(n_probe, self.n_lists)
+
+        self.centroids = self._train(iterations, np.random.default_rng(seed))
+        assignments = np.argmax(self.embeddings @ self.centroids.T, axis=1)
+        order = np.argsort(assignments, kind="stable")
+        # Rows of each list are contiguous in `order`, starting at offsets[list]
+        self.order = order
+        self.offsets = np.searchsorted(assignments[order], np.arange(self.n_lists + 1))
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def _train(self, iterations: int, rng: np.random.Generator) -> np.ndarray:
+        """Spherical k-means on a sample of the embeddings."""
+        sample_size = min(len(self.embeddings), self.n_lists * 64)
+        sample = self.embeddings[rng.choice(len(self.embeddings), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, self.n_lists, replace=False)]
+
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=self.n_lists)
+            # Keep the previous centroid for empty clusters
+            centroids = np.where(counts[:, None] > 0, _normalize(sums), centroids)
+        return centroids
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find (approximately) the k most similar embeddings.
+
+        Args:
+            query (np.ndarray): Normalized query embedding
+            k (int): Number of results
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row positions and cosine similarities, best first
+        """
+        probes = _top_k(self.centroids @ query, self.n_probe)
+        candidates = np.concatenate([self.order[self.offsets[p]:self.offsets[p + 1]] for p in probes])
+        similarities = self.embeddings[candidates] @ query
+        top = _top_k(similarities, k)
+        return candidates[top], similarities[top]
+
+
+def build_index(embeddings: np.ndarray, flat_threshold: int = DEFAULT_FLAT_THRESHOLD):
+    """Build a flat index for small collections and an IVF index for large ones."""
+    if len(embeddings) <= flat_threshold:
+        return FlatIndex(embeddings)
+    return IVFIndex(embeddings)
+
+
+class NFTSimilarityIndex:
+    """
+    Nearest-neighbour search over the CLIP image embeddings in an EmbeddingCache. The cache only
+    ever appends rows, so rows added since the index was built are searched exactly and merged
+    in, and the index is rebuilt once the cache has grown enough.
+    """
+
+    def __init__(self, cache, flat_threshold: Optional[int] = None):
+        """
+        Initialize the index.
+
+        Args:
+            cache (EmbeddingCache): The embedding cache to search
+            flat_threshold (Optional[int]): Max collection size for exact search. If None, uses NFT_FLAT_INDEX_MAX or the default
+        """
+        self.cache = cache
+        self.flat_threshold = flat_threshold or int(os.getenv('NFT_FLAT_INDEX_MAX', DEFAULT_FLAT_THRESHOLD))
+        # The index and the CIDs of its rows, swapped together so a search never mixes two builds
+        self.index = None
+        self.cids: List[str] = []
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """
+        Get the current index with the CIDs it was built from, and the current CIDs and embeddings,
+        rebuilding the index if the cache grew enough.
+        """
+        # A view of the memmap: indexes copy what they need, so the cache can keep growing
+        cids, embeddings = self.cache.all_embeddings()
+        with self._lock:
+            if self.index is None or len(cids) > len(self.cids) * (1 + REBUILD_GROWTH):
+                print(f"Building NFT similarity index over {len(cids)} embeddings...")
+                self.index = build_index(embeddings, self.flat_threshold)
+                self.cids = cids
+            return self.index, self.cids, cids, embeddings
+
+    def search(self, cid: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Find the NFTs that look most like a given one.
+
+        Args:
+            cid (str): IPFS CID of an NFT whose embedding is cached
+            k (int): Number of results
+
+        Returns:
+            List[Tuple[str, float]]: CIDs and cosine similarities, most similar first (the query itself excluded)
+        """
+        cached = self.cache.get_embeddings([cid])
+        if cid not in cached:
+            raise KeyError(f"No embedding for {cid}")
+        query = _normalize(cached[cid])
+
+        # Another search may have rebuilt the index from more rows than our snapshot of the cache,
+        # so index positions are resolved through the index's own CIDs
+        index, indexed_cids, cids, embeddings = self._refresh()
+
+        # One extra result, since the query itself is in the index
+        positions, similarities = index.search(query, k + 1)
+        results = [(indexed_cids[p], float(s)) for p, s in zip(positions, similarities)]
+
+        # Rows added after the index was built are searched exactly
+        indexed_count = len(indexed_cids)
+        if len(cids) > indexed_count:
+            tail_positions, tail_similarities = FlatIndex(embeddings[indexed_count:]).search(query, k + 1)
+            results += [(cids[indexed_count + p], float(s)) for p, s in zip(tail_positions, tail_similarities)]
+
+        results = sorted((r for r in results if r[0] != cid), key=lambda r: -r[1])
+        return results[:k]
@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from backend.agents.nft_recommendation.market_nft_trends import NFTMarketAnalyzer
+from backend.agents.nft_recommendation.momentum import MomentumEngine
+
+# Summaries have a fixed size however much data comes in: at most this many trend sources and excerpts
+MAX_TREND_SOURCES = 5
+MAX_TREND_EXCERPTS = 3
+EXCERPT_LENGTH = 200
+
+# Trailing windows (in minutes) of the price summary
+PRICE_WINDOWS = (15, 60)
+
+
+def _round(value, digits: int = 4):
+    """Round the floats of a (nested) feature dict, so the prompt doesn't spend tokens on noise."""
+    if isinstance(value, dict):
+        return {key: _round(item, digits) for key, item in value.items()}
+    if isinstance(value, float):
+        return round(value, digits)
+    return value
+
+
+def summarize_price_data(price_data: Optional[pd.DataFrame]) -> Dict:
+    """
+    Summarize recent swaps as momentum features.
+
+    Args:
+        price_data (Optional[pd.DataFrame]): Swaps from a price tracker (or None)
+
+    Returns:
+        Dict: Momentum features over all swaps and over trailing windows, or {"num_trades": 0}
+    """
+    if price_data is None or price_data.empty:
+        return {"num_trades": 0}
+    engine = MomentumEngine.from_frame(price_data)
+    return _round({**engine.features(), "windows": engine.rolling_features(PRICE_WINDOWS)})
+
+
+def summarize_trends(market_trends: List[Dict[str, str]], analyzer: Optional[NFTMarketAnalyzer] = None) -> Dict:
+    """
+    Summarize scraped trend pages as a sentiment score, their sources and a few excerpts.
+
+    Args:
+        market_trends (List[Dict[str, str]]): Pages from NFTTrendScraper ('url' and 'content', optionally 'text')
+        analyzer (Optional[NFTMarketAnalyzer]): Sentiment analyzer. If None, creates one
+
+    Returns:
+        Dict: Page count, sentiment, the most common source domains and excerpts of the most opinionated pages
+    """
+    if not market_trends:
+        return {"pages": 0}
+
+    analyzer = analyzer or NFTMarketAnalyzer()
+    sentiment = analyzer.analyze_sentiment([page.get('text') or page['content'] for page in market_trends])
+    scores = np.array(sentiment["signal_scores"])
+
+    domains = pd.Series([urlparse(page['url']).netloc for page in market_trends]).value_counts()
+    strongest = np.argsort(-np.abs(scores), kind='stable')[:MAX_TREND_EXCERPTS]
+
+    return {
+        "pages": len(market_trends),
+        "sentiment_score": sentiment["nft_sentiment"],
+        "summary": sentiment["market_trends"],
+        "sources": domains.index[:MAX_TREND_SOURCES].tolist(),
+        "excerpts": [
+            {"score": int(scores[i]), "text": market_trends[i]['content'][:EXCERPT_LENGTH]}
+            for i in strongest
+        ]
+    }
+
+
+def summarize_visual(nft_cids: List[str], impact_scores: List[float]) -> Dict:
+    """
+    Summarize visual impact scores: the score of each NFT and their distribution.
+
+    Args:
+        nft_cids (List[str]): IPFS CIDs, in the order of the scores
+        impact_scores (List[float]): Visual impact score (0-100) of each NFT
+
+    Returns:
+        Dict: Score of each CID plus mean, min and max
+    """
+    scores = np.asarray(impact_scores, dtype=np.float64)
+    if not len(scores):
+        return {"nfts": 0}
+    return _round({
+        "nfts": len(scores),
+        "scores": {cid: float(score) for cid, score in zip(nft_cids, scores)},
+        "mean": float(scores.mean()),
+        "min": float(scores.min()),
+        "max": float(scores.max())
+    }, 1)
+
+
+def summarize_recommendation_data(data: Dict) -> Dict:
+    """
+    Turn the data gathered for a recommendation into fixed-size features for the prompt.
+
+    Args:
+        data (Dict): Output of NFTRecommendationHandler.gather_all_data
+
+    Returns:
+        Dict: Budget plus price, trend and visual summaries
+    """
+    return {
+        "max_budget": data["max_budget"],
+        "visual": summarize_visual(data["nft_cids"], data["impact_scores"]),
+        "market_trends": summarize_trends(data["market_trends"]),
+        "price": summarize_price_data(data["price_data"])
+    }
+
+
+def format_summary(summary: Dict) -> str:
+    """Compact JSON for a prompt."""
+    return json.dumps(summary, separators=(',', ':'), default=str)
@@ -0,0 +1,129 @@
+import asyncio
+import os
+from io import BytesIO
+from typing import List, Optional
+
+import aiohttp
+from PIL import Image
+
+# Public gateways tried after the Pinata gateway; override with IPFS_FALLBACK_GATEWAYS (comma-separated)
+DEFAULT_FALLBACK_GATEWAYS = ["ipfs.io", "dweb.link"]
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 2
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class IPFSFetcher:
+    """
+    Downloads IPFS images concurrently through one pooled aiohttp session. Each CID is tried on the
+    Pinata gateway first and then on the fallback gateways, with retries and backoff, and a fixed
+    number of workers bounds the number of downloads in flight.
+    """
+
+    def __init__(self, gateway_url: str, pinata_jwt: Optional[str] = None,
+                 fallback_gateways: Optional[List[str]] = None, max_concurrency: Optional[int] = None,
+                 timeout: float = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES):
+        self.pinata_jwt = pinata_jwt
+        if fallback_gateways is None:
+            env_gateways = os.getenv('IPFS_FALLBACK_GATEWAYS')
+            fallback_gateways = env_gateways.split(',') if env_gateways else DEFAULT_FALLBACK_GATEWAYS
+        # Only the Pinata gateway gets the JWT
+        self.gateways = [(gateway_url, True)] + [(g.strip(), False) for g in fallback_gateways if g.strip()]
+        self.max_concurrency = max_concurrency or int(os.getenv('IPFS_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+        self.timeout = timeout
+        self.retries = retries
+
+    def _headers(self, authenticated: bool) -> dict:
+        headers = {'User-Agent': USER_AGENT}
+        if authenticated and self.pinata_jwt:
+            headers['Authorization'] = f'Bearer {self.pinata_jwt}'
+        return headers
+
+    def create_session(self) -> aiohttp.ClientSession:
+        """Create a session whose connection pool matches the concurrency limit."""
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def fetch_bytes(self, session: aiohttp.ClientSession, cid: str) -> Optional[bytes]:
+        """Download the raw content of a CID, trying every gateway on each attempt. Returns None on failure."""
+        for attempt in range(self.retries + 1):
+            for gateway, authenticated in self.gateways:
+                url = f"https://{gateway}/ipfs/{cid}"
+                try:
+                    async with session.get(url, headers=self._headers(authenticated)) as response:
+                        if response.status == 200:
+                            return await response.read()
+                        print(f"Gateway {gateway} returned {response.status} for {cid}")
+                        # Content that doesn't exist won't appear on retry
+                        if response.status in (400, 404, 410, 422):
+                            break
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"Error downloading {cid} from {gateway}: {type(e).__name__} {str(e)}")
+            if attempt < self.retries:
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+        print(f"Failed to download {cid} from any gateway")
+        return None
+
+    async def fetch_image(self, session: aiohttp.ClientSession, cid: str) -> Optional[Image.Image]:
+        """Download a CID and decode it into a PIL Image, or return None."""
+        content = await self.fetch_bytes(session, cid)
+        if content is None:
+            return None
+        try:
+            image = Image.open(BytesIO(content))
+            image.load()
+            return image
+        except Exception as e:
+            print(f"Error decoding image {cid}: {str(e)}")
+            return None
+
+    async def produce(self, cids: List[str], queue: asyncio.Queue, indices: Optional[List[int]] = None):
+        """
+        Producer for a bounded download queue. max_concurrency workers download the CIDs and put
+        (index, cid, image) items on the queue in completion order, then a final None is put.
+        image is None for CIDs that couldn't be downloaded or decoded. Because the queue is bounded,
+        downloads pause whenever the consumer falls behind, so memory stays bounded.
+        `indices` gives the index reported for each CID (defaults to its position in `cids`).
+        """
+        pending: asyncio.Queue = asyncio.Queue()
+        for item in zip(indices if indices is not None else range(len(cids)), cids):
+            pending.put_nowait(item)
+
+        # Even if the session can't be created, so the consumer never waits forever
+        try:
+            async with self.create_session() as session:
+                async def worker():
+                    while True:
+                        try:
+                            index, cid = pending.get_nowait()
+                        except asyncio.QueueEmpty:
+                            return
+                        image = await self.fetch_image(session, cid)
+                        await queue.put((index, cid, image))
+
+                workers = [asyncio.ensure_future(worker()) for _ in range(min(self.max_concurrency, len(cids)))]
+                try:
+                    await asyncio.gather(*workers)
+                finally:
+                    for task in workers:
+                        task.cancel()
+        finally:
+            await queue.put(None)
+
+    async def fetch_all(self, cids: List[str]) -> List[Optional[Image.Image]]:
+        """Download all images concurrently and return them in CID order (None for failures)."""
+        queue: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.ensure_future(self.produce(cids, queue))
+        images: List[Optional[Image.Image]] = [None] * len(cids)
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            index, _, image = item
+            images[index] = image
+        await producer
+        return images
@@ -1,11 +1,10 @@
 import os
 import sys
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
+import re
 from datetime import datetime
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
+import numpy as np
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import Tool
 from dotenv import load_dotenv
@@ -16,6 +15,68 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
 from backend.python_integration.NFT_scraper_part2 import NFTTrendScraper
+from backend.agents.nft_recommendation.agent_runtime import agent_session, get_agent
+
+# Weighted sentiment lexicon: positive weights are bullish, negative weights bearish.
+# Inflections are listed explicitly, since words only match whole (so "low" no longer matches "follow")
+SENTIMENT_LEXICON = {
+    **dict.fromkeys(['bull', 'bulls'], 1.0),
+    **dict.fromkeys(['bullish'], 1.5),
+    **dict.fromkeys(['rise', 'rises', 'rising', 'rose', 'risen'], 1.0),
+    **dict.fromkeys(['grow', 'grows', 'growing', 'grew', 'growth'], 1.0),
+    **dict.fromkeys(['surge', 'surges', 'surging', 'surged'], 1.5),
+    **dict.fromkeys(['high', 'higher', 'highs'], 0.5),
+    **dict.fromkeys(['positive'], 1.0),
+    **dict.fromkeys(['rally', 'rallies', 'rallying', 'rallied'], 1.5),
+    **dict.fromkeys(['gain', 'gains', 'gained'], 1.0),
+    **dict.fromkeys(['bear', 'bears'], -1.0),
+    **dict.fromkeys(['bearish'], -1.5),
+    **dict.fromkeys(['fall', 'falls', 'falling', 'fell', 'fallen'], -1.0),
+    **dict.fromkeys(['drop', 'drops', 'dropping', 'dropped'], -1.0),
+    **dict.fromkeys(['crash', 'crashes', 'crashing', 'crashed'], -2.0),
+    **dict.fromkeys(['low', 'lower', 'lows'], -0.5),
+    **dict.fromkeys(['negative'], -1.0),
+    **dict.fromkeys(['decline', 'declines', 'declining', 'declined'], -1.0),
+    **dict.fromkeys(['loss', 'losses'], -1.0),
+}
+
+# One alternation over the whole lexicon, longest words first so "bullish" wins over "bull"
+_SENTIMENT_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(re.escape(word) for word in sorted(SENTIMENT_LEXICON, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+
+
+def score_signals(market_signals: List[str], lexicon: Dict[str, float] = SENTIMENT_LEXICON,
+                  pattern: re.Pattern = _SENTIMENT_PATTERN):
+    """
+    Score market signals against a weighted lexicon in a single regex pass over all of them.
+
+    Args:
+        market_signals (List[str]): Market signals/news (headlines or full pages)
+        lexicon (Dict[str, float]): Lowercase word -> weight
+        pattern (re.Pattern): Compiled word-boundary pattern matching the lexicon's words
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Total bullish and total bearish weight of each signal
+    """
+    if not market_signals:
+        return np.zeros(0), np.zeros(0)
+
+    # Scan one joined text, then map each match back to its signal by offset
+    text = '\n'.join(market_signals)
+    starts = np.cumsum([0] + [len(signal) + 1 for signal in market_signals[:-1]])
+
+    matches = [(match.start(), lexicon[match.group().lower()]) for match in pattern.finditer(text)]
+    positions = np.array([position for position, _ in matches], dtype=np.int64)
+    weights = np.array([weight for _, weight in matches], dtype=np.float64)
+
+    signal_index = np.searchsorted(starts, positions, side='right') - 1
+    # bincount of no matches at all returns integers, whatever the weights' dtype
+    bullish = np.bincount(signal_index, weights=np.maximum(weights, 0), minlength=len(market_signals)).astype(np.float64)
+    bearish = np.bincount(signal_index, weights=np.maximum(-weights, 0), minlength=len(market_signals)).astype(np.float64)
+    return bullish, bearish
+
 
 class NFTMarketAnalyzer:
     def __init__(self):
@@ -29,24 +90,24 @@ class NFTMarketAnalyzer:
             market_signals: List of strings containing market signals/news
 
         Returns:
-            Dict containing market trends description and sentiment score
+            Dict containing market trends description, sentiment score and the score of each signal
         """
         # Process market signals
         total_signals = len(market_signals)
         if total_signals == 0:
             return {
                 "market_trends": "Insufficient market data",
-                "nft_sentiment": 0
+                "nft_sentiment": 0,
+                "signal_scores": []
             }
 
-        # This is a placeholder for more sophisticated analysis
-        # In production, you might want to use NLP models or more complex analysis
-        positive_signals = sum(1 for signal in market_signals
-                             if any(word in signal.lower()
-                                   for word in ['bull', 'rise', 'grow', 'surge', 'high', 'positive']))
-        negative_signals = sum(1 for signal in market_signals
-                             if any(word in signal.lower()
-                                   for word in ['bear', 'fall', 'drop', 'crash', 'low', 'negative']))
+        bullish, bearish = score_signals(market_signals)
+
+        # Each signal scores from -100 (all bearish words) to 100 (all bullish words)
+        matched = bullish + bearish
+        signal_scores = np.divide((bullish - bearish) * 100, matched, out=np.zeros(len(matched), dtype=np.float64), where=matched > 0)
+        positive_signals = int((signal_scores > 0).sum())
+        negative_signals = int((signal_scores < 0).sum())
 
         # Calculate sentiment score (-100 to 100)
         if total_signals > 0:
@@ -56,16 +117,36 @@ class NFTMarketAnalyzer:
 
         return {
             "market_trends": f"Analyzed {total_signals} market signals: {positive_signals} positive, {negative_signals} negative",
-            "nft_sentiment": int(sentiment_score)
+            "nft_sentiment": int(sentiment_score),
+            "signal_scores": [int(score) for score in signal_scores]
         }
 
-def initialize_agent():
-    """Initialize the NFT market trend analysis agent."""
-    llm = ChatOpenAI(model="gpt-4")
-
+AGENT_NAME = "NFT Market Trend Agent"
+
+AGENT_PROMPT = (
+    "You are an NFT market analysis agent specialized in evaluating market sentiment. "
+    "Analyze market signals and provide a brief summary with a sentiment score.\n\n"
+    "Always format your response as a JSON object with exactly this structure:\n"
+    "{\n"
+    '    "reasoning": "One concise paragraph summarizing current market conditions and key factors",\n'
+    '    "sentiment_score": integer between -100 and 100\n'
+    "}\n\n"
+    "Example format:\n"
+    "{\n"
+    '    "reasoning": "NFT market showing strong momentum with increased trading volume and rising floor prices across major collections. Social sentiment is positive with growing interest in new launches.",\n'
+    '    "sentiment_score": 75\n'
+    "}\n\n"
+    "Keep your reasoning brief and focused on key market indicators. The sentiment score should reflect the overall market direction where:\n"
+    "-100 = Extremely Bearish\n"
+    "  0  = Neutral\n"
+    " 100 = Extremely Bullish\n\n"
+    "Base your analysis only on the provided market signals."
+)
+
+def create_tools() -> List[Tool]:
     market_analyzer = NFTMarketAnalyzer()
 
-    tools = [
+    return [
         Tool(
             name="analyze_nft_market_sentiment",
             func=market_analyzer.analyze_sentiment,
@@ -73,37 +154,16 @@ def initialize_agent():
         )
     ]
 
-    memory = MemorySaver()
-    config = {"configurable": {"thread_id": "NFT Market Trend Agent"}}
-
-    return create_react_agent(
-        llm,
-        tools=tools,
-        checkpointer=memory,
-        state_modifier=(
-            "You are an NFT market analysis agent specialized in evaluating market sentiment. "
-            "Analyze market signals and provide a brief summary with a sentiment score.\n\n"
-            "Always format your response as a JSON object with exactly this structure:\n"
-            "{\n"
-            '    "reasoning": "One concise paragraph summarizing current market conditions and key factors",\n'
-            '    "sentiment_score": integer between -100 and 100\n'
-            "}\n\n"
-            "Example format:\n"
-            "{\n"
-            '    "reasoning": "NFT market showing strong momentum with increased trading volume and rising floor prices across major collections. Social sentiment is positive with growing interest in new launches.",\n'
-            '    "sentiment_score": 75\n'
-            "}\n\n"
-            "Keep your reasoning brief and focused on key market indicators. The sentiment score should reflect the overall market direction where:\n"
-            "-100 = Extremely Bearish\n"
-            "  0  = Neutral\n"
-            " 100 = Extremely Bullish\n\n"
-            "Base your analysis only on the provided market signals."
-        ),
-    ), config
-
-def analyze_nft_market():
+def initialize_agent():
+    """Get the NFT market trend analysis agent (built once per process)."""
+    return get_agent(AGENT_NAME, AGENT_PROMPT, create_tools)
+
+def analyze_nft_market(session_id: Optional[str] = None):
     """
     Analyzes NFT market signals and returns both sentiment and market trends
+
+    Args:
+        session_id: ID of the user's session, so follow-up analyses share memory (one-off if None)
     
     Returns:
         Dict containing market trends and sentiment analysis
@@ -112,21 +172,22 @@ def analyze_nft_market():
     # Get market signals from scraper
     scraper = NFTTrendScraper()
     market_signals = scraper.get_trend_content()
-    agent_executor, config = initialize_agent()
+    agent_executor = initialize_agent()
 
     prompt = (
     f"Please analyze these NFT market signals:\n\n"
     f"{json.dumps(market_signals, indent=2)}\n\n"
     "Provide a detailed analysis of market trends and overall sentiment score."
     )
-    for chunk in agent_executor.stream(
-        {"messages": [HumanMessage(content=prompt)]},
-        config
-    ):
-        if "agent" in chunk:
-            return chunk["agent"]["messages"][0].content
-        elif "tools" in chunk:
-            return chunk["tools"]["messages"][0].content
+    with agent_session(AGENT_NAME, session_id) as config:
+        for chunk in agent_executor.stream(
+            {"messages": [HumanMessage(content=prompt)]},
+            config
+        ):
+            if "agent" in chunk:
+                return chunk["agent"]["messages"][0].content
+            elif "tools" in chunk:
+                return chunk["tools"]["messages"][0].content
 
         
 
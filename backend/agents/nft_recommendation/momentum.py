@@ -0,0 +1,184 @@
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+INITIAL_CAPACITY = 1024
+
+# Column names used by the text trading tables and by the swap trackers
+TIME_COLUMNS = ('Time (UTC)', 'timestamp')
+PRICE_COLUMNS = ('Price', 'price')
+AMOUNT_COLUMNS = ('ETH Amount', 'eth_amount', 'sol_amount')
+
+
+def _column(df: pd.DataFrame, names: tuple):
+    for name in names:
+        if name in df.columns:
+            return df[name]
+        if df.index.name == name:
+            return df.index.to_series()
+    raise KeyError(f"Trading data has none of the columns {', '.join(names)}")
+
+
+def swaps_from_frame(df: pd.DataFrame):
+    """
+    Convert a frame of swaps to typed arrays, parsing the timestamps once.
+
+    Args:
+        df (pd.DataFrame): Swaps, as parsed from a trading table or returned by a swap tracker
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Timestamps (seconds), prices and amounts, oldest first
+    """
+    timestamps = pd.to_datetime(_column(df, TIME_COLUMNS)).to_numpy(dtype='datetime64[ns]').astype(np.int64) / 1e9
+    prices = _column(df, PRICE_COLUMNS).to_numpy(dtype=np.float64)
+    amounts = np.abs(_column(df, AMOUNT_COLUMNS).to_numpy(dtype=np.float64))
+    order = np.argsort(timestamps, kind='stable')
+    return timestamps[order], prices[order], amounts[order]
+
+
+class MomentumEngine:
+    """
+    Market momentum over a growing series of swaps, kept as typed arrays sorted by time.
+
+    Alongside the arrays it keeps prefix sums of volume, notional (price x amount) and squared
+    log returns, so the volume, VWAP and realized volatility of any time window come from two
+    lookups instead of a pass over the swaps. New swaps are appended incrementally; only swaps
+    older than the latest one already seen force a re-sort.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.size = 0
+        self._timestamps = np.empty(capacity)
+        self._prices = np.empty(capacity)
+        self._amounts = np.empty(capacity)
+        # Prefix sums have one extra leading zero, so window sums are cum[hi] - cum[lo]
+        self._cum_volume = np.zeros(capacity + 1)
+        self._cum_notional = np.zeros(capacity + 1)
+        self._cum_squared_returns = np.zeros(capacity + 1)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'MomentumEngine':
+        """Build an engine from a frame of swaps."""
+        engine = cls(max(INITIAL_CAPACITY, len(df)))
+        if len(df):
+            engine.add_swaps(*swaps_from_frame(df))
+        return engine
+
+    def _grow(self, needed: int):
+        capacity = len(self._timestamps)
+        while capacity < needed:
+            capacity *= 2
+        for name in ('_timestamps', '_prices', '_amounts'):
+            array = np.empty(capacity)
+            array[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, array)
+        for name in ('_cum_volume', '_cum_notional', '_cum_squared_returns'):
+            array = np.zeros(capacity + 1)
+            array[:self.size + 1] = getattr(self, name)[:self.size + 1]
+            setattr(self, name, array)
+
+    def _update_prefix_sums(self, start: int):
+        """Recompute the prefix sums from swap `start` onwards."""
+        end = self.size
+        amounts = self._amounts[start:end]
+        self._cum_volume[start + 1:end + 1] = self._cum_volume[start] + np.cumsum(amounts)
+        self._cum_notional[start + 1:end + 1] = self._cum_notional[start] + np.cumsum(amounts * self._prices[start:end])
+
+        # The return of swap i is relative to swap i - 1 (the first swap has none)
+        previous = self._prices[max(start - 1, 0):end - 1]
+        returns = np.zeros(end - start)
+        returns[1 if start == 0 else 0:] = np.log(self._prices[max(start, 1):end] / previous)
+        self._cum_squared_returns[start + 1:end + 1] = self._cum_squared_returns[start] + np.cumsum(returns ** 2)
+
+    def add_swaps(self, timestamps: np.ndarray, prices: np.ndarray, amounts: np.ndarray):
+        """
+        Add swaps to the series.
+
+        Args:
+            timestamps (np.ndarray): Swap times in seconds
+            prices (np.ndarray): Swap prices
+            amounts (np.ndarray): Swap sizes in the base token
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        amounts = np.abs(np.asarray(amounts, dtype=np.float64))
+        if not len(timestamps):
+            return
+
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, prices, amounts = timestamps[order], prices[order], amounts[order]
+
+        start = self.size
+        if self.size + len(timestamps) > len(self._timestamps):
+            self._grow(self.size + len(timestamps))
+        end = self.size + len(timestamps)
+        self._timestamps[start:end] = timestamps
+        self._prices[start:end] = prices
+        self._amounts[start:end] = amounts
+        self.size = end
+
+        if start and timestamps[0] < self._timestamps[start - 1]:
+            # Late swaps: re-sort everything and recompute the prefix sums from the first one out of place
+            order = np.argsort(self._timestamps[:end], kind='stable')
+            for name in ('_timestamps', '_prices', '_amounts'):
+                array = getattr(self, name)
+                array[:end] = array[:end][order]
+            start = int(np.searchsorted(self._timestamps[:end], timestamps[0], side='left'))
+        self._update_prefix_sums(start)
+
+    def add_frame(self, df: pd.DataFrame):
+        """Add a frame of swaps to the series."""
+        if len(df):
+            self.add_swaps(*swaps_from_frame(df))
+
+    def features(self, window_minutes: Optional[float] = None) -> Dict:
+        """
+        Momentum features over the latest swaps.
+
+        Args:
+            window_minutes (Optional[float]): Only use swaps this many minutes before the latest one. If None, uses every swap
+
+        Returns:
+            Dict: Volume, trade count and frequency, price volatility, realized volatility, VWAP, price change
+            and the trade-size distribution
+        """
+        if self.size == 0:
+            return {'num_trades': 0}
+
+        hi = self.size
+        lo = 0
+        if window_minutes is not None:
+            lo = int(np.searchsorted(self._timestamps[:hi], self._timestamps[hi - 1] - window_minutes * 60, side='left'))
+        num_trades = hi - lo
+
+        prices = self._prices[lo:hi]
+        amounts = self._amounts[lo:hi]
+        volume = self._cum_volume[hi] - self._cum_volume[lo]
+        notional = self._cum_notional[hi] - self._cum_notional[lo]
+        # The first swap of the window has no return inside it
+        squared_returns = self._cum_squared_returns[hi] - self._cum_squared_returns[lo + 1]
+        time_range = (self._timestamps[hi - 1] - self._timestamps[lo]) / 60
+        p25, p50, p75, p90 = np.percentile(amounts, [25, 50, 75, 90])
+
+        return {
+            'volume_eth': float(volume),
+            'num_trades': num_trades,
+            'price_volatility': float(prices.std(ddof=1)) if num_trades > 1 else 0.0,
+            'realized_volatility_pct': float(np.sqrt(max(squared_returns, 0.0)) * 100),
+            'vwap': float(notional / volume) if volume > 0 else float(prices.mean()),
+            'last_price': float(prices[-1]),
+            'price_change_pct': float((prices[-1] / prices[0] - 1) * 100),
+            'avg_trade_size': float(volume / num_trades),
+            'trade_size_quantiles': {'p25': float(p25), 'p50': float(p50), 'p75': float(p75), 'p90': float(p90),
+                                     'max': float(amounts.max())},
+            'time_range_minutes': float(time_range),
+            'trades_per_minute': float(num_trades / time_range) if time_range > 0 else float(num_trades)
+        }
+
+    def rolling_features(self, windows_minutes=(5, 15, 60)) -> Dict[str, Dict]:
+        """Features over several trailing windows, keyed like '5m'."""
+        return {f"{window:g}m": self.features(window) for window in windows_minutes}
@@ -1,9 +1,7 @@
 import os
+from io import StringIO
 import pandas as pd
 from datetime import datetime
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import Tool
 
@@ -11,42 +9,84 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
 from backend.python_integration.eth_price_tracker import ETHUSDTTracker
+from backend.agents.nft_recommendation.agent_runtime import agent_session, get_agent
+from backend.agents.nft_recommendation.momentum import MomentumEngine
+from backend.agents.nft_recommendation.feature_summary import format_summary, summarize_price_data
 
 import asyncio
 from dotenv import load_dotenv
 env_path = os.path.join(os.path.dirname(__file__), './.env.local')
 load_dotenv(env_path)
 
-class MarketAnalyzer:
-    def analyze_momentum(self, df):
-        # Calculate key metrics
-        volume_eth = df['ETH Amount'].sum()
-        num_trades = len(df)
-        price_volatility = df['Price'].std()
-        time_range = (pd.to_datetime(df['Time (UTC)'].max()) -
-                     pd.to_datetime(df['Time (UTC)'].min())).total_seconds() / 60
-
-        # Calculate average trade size
-        avg_trade_size = volume_eth / num_trades
-
-        # Calculate trade frequency per minute
-        trades_per_minute = num_trades / time_range
-
-        return {
-            'volume_eth': volume_eth,
-            'num_trades': num_trades,
-            'price_volatility': price_volatility,
-            'avg_trade_size': avg_trade_size,
-            'trades_per_minute': trades_per_minute
-        }
-
-def initialize_agent():
-    """Initialize the market analysis agent."""
-    llm = ChatOpenAI(model="gpt-4")
+# Trailing windows (in minutes) the momentum features are also reported for
+MOMENTUM_WINDOWS = (5, 15, 60)
 
+class MarketAnalyzer:
+    def __init__(self):
+        # Swaps seen so far, for incremental updates with ingest()
+        self.engine = MomentumEngine()
+
+    def analyze_momentum(self, data):
+        """
+        Calculate market momentum metrics of a batch of trading data.
+
+        Args:
+            data: DataFrame of swaps, or a pipe-delimited trading table (as the agent's tool passes it)
+
+        Returns:
+            Dict of momentum features over all the swaps, plus the same features over trailing windows
+        """
+        if isinstance(data, str):
+            data = process_trading_data(data)
+        engine = MomentumEngine.from_frame(data)
+        return {**engine.features(), 'windows': engine.rolling_features(MOMENTUM_WINDOWS)}
+
+    def ingest(self, data):
+        """
+        Add new swaps to the running series and return its momentum metrics. Only the new swaps
+        are processed, so this is cheap to call as each batch arrives.
+
+        Args:
+            data: DataFrame of new swaps
+
+        Returns:
+            Dict of momentum features over every swap ingested so far, plus trailing windows
+        """
+        self.engine.add_frame(data)
+        return {**self.engine.features(), 'windows': self.engine.rolling_features(MOMENTUM_WINDOWS)}
+
+AGENT_NAME = "Market Analysis Agent"
+
+AGENT_PROMPT = (
+    "You are a market analysis agent specialized in evaluating cryptocurrency "
+    "trading data. Your task is to analyze trading patterns and rate market "
+    "momentum on a scale of 0-100, where 0 is extremely stable and 100 is "
+    "highly volatile. Consider factors like trading volume, price volatility, "
+    "trade frequency, and average trade size in your analysis.\n\n"
+    "Always format your response as a JSON object with exactly this structure:\n"
+    "{\n"
+    '    "description_momentum": "Detailed analysis of market momentum including:\n'
+    '        - Volume analysis\n'
+    '        - Price volatility patterns\n'
+    '        - Trading frequency observations\n'
+    '        - Notable market behavior\n'
+    '        - Supporting metrics and calculations",\n'
+    '    "total_market_momentum": "0-100 numerical rating"\n'
+    "}\n\n"
+    "Example output:\n"
+    "{\n"
+    '    "description_momentum": "The market shows moderate volatility with increasing volume. '
+    'Trading frequency has increased 25% in the last hour, with average trade size of 2.3 ETH. '
+    'Price swings of ±2.5% observed in short intervals. Volume is up 15% compared to 24h average.",\n'
+    '    "total_market_momentum": "65"\n'
+    "}\n\n"
+    "Ensure your response is always in this exact JSON format with these two fields."
+)
+
+def create_tools():
     market_analyzer = MarketAnalyzer()
 
-    tools = [
+    return [
         Tool(
             name="analyze_market_momentum",
             func=market_analyzer.analyze_momentum,
@@ -54,89 +94,55 @@ def initialize_agent():
         )
     ]
 
-    memory = MemorySaver()
-    config = {"configurable": {"thread_id": "Market Analysis Agent"}}
-
-    return create_react_agent(
-        llm,
-        tools=tools,
-        checkpointer=memory,
-        state_modifier=(
-            "You are a market analysis agent specialized in evaluating cryptocurrency "
-            "trading data. Your task is to analyze trading patterns and rate market "
-            "momentum on a scale of 0-100, where 0 is extremely stable and 100 is "
-            "highly volatile. Consider factors like trading volume, price volatility, "
-            "trade frequency, and average trade size in your analysis.\n\n"
-            "Always format your response as a JSON object with exactly this structure:\n"
-            "{\n"
-            '    "description_momentum": "Detailed analysis of market momentum including:\n'
-            '        - Volume analysis\n'
-            '        - Price volatility patterns\n'
-            '        - Trading frequency observations\n'
-            '        - Notable market behavior\n'
-            '        - Supporting metrics and calculations",\n'
-            '    "total_market_momentum": "0-100 numerical rating"\n'
-            "}\n\n"
-            "Example output:\n"
-            "{\n"
-            '    "description_momentum": "The market shows moderate volatility with increasing volume. '
-            'Trading frequency has increased 25% in the last hour, with average trade size of 2.3 ETH. '
-            'Price swings of ±2.5% observed in short intervals. Volume is up 15% compared to 24h average.",\n'
-            '    "total_market_momentum": "65"\n'
-            "}\n\n"
-            "Ensure your response is always in this exact JSON format with these two fields."
-        ),
-    ), config
+def initialize_agent():
+    """Get the market analysis agent (built once per process)."""
+    return get_agent(AGENT_NAME, AGENT_PROMPT, create_tools)
 
 def process_trading_data(data_text):
-    """Convert text data to DataFrame."""
-    # Split the text into lines and parse
-    lines = [line.strip() for line in data_text.split('\n') if '|' in line]
-
-    # Parse header
-    headers = [h.strip() for h in lines[0].split('|')]
-
-    # Parse data rows
-    data = []
-    for line in lines[1:]:
-        if line.startswith('-'): continue
-        values = [v.strip() for v in line.split('|')]
-        data.append(values)
+    """Convert a pipe-delimited text table to a DataFrame."""
+    # Keep the table rows, dropping separator lines like |----|----|
+    rows = '\n'.join(line for line in data_text.split('\n') if '|' in line and not set(line.strip()) <= set('|-:+ '))
 
-    df = pd.DataFrame(data, columns=headers)
+    # One C-level parse of the whole table
+    df = pd.read_csv(StringIO(rows), sep='|', skipinitialspace=True, dtype=str)
+    df.columns = df.columns.str.strip()
+    # Leading and trailing pipes produce empty, unnamed columns
+    df = df.loc[:, [column and not column.startswith('Unnamed:') for column in df.columns]]
+    df = df.apply(lambda column: column.str.strip())
 
     # Clean up numeric columns
-    df['ETH Amount'] = df['ETH Amount'].str.replace(' ETH', '').astype(float)
-    df['USDT Amount'] = df['USDT Amount'].str.replace(' USDT', '').astype(float)
-    df['Price'] = df['Price'].str.replace('$', '').astype(float)
+    df['ETH Amount'] = df['ETH Amount'].str.replace(' ETH', '', regex=False).astype(float)
+    df['USDT Amount'] = df['USDT Amount'].str.replace(' USDT', '', regex=False).astype(float)
+    df['Price'] = df['Price'].str.replace('$', '', regex=False).astype(float)
 
     return df
 
 async def main():
-    agent_executor, config = initialize_agent()
+    agent_executor = initialize_agent()
     price_tracker = ETHUSDTTracker()
 
     # Get trading data as DataFrame
     df = await price_tracker.get_eth_usdt_swaps()
     print(df)
-    # Convert DataFrame to a string representation
-    trading_data_str = df.to_string()
+    # Send a fixed-size summary of momentum features rather than every swap
+    momentum = summarize_price_data(df)
     
     prompt = (
-        f"Here is the recent ETH/USDT trading data:\n\n{trading_data_str}\n\n"
+        f"Here are momentum metrics of the recent ETH/USDT trading data:\n\n{format_summary(momentum)}\n\n"
         "Please analyze this trading data and rate the market momentum on a "
         "scale of 0-100. Provide a detailed explanation of your rating based "
         "on the metrics provided."
     )
 
-    for chunk in agent_executor.stream(
-        {"messages": [HumanMessage(content=prompt)]},  # Remove df from input
-        config
-    ):
-        if "agent" in chunk:
-            print(chunk["agent"]["messages"][0].content)
-        elif "tools" in chunk:
-            print(chunk["tools"]["messages"][0].content)
+    with agent_session(AGENT_NAME) as config:
+        for chunk in agent_executor.stream(
+            {"messages": [HumanMessage(content=prompt)]},  # Remove df from input
+            config
+        ):
+            if "agent" in chunk:
+                print(chunk["agent"]["messages"][0].content)
+            elif "tools" in chunk:
+                print(chunk["tools"]["messages"][0].content)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,27 +1,31 @@
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
 from langchain_core.messages import HumanMessage
-from langchain_core.tools import Tool
 import asyncio
 import sys
 # Import our existing agents
 from visual_nft_scorer import VisualImpactAnalyzer
-from price_predictor import initialize_agent as initialize_price_agent
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
 from backend.python_integration.eth_price_tracker import ETHUSDTTracker
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
 from backend.python_integration.NFT_scraper_part2 import NFTTrendScraper
+from backend.agents.nft_recommendation.agent_runtime import agent_session, get_agent
+from backend.agents.nft_recommendation.feature_summary import format_summary, summarize_recommendation_data
 
 from dotenv import load_dotenv
 env_path = os.path.join(os.path.dirname(__file__), '../../../sepolia/.env.local')
 load_dotenv(env_path)
 
+# Seconds each data source may take before the recommendation goes ahead without it
+SOURCE_TIMEOUTS = {
+    "visual": float(os.getenv('VISUAL_SOURCE_TIMEOUT', 120)),
+    "trends": float(os.getenv('TRENDS_SOURCE_TIMEOUT', 60)),
+    "price": float(os.getenv('PRICE_SOURCE_TIMEOUT', 30)),
+}
+
 class NFTRecommendationHandler:
     def __init__(self):
         load_dotenv()
@@ -29,20 +33,27 @@ class NFTRecommendationHandler:
         self.trend_scraper = NFTTrendScraper()
         self.price_tracker = ETHUSDTTracker()
         
+    async def _gather_source(self, name: str, coro, default):
+        """Await one data source within its timeout, falling back to a default on timeout or error."""
+        try:
+            return await asyncio.wait_for(coro, timeout=SOURCE_TIMEOUTS[name])
+        except asyncio.TimeoutError:
+            print(f"Timed out getting {name} data after {SOURCE_TIMEOUTS[name]} seconds")
+        except Exception as e:
+            print(f"Error getting {name} data: {e}")
+        return default
+
     async def gather_all_data(self, max_budget: str, nft_cids: List[str]) -> Dict:
-        """Gather data from all agents"""
+        """Gather data from all agents concurrently, so the total time is close to the slowest source"""
         
-        # Get visual impact scores
-        impact_scores = self.visual_analyzer.analyze_impact(nft_cids)
+        impact_scores, market_trends, price_data = await asyncio.gather(
+            # Downloads and crawling run on the event loop, and CLIP runs in a worker thread
+            self._gather_source("visual", self.visual_analyzer.analyze_impact_async(nft_cids), [0] * len(nft_cids)),
+            self._gather_source("trends", self.trend_scraper.get_trend_content_async(full_text=True), []),
+            self._gather_source("price", self.price_tracker.get_eth_usdt_swaps(), None),
+        )
         print("Visual impact scores obtained:", impact_scores)
-
-        # Get market trends
-        market_trends = self.trend_scraper.get_trend_content()
         print("Market trends obtained")
-
-        # Get price data
-        price_agent, price_config = initialize_price_agent()
-        price_data = await self.price_tracker.get_eth_usdt_swaps()
         print("Price data obtained")
 
         return {
@@ -50,68 +61,67 @@ class NFTRecommendationHandler:
             "nft_cids": nft_cids,
             "impact_scores": impact_scores,
             "market_trends": market_trends,
-            "price_data": price_data.to_dict() if not price_data.empty else {}
+            "price_data": price_data
         }
 
+AGENT_NAME = "Super NFT Recommendation Agent"
+
+AGENT_PROMPT = (
+    "You are a sophisticated NFT recommendation agent. Your task is to analyze multiple data points "
+    "and provide purchase recommendations for NFTs. You will receive:\n"
+    "1. User's maximum budget\n"
+    "2. Visual impact scores for each NFT\n"
+    "3. Current market trends\n"
+    "4. ETH price data\n\n"
+    "You must respond in the following JSON format ONLY:\n"
+    "{\n"
+    "  'Reasoning': 'Detailed explanation of your analysis and decision-making process',\n"
+    "  'Recommendation': [score1, score2, ...]\n"
+    "}\n\n"
+    "Where:\n"
+    "- 'Reasoning' is a string explaining your analysis of all factors\n"
+    "- 'Recommendation' is a list of integers from 0-100 matching the order of input CIDs\n"
+    "- 100 means highly recommended for purchase\n"
+    "- 0 means not recommended\n\n"
+    "Consider these factors in your scoring:\n"
+    "- Visual appeal (from impact scores)\n"
+    "- Market timing based on ETH price trends\n"
+    "- Current NFT market trends\n"
+    "- User's budget constraints\n\n"
+    "Ensure your response is EXACTLY in the specified JSON format."
+)
+
 class SuperDuperAgent:
-    def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4")
-        self.memory = MemorySaver()
-        
     def initialize_agent(self):
-        """Initialize the super agent"""
-        config = {"configurable": {"thread_id": "Super NFT Recommendation Agent"}}
-
-        return create_react_agent(
-            self.llm,
-            tools=[],  # No tools needed as we're just processing gathered data
-            checkpointer=self.memory,
-            state_modifier=(
-                "You are a sophisticated NFT recommendation agent. Your task is to analyze multiple data points "
-                "and provide purchase recommendations for NFTs. You will receive:\n"
-                "1. User's maximum budget\n"
-                "2. Visual impact scores for each NFT\n"
-                "3. Current market trends\n"
-                "4. ETH price data\n\n"
-                "You must respond in the following JSON format ONLY:\n"
-                "{\n"
-                "  'Reasoning': 'Detailed explanation of your analysis and decision-making process',\n"
-                "  'Recommendation': [score1, score2, ...]\n"
-                "}\n\n"
-                "Where:\n"
-                "- 'Reasoning' is a string explaining your analysis of all factors\n"
-                "- 'Recommendation' is a list of integers from 0-100 matching the order of input CIDs\n"
-                "- 100 means highly recommended for purchase\n"
-                "- 0 means not recommended\n\n"
-                "Consider these factors in your scoring:\n"
-                "- Visual appeal (from impact scores)\n"
-                "- Market timing based on ETH price trends\n"
-                "- Current NFT market trends\n"
-                "- User's budget constraints\n\n"
-                "Ensure your response is EXACTLY in the specified JSON format."
-            ),
-        ), config
-
-    async def get_recommendations(self, data: Dict) -> List[Dict]:
-        """Get recommendations based on all gathered data"""
-        agent_executor, config = self.initialize_agent()
+        """Get the super agent (built once per process and shared by every SuperDuperAgent)"""
+        # No tools needed as we're just processing gathered data
+        return get_agent(AGENT_NAME, AGENT_PROMPT)
+
+    async def get_recommendations(self, data: Dict, session_id: Optional[str] = None) -> List[Dict]:
+        """Get recommendations based on all gathered data (follow-ups in the same session share memory)"""
+        agent_executor = self.initialize_agent()
+
+        # Fixed-size summaries instead of raw data, so the prompt doesn't grow with the data
+        summary = await asyncio.to_thread(summarize_recommendation_data, data)
         
         prompt = (
             f"Please analyze the following data and provide NFT purchase recommendations:\n\n"
-            f"User's Max Budget: {data['max_budget']}\n\n"
-            f"NFT Visual Impact Scores: {data['impact_scores']}\n\n"
-            f"Market Trends Summary: {data['market_trends'][:500]}...\n\n"
-            f"Recent ETH Price Data: {data['price_data']}\n\n"
+            f"User's Max Budget: {summary['max_budget']}\n\n"
+            f"NFT Visual Impact Scores: {format_summary(summary['visual'])}\n\n"
+            f"Market Trends Summary: {format_summary(summary['market_trends'])}\n\n"
+            f"Recent ETH Price Momentum: {format_summary(summary['price'])}\n\n"
             f"Generate recommendation scores for these NFTs: {data['nft_cids']}"
         )
 
         recommendations = []
-        for chunk in agent_executor.stream(
-            {"messages": [HumanMessage(content=prompt)]},
-            config
-        ):
-            if "agent" in chunk:
-                recommendations.append(chunk["agent"]["messages"][0].content)
+        with agent_session(AGENT_NAME, session_id) as config:
+            # Streams on the shared async client, so concurrent requests don't block the event loop
+            async for chunk in agent_executor.astream(
+                {"messages": [HumanMessage(content=prompt)]},
+                config
+            ):
+                if "agent" in chunk:
+                    recommendations.append(chunk["agent"]["messages"][0].content)
 
         return recommendations
 
@@ -1,36 +1,43 @@
 import os
 import sys
 from PIL import Image
-import requests
-from io import BytesIO
-from typing import List
+from typing import List, Optional
 import json
-from transformers import CLIPProcessor, CLIPModel
 import torch
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent  # This is the correct import
 from langchain_core.messages import HumanMessage
 from langchain_core.tools import Tool
 from dotenv import load_dotenv
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 # Setup environment
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
 env_path = os.path.join(os.path.dirname(__file__), '../../../sepolia/.env.local')
 load_dotenv(env_path)
+from backend.agents.nft_recommendation.clip_model import get_clip
+from backend.agents.nft_recommendation.embedding_cache import get_embedding_cache
+from backend.agents.nft_recommendation.agent_runtime import agent_session, get_agent
+from backend.agents.nft_recommendation.ipfs_fetcher import IPFSFetcher
+
+# Images per CLIP forward pass; override with CLIP_BATCH_SIZE
+DEFAULT_BATCH_SIZE = 32
 
 class VisualImpactAnalyzer:
-    def __init__(self):
+    def __init__(self, batch_size: Optional[int] = None, clip_variant: Optional[str] = None):
         load_dotenv()
         self.pinata_jwt = os.getenv('PINATA_JWT')
         self.gateway_url = os.getenv('NEXT_PUBLIC_GATEWAY_URL')
         if not self.pinata_jwt or not self.gateway_url:
             raise ValueError("PINATA_JWT or NEXT_PUBLIC_GATEWAY_URL not found in environment variables")
 
-        self.model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-        self.processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+        # Concurrent downloads across the Pinata gateway and public fallbacks
+        self.ipfs_fetcher = IPFSFetcher(self.gateway_url, self.pinata_jwt)
+
+        # One CLIP model per process, loaded on first use (CLIP_VARIANT picks fp32, int8 or onnx)
+        self.clip_variant = (clip_variant or os.getenv('CLIP_VARIANT', 'fp32')).lower()
+        self.model, self.processor = get_clip(self.clip_variant)
 
         # Aesthetic attributes to evaluate
         self.attributes = [
@@ -39,89 +46,175 @@ class VisualImpactAnalyzer:
             "artistic", "creative", "unique", "memorable"
         ]
 
-    def convert_cid_to_url(self, cid: str) -> str:
-        """Convert IPFS CID to a Pinata gateway URL."""
-        return f"https://{self.gateway_url}/ipfs/{cid}"
+        self.batch_size = batch_size or int(os.getenv('CLIP_BATCH_SIZE', DEFAULT_BATCH_SIZE))
 
-    def download_and_convert_to_pil(self, cid: str) -> Image.Image:
-        """Download image from IPFS CID using Pinata gateway and convert to PIL Image."""
-        try:
-            image_url = self.convert_cid_to_url(cid)
-            print(f"Attempting to download image from: {image_url}")
-            
-            headers = {
-                'Authorization': f'Bearer {self.pinata_jwt}',
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(image_url, headers=headers, timeout=10)
-            print(f"Response status code: {response.status_code}")
-            
-            if response.status_code != 200:
-                print(f"Error response content: {response.content}")
-                return None
-                
-            image = Image.open(BytesIO(response.content))
-            print(f"Successfully opened image: {image.size}")
-            return image
-        except Exception as e:
-            print(f"Error downloading image: {str(e)}")
-            print(f"Full error details: {type(e).__name__}")
-            return None
+        # The attribute prompts never change, so encode them once instead of on every image
+        self.text_embeddings = self._encode_attributes()
 
-    def analyze_single_image(self, image: Image.Image) -> float:
-        """Analyze a single image and return impact score."""
-        inputs = self.processor(
-            images=image,
-            text=self.attributes,
-            return_tensors="pt",
-            padding=True
-        )
+        # IPFS content never changes, so thumbnails and embeddings are cached by CID
+        # (ONNX runs the fp32 weights, but int8 embeddings differ slightly, so they get their own store)
+        embeddings_name = 'embeddings_int8' if self.clip_variant == 'int8' else 'embeddings'
+        self.cache = get_embedding_cache(dim=self.text_embeddings.shape[-1], name=embeddings_name)
 
+    def _encode_attributes(self) -> torch.Tensor:
+        """Encode the attribute prompts into L2-normalized CLIP text embeddings (attributes x dim)."""
+        inputs = self.processor(text=self.attributes, return_tensors="pt", padding=True)
         with torch.no_grad():
-            outputs = self.model(**inputs)
-            image_features = outputs.image_embeds
-            text_features = outputs.text_embeds
-
-            similarity = torch.nn.functional.cosine_similarity(
-                image_features[:, None, :],
-                text_features[None, :, :],
-                dim=-1
-            )
+            text_features = self.model.get_text_features(**inputs)
+        return torch.nn.functional.normalize(text_features, dim=-1)
+
+    def embed_images(self, images: List[Image.Image]) -> torch.Tensor:
+        """Encode images into L2-normalized CLIP image embeddings (images x dim), in batches."""
+        embeddings = []
+        for start in range(0, len(images), self.batch_size):
+            batch = [image.convert("RGB") for image in images[start:start + self.batch_size]]
+            inputs = self.processor(images=batch, return_tensors="pt")
+            with torch.no_grad():
+                image_features = self.model.get_image_features(**inputs)
+            embeddings.append(torch.nn.functional.normalize(image_features, dim=-1))
+
+        if not embeddings:
+            return torch.empty((0, self.text_embeddings.shape[-1]))
+        return torch.cat(embeddings)
+
+    def score_embeddings(self, image_embeddings: torch.Tensor) -> List[float]:
+        """Score normalized image embeddings against all attributes with a single matrix multiply."""
+        # Cosine similarity of every image with every attribute (images x attributes)
+        similarity = image_embeddings @ self.text_embeddings.T
+
+        # Convert similarity scores to 0-100 scale
+        scores = (similarity.mean(dim=1) * 100).clamp(0, 100)
+        return scores.tolist()
+
+    def score_images(self, images: List[Image.Image]) -> List[float]:
+        """Analyze a batch of images and return their impact scores."""
+        return self.score_embeddings(self.embed_images(images))
 
-            # Convert similarity scores to 0-100 scale
-            average_score = float(similarity.mean() * 100)
-            return min(max(average_score, 0), 100)
-
-    def analyze_impact(self, cids: List[str]) -> List[int]:
-        """Analyze multiple images from IPFS CIDs and return list of impact scores."""
+    def analyze_single_image(self, image: Image.Image) -> float:
+        """Analyze a single image and return impact score."""
+        return self.score_images([image])[0]
+
+    async def analyze_impact_async(self, cids: List[str]) -> List[int]:
+        """
+        Analyze multiple images from IPFS CIDs and return list of impact scores (in CID order).
+        Downloads run concurrently and feed a bounded queue, and CLIP scores each full batch in a
+        worker thread while the next one downloads, so network latency overlaps with inference.
+        """
         # Ensure cids is treated as a list, not a string
         if isinstance(cids, str):
             cids = [cids]  # If a single CID is passed as string, convert to list
         
         print(f"Received CIDs: {cids}")
         print(f"Number of CIDs: {len(cids)}")
-        
-        scores = []
-        for cid in cids:
-            print(f"\nProcessing CID: {cid}")
-            image = self.download_and_convert_to_pil(cid)
-            if image:
-                score = self.analyze_single_image(image)
-                scores.append(int(round(score)))
-                print(f"Successfully analyzed image. Score: {scores[-1]}")
-            else:
-                scores.append(0)  # Default score for failed downloads
-                print("Failed to process image, assigned default score: 0")
+
+        scores = [0] * len(cids)  # Default score for failed downloads
+
+        # Known NFTs skip both the network and the model
+        cached = self.cache.get_embeddings(cids)
+        if cached:
+            cached_indices = [index for index, cid in enumerate(cids) if cid in cached]
+            embeddings = torch.from_numpy(np.stack([cached[cids[index]] for index in cached_indices]))
+            for index, score in zip(cached_indices, self.score_embeddings(embeddings)):
+                scores[index] = int(round(score))
+            print(f"Scored {len(cached_indices)} images from cached embeddings")
+
+        uncached_indices = [index for index, cid in enumerate(cids) if cid not in cached]
+        if not uncached_indices:
+            return scores
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=2 * self.batch_size)
+        producer = asyncio.ensure_future(self._produce_images(cids, uncached_indices, queue))
+
+        done = False
+        try:
+            while not done:
+                batch = []
+                while len(batch) < self.batch_size:
+                    item = await queue.get()
+                    if item is None:
+                        done = True
+                        break
+                    index, cid, image = item
+                    if image:
+                        batch.append((index, cid, image))
+                    else:
+                        print(f"Failed to process image {cid}, assigned default score: 0")
+
+                if batch:
+                    batch_scores = await loop.run_in_executor(None, self._score_and_cache, batch)
+                    for (index, _, _), score in zip(batch, batch_scores):
+                        scores[index] = int(round(score))
+                    print(f"Successfully analyzed {len(batch)} images")
+            await producer
+        finally:
+            producer.cancel()
+
         return scores
 
-def initialize_agent():
-    """Initialize the visual impact analysis agent."""
-    llm = ChatOpenAI(model="gpt-4")
-    
+    async def _produce_images(self, cids: List[str], indices: List[int], queue: asyncio.Queue):
+        """
+        Put (index, cid, image) items on the queue: cached thumbnails first, then downloads, then None.
+        The None is put even if producing fails, so the consumer never waits forever; the error is
+        then raised by awaiting this coroutine.
+        """
+        to_download = []
+        try:
+            for index in indices:
+                thumbnail = self.cache.get_thumbnail(cids[index])
+                if thumbnail is not None:
+                    await queue.put((index, cids[index], thumbnail))
+                else:
+                    to_download.append(index)
+        except Exception:
+            await queue.put(None)
+            raise
+
+        # Puts the None itself, whether or not the downloads succeed
+        await self.ipfs_fetcher.produce([cids[index] for index in to_download], queue, indices=to_download)
+
+    def _score_and_cache(self, batch: List[tuple]) -> List[float]:
+        """Embed and score a batch of (index, cid, image), caching each thumbnail and embedding."""
+        cids = [cid for _, cid, _ in batch]
+        thumbnails = [self.cache.put_thumbnail(cid, image) for _, cid, image in batch]
+        embeddings = self.embed_images(thumbnails)
+        self.cache.put_embeddings(cids, embeddings.numpy())
+        return self.score_embeddings(embeddings)
+
+    def analyze_impact(self, cids: List[str]) -> List[int]:
+        """Analyze multiple images from IPFS CIDs and return list of impact scores."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.analyze_impact_async(cids))
+
+        # Called from inside an event loop (e.g. an async agent): run the pipeline on its own loop
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.analyze_impact_async(cids)).result()
+
+AGENT_NAME = "Visual Impact Analysis Agent"
+
+AGENT_PROMPT = (
+    "You are a visual analysis agent specialized in evaluating NFT images. "
+    "Your task is to analyze the visual impact and artistic quality of NFT images. "
+    "For each image, provide a detailed analysis and impact score.\n\n"
+    "Always format your response as a JSON object with this structure:\n"
+    "{\n"
+    '    "image_analyses": [\n'
+    '        {\n'
+    '            "cid": "IPFS CID of the image",\n'
+    '            "impact_score": "0-100 numerical score",\n'
+    '            "analysis": "Detailed visual analysis of the image"\n'
+    '        }\n'
+    '    ],\n'
+    '    "overall_assessment": "Summary of all images analyzed"\n'
+    "}"
+)
+
+def create_tools():
     visual_analyzer = VisualImpactAnalyzer()
 
-    tools = [
+    return [
         Tool(
             name="analyze_visual_impact",
             func=visual_analyzer.analyze_impact,
@@ -129,30 +222,9 @@ def initialize_agent():
         )
     ]
 
-    memory = MemorySaver()
-    config = {"configurable": {"thread_id": "Visual Impact Analysis Agent"}}
-
-    return create_react_agent(
-        llm,
-        tools=tools,
-        checkpointer=memory,
-        state_modifier=(
-            "You are a visual analysis agent specialized in evaluating NFT images. "
-            "Your task is to analyze the visual impact and artistic quality of NFT images. "
-            "For each image, provide a detailed analysis and impact score.\n\n"
-            "Always format your response as a JSON object with this structure:\n"
-            "{\n"
-            '    "image_analyses": [\n'
-            '        {\n'
-            '            "cid": "IPFS CID of the image",\n'
-            '            "impact_score": "0-100 numerical score",\n'
-            '            "analysis": "Detailed visual analysis of the image"\n'
-            '        }\n'
-            '    ],\n'
-            '    "overall_assessment": "Summary of all images analyzed"\n'
-            "}"
-        ),
-    ), config
+def initialize_agent():
+    """Get the visual impact analysis agent (built once per process)."""
+    return get_agent(AGENT_NAME, AGENT_PROMPT, create_tools)
 
 def main():
     # Test CIDs - replace with actual NFT CIDs you want to analyze
@@ -160,7 +232,7 @@ def main():
         "bafkreie44ehpnzcfupb46r5jsd5gs236oozpeidcp2qqou3hwxw7fj5pui"  # Replace with real CIDs
     ]
 
-    agent_executor, config = initialize_agent()
+    agent_executor = initialize_agent()
 
     prompt = (
         f"Please analyze the visual impact of these NFT images (IPFS CIDs):\n\n"
@@ -168,14 +240,15 @@ def main():
         "Provide impact scores and detailed analysis for each image."
     )
 
-    for chunk in agent_executor.stream(
-        {"messages": [HumanMessage(content=prompt)]},
-        config
-    ):
-        if "agent" in chunk:
-            print(chunk["agent"]["messages"][0].content)
-        elif "tools" in chunk:
-            print(chunk["tools"]["messages"][0].content)
+    with agent_session(AGENT_NAME) as config:
+        for chunk in agent_executor.stream(
+            {"messages": [HumanMessage(content=prompt)]},
+            config
+        ):
+            if "agent" in chunk:
+                print(chunk["agent"]["messages"][0].content)
+            elif "tools" in chunk:
+                print(chunk["tools"]["messages"][0].content)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
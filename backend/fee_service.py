@@ -0,0 +1,258 @@
+import math
+import os
+import sys
+import threading
+from bisect import bisect_right
+from collections import ChainMap
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.model_registry import MODEL_DIR, NativeModel, get_model
+
+SURFACE_PATH = MODEL_DIR / "fee_surface.npz"
+
+# Scenarios assume each transaction stays in the mempool for ~3.5 seconds, so tx_count = tps * 3.5
+TX_PER_TPS = 3.5
+
+# Axes of the precomputed fee surface. Volume spans orders of magnitude, so it's interpolated on log1p(volume)
+TPS_AXIS = np.linspace(0, 6000, 61)
+FAILURE_RATE_AXIS = np.linspace(0, 0.5, 51)
+VOLUME_AXIS = np.concatenate([[0], np.geomspace(10, 1e7, 28)])
+
+
+def derive_features(metrics: Dict) -> Dict:
+    """
+    Add the fee model's derived features to metrics (tps, failed_tx_count, tx_count, total_volume_usd),
+    given as single values or as arrays of them.
+    """
+    columns = dict(metrics)
+    if 'tps' in columns and 'failed_tx_count' in columns:
+        columns['congestion_ratio'] = columns['failed_tx_count'] / np.where(np.asarray(columns['tps']) > 0, columns['tps'], 1)
+    if 'tx_count' in columns:
+        columns['tx_per_second'] = columns['tx_count'] / 3600  # Assuming hourly data
+    return columns
+
+
+def _locate(axis: Sequence[float], x: float):
+    """Cell index and position within the cell of x on an axis, clamped to the axis."""
+    i = min(max(bisect_right(axis, x) - 1, 0), len(axis) - 2)
+    t = (x - axis[i]) / (axis[i + 1] - axis[i])
+    return i, min(max(t, 0.0), 1.0)
+
+
+def _locate_many(axis: np.ndarray, x: np.ndarray):
+    i = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+    t = np.clip((x - axis[i]) / (axis[i + 1] - axis[i]), 0.0, 1.0)
+    return i, t
+
+
+class FeeSurface:
+    """
+    Predicted fees over a TPS x failure rate x volume grid, interpolated trilinearly, so a fee
+    estimate for any scenario costs a few lookups instead of a model prediction.
+    Scenarios outside the grid are clamped to its edges.
+    """
+
+    def __init__(self, tps: np.ndarray, failure_rates: np.ndarray, volumes: np.ndarray, fees: np.ndarray):
+        """
+        Initialize the surface.
+
+        Args:
+            tps (np.ndarray): TPS axis (increasing)
+            failure_rates (np.ndarray): Failure rate axis (increasing)
+            volumes (np.ndarray): Volume (USD) axis (increasing)
+            fees (np.ndarray): Predicted fee (SOL) at each grid point, shaped (tps, failure rate, volume)
+        """
+        self.tps = np.asarray(tps, dtype=np.float64)
+        self.failure_rates = np.asarray(failure_rates, dtype=np.float64)
+        self.volumes = np.asarray(volumes, dtype=np.float64)
+        self.fees = np.asarray(fees, dtype=np.float64)
+        self._log_volumes = np.log1p(self.volumes)
+        # Plain lists for the scalar path, which bisect searches faster than NumPy can for one value
+        self._axes = (self.tps.tolist(), self.failure_rates.tolist(), self._log_volumes.tolist())
+        self._fee_list = self.fees.tolist()
+
+    def estimate(self, tps: float, failure_rate: float, volume_usd: float) -> float:
+        """Interpolated fee (SOL) of one scenario."""
+        (i, u), (j, v), (k, w) = (_locate(axis, x) for axis, x in
+                                  zip(self._axes, (tps, failure_rate, math.log1p(volume_usd))))
+        f = self._fee_list
+        c00 = f[i][j][k] * (1 - w) + f[i][j][k + 1] * w
+        c01 = f[i][j + 1][k] * (1 - w) + f[i][j + 1][k + 1] * w
+        c10 = f[i + 1][j][k] * (1 - w) + f[i + 1][j][k + 1] * w
+        c11 = f[i + 1][j + 1][k] * (1 - w) + f[i + 1][j + 1][k + 1] * w
+        return float((c00 * (1 - v) + c01 * v) * (1 - u) + (c10 * (1 - v) + c11 * v) * u)
+
+    def __call__(self, tps, failure_rate, volume_usd) -> np.ndarray:
+        """Interpolated fees (SOL) of many scenarios (arguments are broadcast against each other)."""
+        tps, failure_rate, volume_usd = np.broadcast_arrays(
+            np.asarray(tps, dtype=np.float64), np.asarray(failure_rate, dtype=np.float64),
+            np.asarray(volume_usd, dtype=np.float64)
+        )
+        i, u = _locate_many(self.tps, tps)
+        j, v = _locate_many(self.failure_rates, failure_rate)
+        k, w = _locate_many(self._log_volumes, np.log1p(volume_usd))
+        f = self.fees
+        c00 = f[i, j, k] * (1 - w) + f[i, j, k + 1] * w
+        c01 = f[i, j + 1, k] * (1 - w) + f[i, j + 1, k + 1] * w
+        c10 = f[i + 1, j, k] * (1 - w) + f[i + 1, j, k + 1] * w
+        c11 = f[i + 1, j + 1, k] * (1 - w) + f[i + 1, j + 1, k + 1] * w
+        return (c00 * (1 - v) + c01 * v) * (1 - u) + (c10 * (1 - v) + c11 * v) * u
+
+    def to_dict(self) -> Dict:
+        """The axes and fees as lists, e.g. for a client to interpolate locally."""
+        return {
+            "tps": self.tps.tolist(),
+            "failure_rate": self.failure_rates.tolist(),
+            "volume_usd": self.volumes.tolist(),
+            "fees": self.fees.tolist()
+        }
+
+    def save(self, path: Path, fingerprint: str):
+        """Save the surface (atomically), tagged with the fingerprint of the model it was computed from."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = str(path) + '.tmp.npz'
+        np.savez(tmp_path, tps=self.tps, failure_rates=self.failure_rates, volumes=self.volumes,
+                 fees=self.fees, fingerprint=np.array(fingerprint))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, fingerprint: str) -> Optional['FeeSurface']:
+        """Load a saved surface, or None if there isn't one for this fingerprint."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as saved:
+                if str(saved['fingerprint']) != fingerprint:
+                    return None
+                return cls(saved['tps'], saved['failure_rates'], saved['volumes'], saved['fees'])
+        except Exception as e:
+            print(f"Error loading fee surface: {str(e)}")
+            return None
+
+
+class FeePredictionService:
+    """
+    Transaction fee predictions from the trained fee model, loaded once.
+
+    predict_many() scores a whole TPS x failure rate x volume grid in one vectorized model call,
+    and `surface` is such a grid precomputed over the default axes and cached on disk (recomputed
+    whenever the model files change), for fee estimates of arbitrary scenarios in microseconds.
+    """
+
+    def __init__(self, model: Optional[NativeModel] = None, surface_path: Path = SURFACE_PATH):
+        """
+        Initialize the service.
+
+        Args:
+            model (Optional[NativeModel]): Fee model. If None, uses the registry's "fee" model
+            surface_path (Path): Where the fee surface is cached
+        """
+        self.model = model or get_model("fee")
+        self.features = self.model.features
+        # Features missing from the metrics default to 0
+        self._defaults = {feature: 0.0 for feature in self.features}
+        self.surface_path = surface_path
+        # Changes whenever the model is retrained, so a cached surface of an older model is never used
+        self.fingerprint = self.model.fingerprint
+        self._surface: Optional[FeeSurface] = None
+        self._surface_lock = threading.Lock()
+
+    def feature_matrix(self, metrics: Dict[str, np.ndarray]) -> np.ndarray:
+        """Model inputs, one row per entry of the columns of metrics (tps, failed_tx_count, tx_count, total_volume_usd)."""
+        columns = derive_features(metrics)
+        rows = len(next(iter(columns.values())))
+        # Features missing from the metrics default to 0
+        return np.column_stack([np.asarray(columns.get(feature, np.zeros(rows)), dtype=np.float64)
+                                for feature in self.features])
+
+    def feature_frame(self, metrics: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """feature_matrix() as a DataFrame, for inspection."""
+        return pd.DataFrame(self.feature_matrix(metrics), columns=self.features)
+
+    def predict(self, new_data: Dict) -> float:
+        """
+        Predict the average fee for one set of current metrics.
+
+        Args:
+            new_data (Dict): Current metrics (tps, failed_tx_count, tx_count, total_volume_usd)
+
+        Returns:
+            float: Predicted average transaction fee in SOL
+        """
+        row = derive_features({key: float(value) for key, value in new_data.items()})
+        return self.model.predict_one(ChainMap(row, self._defaults))
+
+    def predict_many(self, tps_values: Sequence[float], failure_rates: Sequence[float],
+                     volumes: Sequence[float]) -> np.ndarray:
+        """
+        Predict the average fee of every scenario of a TPS x failure rate x volume grid, in one model call.
+
+        A scenario with a given TPS and failure rate has tps * failure_rate failed transactions
+        and tps * TX_PER_TPS transactions.
+
+        Args:
+            tps_values (Sequence[float]): TPS values
+            failure_rates (Sequence[float]): Failed transactions per unit of TPS
+            volumes (Sequence[float]): Total volumes in USD
+
+        Returns:
+            np.ndarray: Predicted fees in SOL, shaped (len(tps_values), len(failure_rates), len(volumes))
+        """
+        tps, failure_rate, volume = np.meshgrid(
+            np.asarray(tps_values, dtype=np.float64), np.asarray(failure_rates, dtype=np.float64),
+            np.asarray(volumes, dtype=np.float64), indexing='ij'
+        )
+        metrics = {
+            'tps': tps.ravel(),
+            'failed_tx_count': np.floor(tps * failure_rate).ravel(),
+            'tx_count': np.floor(tps * TX_PER_TPS).ravel(),
+            'total_volume_usd': volume.ravel()
+        }
+        return self.model.predict(self.feature_matrix(metrics)).reshape(tps.shape)
+
+    @property
+    def surface(self) -> FeeSurface:
+        """The fee surface over the default axes, loaded from the cache or computed (and cached) on first use."""
+        if self._surface is None:
+            with self._surface_lock:
+                if self._surface is None:
+                    surface = FeeSurface.load(self.surface_path, self.fingerprint)
+                    if surface is None:
+                        print(f"Computing fee surface over {TPS_AXIS.size * FAILURE_RATE_AXIS.size * VOLUME_AXIS.size} scenarios...")
+                        fees = self.predict_many(TPS_AXIS, FAILURE_RATE_AXIS, VOLUME_AXIS)
+                        surface = FeeSurface(TPS_AXIS, FAILURE_RATE_AXIS, VOLUME_AXIS, fees)
+                        surface.save(self.surface_path, self.fingerprint)
+                    self._surface = surface
+        return self._surface
+
+    def estimate(self, tps: float, failure_rate: float, volume_usd: float) -> float:
+        """
+        Estimate the average fee of a scenario from the fee surface.
+
+        Args:
+            tps (float): Transactions per second
+            failure_rate (float): Failed transactions per unit of TPS
+            volume_usd (float): Total volume in USD
+
+        Returns:
+            float: Estimated average transaction fee in SOL
+        """
+        return self.surface.estimate(tps, failure_rate, volume_usd)
+
+
+_service: Optional[FeePredictionService] = None
+_service_lock = threading.Lock()
+
+
+def get_fee_prediction_service() -> FeePredictionService:
+    """Get the process-wide fee prediction service, loading the model on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = FeePredictionService()
+        return _service
@@ -95,6 +95,9 @@ class GitHubFetcher:
         self.repo_structures_cache_file = os.path.join(self.cache_dir, 'repo_structures_cache.json')
         self.repo_structures_cache = self._load_repo_structures_cache()
         
+        # Repository handles, so a long-lived fetcher only looks each repository up once
+        self._repo_handles = {}
+        
     def _load_token_from_env(self) -> str:
         """Load GitHub token from environment variables."""
         # Get the directory where this file is located
@@ -225,6 +228,23 @@ class GitHubFetcher:
             
         return path_parts[0], path_parts[1]
 
+    def _get_repo(self, repo_url: str):
+        """
+        Get the PyGithub repository object for a URL, reusing it across calls.
+        
+        Args:
+            repo_url (str): GitHub repository URL
+            
+        Returns:
+            Repository: The PyGithub repository object
+        """
+        owner, repo_name = self.parse_github_url(repo_url)
+        full_name = f"{owner}/{repo_name}"
+        
+        if full_name not in self._repo_handles:
+            self._repo_handles[full_name] = self.github.get_repo(full_name)
+        return self._repo_handles[full_name]
+
     def get_repository_structure(self, repo_url: str, path: str = "", recursive: bool = True, use_cache: bool = True) -> List[Dict]:
         """
         Get the flat structure of a repository at a specific path.
@@ -245,8 +265,7 @@ class GitHubFetcher:
             if cached_data:
                 return cached_data
         
-        owner, repo_name = self.parse_github_url(repo_url)
-        repo = self.github.get_repo(f"{owner}/{repo_name}")
+        repo = self._get_repo(repo_url)
         
         try:
             self._track_api_call()
@@ -319,8 +338,7 @@ class GitHubFetcher:
                 print(f"Using cached repository structure for {repo_url}")
                 return cache_entry.get('data', {})
         
-        owner, repo_name = self.parse_github_url(repo_url)
-        repo = self.github.get_repo(f"{owner}/{repo_name}")
+        repo = self._get_repo(repo_url)
         
         def traverse_directory(path=""):
             result = {}
@@ -444,8 +462,7 @@ class GitHubFetcher:
             if cached_data:
                 return cached_data
         
-        owner, repo_name = self.parse_github_url(repo_url)
-        repo = self.github.get_repo(f"{owner}/{repo_name}")
+        repo = self._get_repo(repo_url)
         
         try:
             self._track_api_call()
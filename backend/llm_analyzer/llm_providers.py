@@ -0,0 +1,416 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+# Defaults for every provider; override with LLM_TIMEOUT, LLM_MAX_RETRIES and LLM_POOL_SIZE
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_POOL_SIZE = 10
+
+# Default endpoint of the OpenAI-compatible local server (vLLM, llama.cpp, Ollama, ...)
+DEFAULT_LOCAL_BASE_URL = "http://localhost:8000/v1"
+
+# Providers that can run without an API key
+KEYLESS_PROVIDERS = {"local", "fake"}
+
+
+def _env_number(name: str, default, cast=float):
+    """Read a numeric setting from the environment, falling back to the default."""
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return cast(value)
+
+
+def _schema_name(response_format: Optional[Dict]) -> Optional[str]:
+    """Get the name of the schema requested by a response_format, if any."""
+    if not response_format:
+        return None
+    return response_format.get("json_schema", {}).get("name")
+
+
+class LLMProvider:
+    """
+    Base class of the LLM providers. A provider owns one client (and so one connection pool)
+    that is reused for every request, with a timeout and automatic retries.
+    """
+
+    name = "base"
+
+    def __init__(self, api_key: Optional[str] = None, timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, pool_size: Optional[int] = None):
+        """
+        Initialize the provider.
+
+        Args:
+            api_key (Optional[str]): API key for the provider
+            timeout (Optional[float]): Request timeout in seconds. If None, uses LLM_TIMEOUT or the default
+            max_retries (Optional[int]): Retries on connection errors, 429s and 5xxs. If None, uses LLM_MAX_RETRIES or the default
+            pool_size (Optional[int]): Max open connections. If None, uses LLM_POOL_SIZE or the default
+        """
+        self.api_key = api_key
+        self.timeout = timeout if timeout is not None else _env_number("LLM_TIMEOUT", DEFAULT_TIMEOUT)
+        self.max_retries = max_retries if max_retries is not None else _env_number("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES, int)
+        self.pool_size = pool_size if pool_size is not None else _env_number("LLM_POOL_SIZE", DEFAULT_POOL_SIZE, int)
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The provider's SDK client, created on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    def _http_client(self):
+        """Create a pooled HTTP client shared by all requests to this provider."""
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return httpx.Client(limits=limits, timeout=self.timeout)
+
+    def _create_client(self):
+        raise NotImplementedError
+
+    def complete(self, messages: List[Dict[str, str]], model: str, max_tokens: int = 4000,
+                 response_format: Optional[Dict] = None) -> str:
+        """
+        Generate a completion.
+
+        Args:
+            messages (List[Dict[str, str]]): Chat messages ("system" and "user" roles)
+            model (str): The name of the model to use
+            max_tokens (int): Maximum number of tokens to generate
+            response_format (Optional[Dict]): Structured output format (see structured_output.response_format)
+
+        Returns:
+            str: The completion text
+        """
+        raise NotImplementedError
+
+    def stream(self, messages: List[Dict[str, str]], model: str, max_tokens: int = 4000,
+               response_format: Optional[Dict] = None) -> Iterator[str]:
+        """
+        Generate a completion, streaming it as it is generated.
+
+        Args:
+            messages (List[Dict[str, str]]): Chat messages ("system" and "user" roles)
+            model (str): The name of the model to use
+            max_tokens (int): Maximum number of tokens to generate
+            response_format (Optional[Dict]): Structured output format (see structured_output.response_format)
+
+        Yields:
+            str: Chunks of the completion, in order
+        """
+        raise NotImplementedError
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions API."""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, **kwargs):
+        """
+        Initialize the provider.
+
+        Args:
+            api_key (Optional[str]): OpenAI API key
+            base_url (Optional[str]): API endpoint. If None, uses the OpenAI API
+            **kwargs: Timeout, retry and pool settings (see LLMProvider)
+        """
+        super().__init__(api_key=api_key, **kwargs)
+        self.base_url = base_url
+
+    def _create_client(self):
+        try:
+            import openai
+        except ImportError:
+            raise ImportError("openai package not installed. Please install it with 'pip install openai'.")
+
+        return openai.OpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            http_client=self._http_client()
+        )
+
+    def _request_args(self, messages: List[Dict[str, str]], model: str, max_tokens: int,
+                      response_format: Optional[Dict]) -> Dict:
+        request_args = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": 0,  # Lower temperature for more deterministic responses
+        }
+        if response_format is not None:
+            request_args["response_format"] = response_format
+        return request_args
+
+    def complete(self, messages: List[Dict[str, str]], model: str, max_tokens: int = 4000,
+                 response_format: Optional[Dict] = None) -> str:
+        response = self.client.chat.completions.create(**self._request_args(messages, model, max_tokens, response_format))
+        return response.choices[0].message.content
+
+    def stream(self, messages: List[Dict[str, str]], model: str, max_tokens: int = 4000,
+               response_format: Optional[Dict] = None) -> Iterator[str]:
+        stream = self.client.chat.completions.create(
+            stream=True, **self._request_args(messages, model, max_tokens, response_format)
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+
+class LocalProvider(OpenAIProvider):
+    """
+    A local OpenAI-compatible server (vLLM, llama.cpp, Ollama, ...). The endpoint is taken
+    from LOCAL_LLM_BASE_URL, and no API key is needed unless the server asks for one.
+    """
+
+    name = "local"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, **kwargs):
+        base_url = base_url or os.getenv("LOCAL_LLM_BASE_URL", DEFAULT_LOCAL_BASE_URL)
+        # The OpenAI client refuses to start without a key, even if the server ignores it
+        super().__init__(api_key=api_key or "local", base_url=base_url, **kwargs)
+
+
+class AnthropicProvider(LLMProvider):
+    """
+    Anthropic messages API. Structured output is requested by forcing a call to a tool
+    whose input schema is the requested JSON schema.
+    """
+
+    name = "anthropic"
+
+    def _create_client(self):
+        try:
+            import anthropic
+        except ImportError:
+            raise ImportError("anthropic package not installed. Please install it with 'pip install anthropic'.")
+
+        return anthropic.Anthropic(
+            api_key=self.api_key,
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            http_client=self._http_client()
+        )
+
+    def _request_args(self, messages: List[Dict[str, str]], model: str, max_tokens: int,
+                      response_format: Optional[Dict]) -> Dict:
+        # The system prompt is a separate parameter in the messages API
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        request_args = {
+            "model": model,
+            "messages": [m for m in messages if m["role"] != "system"],
+            "max_tokens": max_tokens,
+            "temperature": 0,
+        }
+        if system:
+            request_args["system"] = system
+
+        name = _schema_name(response_format)
+        if name:
+            request_args["tools"] = [{
+                "name": name,
+                "description": "Return the response in the required format.",
+                "input_schema": response_format["json_schema"]["schema"]
+            }]
+            request_args["tool_choice"] = {"type": "tool", "name": name}
+        return request_args
+
+    def complete(self, messages: List[Dict[str, str]], model: str, max_tokens: int = 4000,
+                 response_format: Optional[Dict] = None) -> str:
+        response = self.client.messages.create(**self._request_args(messages, model, max_tokens, response_format))
+
+        for block in response.content:
+            if block.type == "tool_use":
+                return json.dumps(block.input)
+        return "".join(block.text for block in response.content if block.type == "text")
+
+    def stream(self, messages: List[Dict[str, str]], model: str, max_tokens: int = 4000,
+               response_format: Optional[Dict] = None) -> Iterator[str]:
+        with self.client.messages.stream(**self._request_args(messages, model, max_tokens, response_format)) as stream:
+            for event in stream:
+                if event.type != "content_block_delta":
+                    continue
+                # Tool input (structured output) arrives as partial JSON
+                if event.delta.type == "input_json_delta":
+                    yield event.delta.partial_json
+                elif event.delta.type == "text_delta":
+                    yield event.delta.text
+
+
+def recording_key(messages: List[Dict[str, str]], model: str, response_format: Optional[Dict] = None) -> str:
+    """
+    Build the key a request is recorded under.
+
+    Args:
+        messages (List[Dict[str, str]]): Chat messages
+        model (str): The name of the model
+        response_format (Optional[Dict]): Structured output format
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    payload = json.dumps({"messages": messages, "model": model, "response_format": response_format}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FakeProvider(LLMProvider):
+    """
+    Deterministic offline provider that replays recorded responses, so the scan pipeline can be
+    run and benchmarked without a network. Recordings are made by wrapping a real provider in a
+    RecordingProvider (set LLM_RECORD_PATH).
+
+    A request is answered with the response recorded for the exact same request; failing that,
+    with the first response recorded for the same schema, so recordings survive small prompt changes.
+    """
+
+    name = "fake"
+
+    def __init__(self, recordings_path: Optional[str] = None, latency: Optional[float] = None,
+                 chunk_size: int = 16, **kwargs):
+        """
+        Initialize the provider.
+
+        Args:
+            recordings_path (Optional[str]): JSON file of recordings. If None, uses LLM_RECORDINGS_PATH
+            latency (Optional[float]): Simulated seconds per request. If None, uses LLM_FAKE_LATENCY or 0
+            chunk_size (int): Characters per chunk when streaming
+            **kwargs: Ignored provider settings (API key, timeout, ...)
+        """
+        super().__init__(api_key=kwargs.get("api_key"))
+        self.recordings_path = recordings_path or os.getenv("LLM_RECORDINGS_PATH")
+        self.latency = latency if latency is not None else _env_number("LLM_FAKE_LATENCY", 0.0)
+        self.chunk_size = chunk_size
+
+        self.recordings = {}
+        if self.recordings_path and os.path.exists(self.recordings_path):
+            with open(self.recordings_path, "r") as f:
+                self.recordings = json.load(f)
+        elif self.recordings_path:
+            print(f"Warning: LLM recordings file {self.recordings_path} not found.")
+
+    def _create_client(self):
+        return None
+
+    def _replay(self, messages: List[Dict[str, str]], model: str, response_format: Optional[Dict]) -> str:
+        recording = self.recordings.get(recording_key(messages, model, response_format))
+        if recording is None:
+            name = _schema_name(response_format)
+            recording = next((r for r in self.recordings.values() if name and r.get("schema") == name), None)
+        if recording is None:
+            raise KeyError("No recorded response for this request. Record one with LLM_RECORD_PATH set.")
+        return recording["response"]
+
+    def complete(self, messages: List[Dict[str, str]], model: str, max_tokens: int = 4000,
+                 response_format: Optional[Dict] = None) -> str:
+        response = self._replay(messages, model, response_format)
+        if self.latency:
+            time.sleep(self.latency)
+        return response
+
+    def stream(self, messages: List[Dict[str, str]], model: str, max_tokens: int = 4000,
+               response_format: Optional[Dict] = None) -> Iterator[str]:
+        response = self._replay(messages, model, response_format)
+        chunks = [response[i:i + self.chunk_size] for i in range(0, len(response), self.chunk_size)] or [""]
+        for chunk in chunks:
+            if self.latency:
+                time.sleep(self.latency / len(chunks))
+            yield chunk
+
+
+class RecordingProvider(LLMProvider):
+    """Wraps a provider and saves every response it returns, for replay by FakeProvider."""
+
+    def __init__(self, provider: LLMProvider, recordings_path: str):
+        """
+        Initialize the provider.
+
+        Args:
+            provider (LLMProvider): The provider to record
+            recordings_path (str): JSON file to save the recordings to (extended if it exists)
+        """
+        super().__init__()
+        self.provider = provider
+        self.name = provider.name
+        self.recordings_path = recordings_path
+        self._lock = threading.Lock()
+
+        self.recordings = {}
+        if os.path.exists(recordings_path):
+            with open(recordings_path, "r") as f:
+                self.recordings = json.load(f)
+
+    def _record(self, messages: List[Dict[str, str]], model: str, response_format: Optional[Dict], response: str):
+        with self._lock:
+            self.recordings[recording_key(messages, model, response_format)] = {
+                "schema": _schema_name(response_format),
+                "response": response
+            }
+            with open(self.recordings_path, "w") as f:
+                json.dump(self.recordings, f, indent=2)
+
+    def complete(self, messages: List[Dict[str, str]], model: str, max_tokens: int = 4000,
+                 response_format: Optional[Dict] = None) -> str:
+        response = self.provider.complete(messages, model, max_tokens, response_format)
+        self._record(messages, model, response_format, response)
+        return response
+
+    def stream(self, messages: List[Dict[str, str]], model: str, max_tokens: int = 4000,
+               response_format: Optional[Dict] = None) -> Iterator[str]:
+        chunks = []
+        for chunk in self.provider.stream(messages, model, max_tokens, response_format):
+            chunks.append(chunk)
+            yield chunk
+        self._record(messages, model, response_format, "".join(chunks))
+
+
+PROVIDERS = {
+    "openai": OpenAIProvider,
+    "anthropic": AnthropicProvider,
+    "local": LocalProvider,
+    "fake": FakeProvider,
+}
+
+# One provider (and connection pool) per provider name and API key, shared by all analyzers
+_providers: Dict[tuple, LLMProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name: str, api_key: Optional[str] = None) -> LLMProvider:
+    """
+    Get the shared provider for a provider name and API key, creating it on first use.
+    If LLM_RECORD_PATH is set, responses of real providers are recorded there.
+
+    Args:
+        name (str): Provider name ("openai", "anthropic", "local" or "fake")
+        api_key (Optional[str]): API key for the provider
+
+    Returns:
+        LLMProvider: The provider
+    """
+    name = name.lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"{name} provider not implemented. Please use one of: {', '.join(PROVIDERS)}.")
+
+    key = (name, api_key)
+    with _providers_lock:
+        if key not in _providers:
+            provider = PROVIDERS[name](api_key=api_key)
+            record_path = os.getenv("LLM_RECORD_PATH")
+            if record_path and name != "fake":
+                provider = RecordingProvider(provider, record_path)
+            _providers[key] = provider
+        return _providers[key]
@@ -0,0 +1,356 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# Default number of prompt tokens we allow per request. Smaller prompts are faster and cheaper,
+# and this is plenty for a file list plus a couple of source files.
+DEFAULT_PROMPT_BUDGET = 12000
+
+# Tokens reserved for the completion (matches the default max_tokens of _call_llm_api)
+DEFAULT_COMPLETION_TOKENS = 4000
+
+# Context windows of the models we use, matched by prefix (longest prefix wins)
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "claude": 200000,
+}
+
+# Fallback when a model is unknown
+DEFAULT_CONTEXT_WINDOW = 16000
+
+# Explanation of the compact structure format, to be included in prompts that use it
+PATH_TRIE_NOTATION = (
+    "Paths are written compactly: one top-level entry per line, and `dir/{a,b/c}` "
+    "means the files `dir/a` and `dir/b/c`."
+)
+
+# Lower is more important when packing files into a budget
+CATEGORY_PRIORITY = {
+    "program": 0,
+    "config": 1,
+    "client": 2,
+    None: 3,
+    "other": 3,
+    "test": 4,
+}
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str):
+    """Get (and cache) the tiktoken encoding for a model, or None if tiktoken is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        print("Warning: tiktoken not installed, falling back to approximate token counts.")
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        # Unknown (or non-OpenAI) model: use the encoding of the current OpenAI models
+        return tiktoken.get_encoding("o200k_base")
+
+
+def get_context_window(model_name: str) -> int:
+    """
+    Get the context window size of a model.
+
+    Args:
+        model_name (str): The name of the model
+
+    Returns:
+        int: Context window in tokens
+    """
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model_name.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+def flatten_structure(structure: Dict) -> List[Dict[str, Any]]:
+    """
+    Flatten a nested repository structure (as returned by GitHubFetcher.get_complete_repository_structure)
+    into a list of file entries.
+
+    Args:
+        structure (Dict): Nested repository structure
+
+    Returns:
+        List[Dict[str, Any]]: File entries with "path" and "category"
+    """
+    files = []
+
+    def walk(node: Dict, prefix: str):
+        for name, info in node.items():
+            if not isinstance(info, dict):
+                continue
+            if info.get("type") == "file":
+                files.append({
+                    "path": info.get("path", prefix + name),
+                    "category": info.get("category")
+                })
+            elif "type" not in info:
+                walk(info, prefix + name + "/")
+
+    walk(structure, "")
+    return files
+
+
+def file_priority(path: str, category: Optional[str] = None) -> Tuple[int, int, str]:
+    """
+    Sort key ranking how interesting a file is for a Solana security review.
+
+    Args:
+        path (str): Path of the file within the repository
+        category (Optional[str]): File category assigned by GitHubFetcher
+
+    Returns:
+        Tuple[int, int, str]: Sort key (lower sorts first)
+    """
+    lower_path = path.lower()
+    rank = CATEGORY_PRIORITY.get(category, 3)
+
+    # Program sources beat everything else, and tests are the least interesting
+    if lower_path.endswith(".rs") and ("programs/" in lower_path or "/src/" in f"/{lower_path}"):
+        rank -= 1
+    if "test" in lower_path:
+        rank = max(rank, CATEGORY_PRIORITY["test"])
+
+    # Prefer shallower files within the same rank (entry points like lib.rs live near the top)
+    return rank, lower_path.count("/"), path
+
+
+def encode_path_trie(paths: List[str]) -> str:
+    """
+    Encode file paths as a compact path trie, e.g. `programs/x/src/{lib.rs,state.rs}`.
+    Single-child directory chains are collapsed and no indentation is used.
+
+    Args:
+        paths (List[str]): File paths
+
+    Returns:
+        str: Encoded trie, one top-level entry per line
+    """
+    trie: Dict[str, Dict] = {}
+    for path in paths:
+        node = trie
+        for part in path.strip("/").split("/"):
+            node = node.setdefault(part, {})
+
+    def encode(name: str, children: Dict[str, Dict]) -> str:
+        while len(children) == 1:
+            (child, grandchildren), = children.items()
+            name = f"{name}/{child}"
+            children = grandchildren
+        if not children:
+            return name
+        inner = ",".join(encode(child, grandchildren) for child, grandchildren in sorted(children.items()))
+        return f"{name}/{{{inner}}}"
+
+    return "\n".join(encode(name, children) for name, children in sorted(trie.items()))
+
+
+class PromptBuilder:
+    """
+    Builds LLM prompts that fit a token budget. Instead of truncating text blindly, content is
+    counted with tiktoken and the highest-priority files (or lines) are packed greedily until the
+    budget is used up, so prompts never cut JSON or code mid-token and never overflow the context.
+    """
+
+    def __init__(self, model_name: str = "gpt-4o-mini", context_budget: Optional[int] = None,
+                 completion_tokens: int = DEFAULT_COMPLETION_TOKENS):
+        """
+        Initialize the PromptBuilder.
+
+        Args:
+            model_name (str): Model the prompts are built for (selects the tokenizer and context window)
+            context_budget (Optional[int]): Max prompt tokens. If None, uses LLM_CONTEXT_BUDGET or the default
+            completion_tokens (int): Tokens reserved for the model's answer
+        """
+        self.model_name = model_name
+
+        if context_budget is None:
+            context_budget = int(os.getenv("LLM_CONTEXT_BUDGET", DEFAULT_PROMPT_BUDGET))
+
+        # Never allow a budget that would leave no room for the completion
+        max_prompt_tokens = get_context_window(model_name) - completion_tokens
+        self.context_budget = max(0, min(context_budget, max_prompt_tokens))
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Count the tokens in a piece of text.
+
+        Args:
+            text (str): The text to count
+
+        Returns:
+            int: Number of tokens
+        """
+        encoding = _get_encoding(self.model_name)
+        if encoding is None:
+            # Roughly 4 characters per token for English text and code
+            return (len(text) + 3) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def remaining_budget(self, *fixed_parts: str) -> int:
+        """
+        Get the number of tokens left for variable content once the fixed parts of a prompt are counted.
+
+        Args:
+            *fixed_parts (str): Prompt text that is always included
+
+        Returns:
+            int: Tokens available for variable content
+        """
+        used = sum(self.count_tokens(part) for part in fixed_parts)
+        return max(0, self.context_budget - used)
+
+    def fits(self, prompt: str) -> bool:
+        """Check whether a complete prompt fits in the budget."""
+        return self.count_tokens(prompt) <= self.context_budget
+
+    def truncate(self, text: str, budget: int, marker: str = "\n... (truncated)") -> str:
+        """
+        Cut text to a budget, keeping its start (and appending a marker if anything was cut).
+
+        Args:
+            text (str): The text to cut
+            budget (int): Max tokens for the result, marker included
+            marker (str): Appended to text that was cut
+
+        Returns:
+            str: The text, or as much of its start as fits
+        """
+        if self.count_tokens(text) <= budget:
+            return text
+        budget -= self.count_tokens(marker)
+        if budget <= 0:
+            return ""
+
+        # Longest prefix that fits, found by bisection (a token is at least one character)
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(text[:middle]) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low] + marker
+
+    def encode_structure(self, structure: Dict, budget: int) -> str:
+        """
+        Encode a repository structure as a compact path trie holding as many of the
+        highest-priority files as fit in the budget.
+
+        Args:
+            structure (Dict): Nested repository structure
+            budget (int): Max tokens for the encoded structure
+
+        Returns:
+            str: Encoded structure
+        """
+        files = sorted(flatten_structure(structure), key=lambda f: file_priority(f["path"], f["category"]))
+        paths = self.pack_items([f["path"] for f in files], budget)
+
+        encoded = encode_path_trie(paths)
+        omitted = len(files) - len(paths)
+        if omitted:
+            encoded += f"\n({omitted} lower-priority files omitted)"
+
+        # The trie is almost always smaller than the flat list we packed, but make sure
+        while paths and self.count_tokens(encoded) > budget:
+            paths = paths[:-1]
+            encoded = encode_path_trie(paths) + f"\n({len(files) - len(paths)} lower-priority files omitted)"
+
+        return encoded
+
+    def pack_items(self, items: List[str], budget: int, separator: str = "\n") -> List[str]:
+        """
+        Greedily take items, in order, while their total size fits the budget.
+
+        Args:
+            items (List[str]): Items in priority order
+            budget (int): Max tokens for the joined items
+            separator (str): Separator the items will be joined with
+
+        Returns:
+            List[str]: The items that fit
+        """
+        packed = []
+        separator_tokens = self.count_tokens(separator) if separator else 0
+        used = 0
+
+        for item in items:
+            cost = self.count_tokens(item) + separator_tokens
+            if used + cost > budget:
+                break
+            packed.append(item)
+            used += cost
+
+        return packed
+
+    def pack_lines(self, lines: List[str], budget: int, max_lines: Optional[int] = None) -> List[str]:
+        """
+        Take leading lines of a file while they fit the budget.
+
+        Args:
+            lines (List[str]): Lines of the file
+            budget (int): Max tokens for the lines
+            max_lines (Optional[int]): Hard cap on the number of lines
+
+        Returns:
+            List[str]: The lines that fit
+        """
+        if max_lines is not None:
+            lines = lines[:max_lines]
+        return self.pack_items(lines, budget)
+
+    def pack_file_contents(self, file_contents: Dict[str, str], budget: int) -> str:
+        """
+        Pack file contents (in priority order) into a budget. Files that fit are included
+        whole; the first file that doesn't fit is cut at a line boundary, and the rest are listed as omitted.
+
+        Args:
+            file_contents (Dict[str, str]): File path to content, highest priority first
+            budget (int): Max tokens for the packed files
+
+        Returns:
+            str: The files formatted for the prompt
+        """
+        sections = []
+        omitted = []
+        # Leave room for the note listing omitted files
+        remaining = budget - 50 if len(file_contents) > 1 else budget
+
+        for file_path, content in file_contents.items():
+            header = f"\n\n--- FILE: {file_path} ---\n"
+            footer = "\n--- END FILE ---"
+            section = f"{header}{content}{footer}"
+            cost = self.count_tokens(section)
+
+            if cost <= remaining:
+                sections.append(section)
+                remaining -= cost
+                continue
+
+            # Truncate this file at a line boundary if a useful amount still fits
+            marker = "\n... (truncated to fit the context budget)"
+            overhead = self.count_tokens(header + footer + marker)
+            if not sections or remaining - overhead > 200:
+                lines = content.split("\n")
+                kept = self.pack_lines(lines, max(0, remaining - overhead))
+                if kept:
+                    section = f"{header}{chr(10).join(kept)}{marker}{footer}"
+                    sections.append(section)
+                    remaining -= self.count_tokens(section)
+                    continue
+
+            omitted.append(file_path)
+
+        packed = "".join(sections)
+        if omitted:
+            packed += "\n\nFiles omitted to fit the context budget: " + ", ".join(omitted)
+        return packed
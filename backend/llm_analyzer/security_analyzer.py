@@ -3,13 +3,28 @@ import os
 import sys
 import time
 from pprint import pprint
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import dotenv
 
 # Add the parent directory to the path so we can import the github_fetcher module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from github_fetcher.github_fetcher import GitHubFetcher
+from llm_analyzer.llm_providers import KEYLESS_PROVIDERS, get_provider
+from llm_analyzer.prompt_builder import PATH_TRIE_NOTATION, PromptBuilder, file_priority, flatten_structure
+from llm_analyzer.structured_output import (
+    FILE_SELECTION_SCHEMA,
+    MALICIOUS_BEHAVIOR_CATEGORIES,
+    SECURITY_ANALYSIS_SCHEMA,
+    SECURITY_VULNERABILITY_CATEGORIES,
+    StructuredOutputError,
+    build_repair_prompt,
+    parse_structured_response,
+    response_format,
+)
+
+
+SYSTEM_PROMPT = "You are a security expert specializing in Solana blockchain programs."
 
 
 class SolanaSecurityAnalyzer:
@@ -18,14 +33,17 @@ class SolanaSecurityAnalyzer:
     Uses an agentic approach with multiple LLM calls.
     """
     
-    def __init__(self, llm_provider: str = "openai", model_name: str = "gpt-4o-mini", api_key: Optional[str] = None):
+    def __init__(self, llm_provider: str = "openai", model_name: str = "gpt-4o-mini", api_key: Optional[str] = None,
+                 github_fetcher: Optional[GitHubFetcher] = None, context_budget: Optional[int] = None):
         """
         Initialize the SolanaSecurityAnalyzer.
         
         Args:
-            llm_provider (str): The LLM provider to use (e.g., "openai", "anthropic")
+            llm_provider (str): The LLM provider to use ("openai", "anthropic", "local" or "fake")
             model_name (str): The name of the model to use
             api_key (Optional[str]): API key for the LLM provider. If None, will try to get from env vars
+            github_fetcher (Optional[GitHubFetcher]): Existing fetcher to share. If None, a new one is created
+            context_budget (Optional[int]): Max prompt tokens. If None, uses LLM_CONTEXT_BUDGET or the default
         """
         # Load environment variables from .env.local
         self._load_env_vars()
@@ -34,8 +52,14 @@ class SolanaSecurityAnalyzer:
         self.model_name = model_name
         self.api_key = api_key or self._load_api_key()
         
-        # Initialize the GitHub fetcher
-        self.github_fetcher = GitHubFetcher()
+        # Providers are shared per process, so every analyzer reuses the same connection pool
+        self.provider = get_provider(llm_provider, self.api_key)
+        
+        # Initialize the GitHub fetcher (reusing the caller's one avoids reloading the structure cache)
+        self.github_fetcher = github_fetcher or GitHubFetcher()
+        
+        # Token-aware prompt packing so prompts always fit the context budget
+        self.prompt_builder = PromptBuilder(model_name=model_name, context_budget=context_budget)
         
         # Track analysis time and API calls
         self.analysis_time = 0
@@ -60,31 +84,26 @@ class SolanaSecurityAnalyzer:
             else:
                 print("Warning: .env.local file not found. Using existing environment variables.")
         
-    def _load_api_key(self) -> str:
+    def _load_api_key(self) -> Optional[str]:
         """Load API key from environment variables."""
-        # For OpenAI, try to get the API key from environment variables
-        if self.llm_provider.lower() == "openai":
-            api_key = os.getenv("OPENAI_API_KEY")
-            if api_key:
-                return api_key
-        
-        # For other providers, try the standard format
+        # Providers use the standard format (OPENAI_API_KEY, ANTHROPIC_API_KEY, LOCAL_API_KEY, ...)
         env_var_name = f"{self.llm_provider.upper()}_API_KEY"
         api_key = os.getenv(env_var_name)
         
-        if not api_key:
+        if not api_key and self.llm_provider.lower() not in KEYLESS_PROVIDERS:
             raise ValueError(
                 f"API key for {self.llm_provider} is required. Set {env_var_name} environment variable."
             )
         return api_key
     
-    def _call_llm_api(self, prompt: str, max_tokens: int = 4000) -> str:
+    def _call_llm_api(self, prompt: str, max_tokens: int = 4000, response_format: Optional[Dict] = None) -> str:
         """
         Call the LLM API with the given prompt.
         
         Args:
             prompt (str): The prompt to send to the LLM
             max_tokens (int): Maximum number of tokens to generate
+            response_format (Optional[Dict]): Structured output format (see structured_output.response_format)
             
         Returns:
             str: The LLM's response
@@ -95,45 +114,118 @@ class SolanaSecurityAnalyzer:
         # Increment API call counter
         self.llm_api_calls += 1
         
-        # For OpenAI provider, call the actual API
-        if self.llm_provider.lower() == "openai":
-            try:
-                import openai
-
-                # Initialize the OpenAI client
-                client = openai.OpenAI(api_key=self.api_key)
-                
-                # Call the OpenAI API
-                print(f"Sending request to OpenAI API ({self.model_name})...")
-                start_time = time.time()
-                
-                response = client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[
-                        {"role": "system", "content": "You are a security expert specializing in Solana blockchain programs."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=max_tokens,
-                    temperature=0,  # Lower temperature for more deterministic responses
-                )
-                
-                # Extract the response text
-                response_text = response.choices[0].message.content
-                
-                # Log the API call time
-                print(f"OpenAI API call completed in {time.time() - start_time:.2f} seconds")
-                
-                return response_text
-                
-            except ImportError:
-                raise ImportError("openai package not installed. Please install it with 'pip install openai'.")
-                
-            except Exception as e:
-                raise Exception(f"Error calling OpenAI API: {str(e)}")
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
         
-        # For other providers (not implemented yet)
-        else:
-            raise ValueError(f"{self.llm_provider} provider not implemented. Please use 'openai'.")
+        try:
+            print(f"Sending request to {self.llm_provider} API ({self.model_name})...")
+            start_time = time.time()
+            
+            response_text = self.provider.complete(messages, self.model_name, max_tokens=max_tokens, response_format=response_format)
+            
+            # Log the API call time
+            print(f"{self.llm_provider} API call completed in {time.time() - start_time:.2f} seconds")
+            
+            return response_text
+            
+        except ImportError:
+            raise
+            
+        except Exception as e:
+            raise Exception(f"Error calling {self.llm_provider} API: {str(e)}")
+    
+    def _stream_llm_api(self, prompt: str, max_tokens: int = 4000, response_format: Optional[Dict] = None) -> Iterator[str]:
+        """
+        Call the LLM API with the given prompt and stream the response as it is generated.
+        
+        Args:
+            prompt (str): The prompt to send to the LLM
+            max_tokens (int): Maximum number of tokens to generate
+            response_format (Optional[Dict]): Structured output format (see structured_output.response_format)
+        
+        Yields:
+            str: Chunks of the LLM's response, in order
+        """
+        print(f"Streaming from {self.llm_provider} API with model {self.model_name}...")
+        print(f"Prompt length: {len(prompt)} characters")
+        
+        # Increment API call counter
+        self.llm_api_calls += 1
+        
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        
+        try:
+            start_time = time.time()
+            first_chunk_time = None
+        
+            for delta in self.provider.stream(messages, self.model_name, max_tokens=max_tokens, response_format=response_format):
+                if first_chunk_time is None:
+                    first_chunk_time = time.time()
+                    print(f"First token received after {first_chunk_time - start_time:.2f} seconds")
+                yield delta
+        
+            print(f"{self.llm_provider} streaming call completed in {time.time() - start_time:.2f} seconds")
+        
+        except ImportError:
+            raise
+        
+        except Exception as e:
+            raise Exception(f"Error calling {self.llm_provider} API: {str(e)}")
+    
+    def _call_llm_structured(self, prompt: str, schema_name: str, schema: Dict, max_tokens: int = 4000,
+                             validator: Optional[Callable[[Any], List[str]]] = None) -> Any:
+        """
+        Call the LLM API requesting JSON-schema structured output, and validate the result in a single pass.
+        Only if validation fails is the LLM asked (once) to repair its response.
+        
+        Args:
+            prompt (str): The prompt to send to the LLM
+            schema_name (str): Name of the schema
+            schema (Dict): JSON schema the response must match
+            max_tokens (int): Maximum number of tokens to generate
+            validator (Optional[Callable[[Any], List[str]]]): Extra checks on the decoded value, returning errors
+            
+        Returns:
+            Any: The decoded, validated response
+            
+        Raises:
+            StructuredOutputError: If the response still doesn't validate after the repair attempt
+        """
+        format_spec = response_format(schema_name, schema)
+        response = self._call_llm_api(prompt, max_tokens=max_tokens, response_format=format_spec)
+        
+        try:
+            return self._validate_structured_response(response, schema, validator)
+        except StructuredOutputError as e:
+            print(f"Warning: {schema_name} response failed validation ({str(e)}), asking the LLM to repair it...")
+            repair_prompt = build_repair_prompt(prompt, e, self.prompt_builder)
+            response = self._call_llm_api(repair_prompt, max_tokens=max_tokens, response_format=format_spec)
+            return self._validate_structured_response(response, schema, validator)
+    
+    def _validate_structured_response(self, response: str, schema: Dict,
+                                      validator: Optional[Callable[[Any], List[str]]] = None) -> Any:
+        """
+        Decode and validate a structured response, including any extra checks.
+        
+        Args:
+            response (str): The LLM's response
+            schema (Dict): JSON schema the response must match
+            validator (Optional[Callable[[Any], List[str]]]): Extra checks on the decoded value, returning errors
+            
+        Returns:
+            Any: The decoded, validated response
+        """
+        value = parse_structured_response(response, schema)
+        if validator is not None:
+            errors = validator(value)
+            if errors:
+                raise StructuredOutputError(f"Response failed validation: {'; '.join(errors[:5])}", errors, response)
+        return value
     
     def analyze_repository_hybrid(self, repo_url: str) -> Dict[str, Any]:
         """
@@ -157,10 +249,13 @@ class SolanaSecurityAnalyzer:
         
         # Step 3: Call the LLM API to select files
         print("Asking LLM to select files for analysis...")
-        file_selection_response = self._call_llm_api(file_selection_prompt)
+        file_selection = self._call_llm_structured(
+            file_selection_prompt, "file_selection", FILE_SELECTION_SCHEMA,
+            validator=lambda value: self._validate_file_selection(value, llm_files)
+        )
         
         # Step 4: Parse the file selection response
-        selected_files = self._parse_file_selection_response(file_selection_response, llm_files)
+        selected_files = self._parse_file_selection_response(file_selection, llm_files)
         
         # Step 5: Fetch content of selected files
         print(f"Fetching content of {len(selected_files)} selected files...")
@@ -171,10 +266,10 @@ class SolanaSecurityAnalyzer:
         
         # Step 7: Call the LLM API for security analysis
         print("Performing security analysis...")
-        security_analysis_response = self._call_llm_api(security_analysis_prompt)
+        security_analysis = self._call_llm_structured(security_analysis_prompt, "security_analysis", SECURITY_ANALYSIS_SCHEMA)
         
         # Step 8: Parse the security analysis response
-        analysis_results = self._parse_security_analysis_response(security_analysis_response)
+        analysis_results = self._parse_security_analysis_response(security_analysis)
         
         # Add metadata to the results
         analysis_results["metadata"] = {
@@ -211,10 +306,13 @@ class SolanaSecurityAnalyzer:
         
         # Step 3: Call the LLM API to select files
         print("Asking LLM to select files for analysis...")
-        file_selection_response = self._call_llm_api(file_selection_prompt)
+        file_selection = self._call_llm_structured(
+            file_selection_prompt, "file_selection", FILE_SELECTION_SCHEMA,
+            validator=lambda value: self._validate_file_selection(value, repo_structure)
+        )
         
         # Step 4: Parse the file selection response
-        selected_files = self._parse_file_selection_response(file_selection_response, repo_structure)
+        selected_files = self._parse_file_selection_response(file_selection, repo_structure)
         
         # Step 5: Fetch content of selected files
         print(f"Fetching content of {len(selected_files)} selected files...")
@@ -225,10 +323,10 @@ class SolanaSecurityAnalyzer:
         
         # Step 7: Call the LLM API for security analysis
         print("Performing security analysis...")
-        security_analysis_response = self._call_llm_api(security_analysis_prompt)
+        security_analysis = self._call_llm_structured(security_analysis_prompt, "security_analysis", SECURITY_ANALYSIS_SCHEMA)
         
         # Step 8: Parse the security analysis response
-        analysis_results = self._parse_security_analysis_response(security_analysis_response)
+        analysis_results = self._parse_security_analysis_response(security_analysis)
         
         # Add metadata to the results
         analysis_results["metadata"] = {
@@ -262,7 +360,7 @@ class SolanaSecurityAnalyzer:
             config_files = repo_data.get("config", [])
             summary = repo_data.get("summary", {})
             
-            prompt = f"""
+            header = f"""
 You are a security expert specializing in Solana blockchain programs. Your task is to select the most relevant files for security analysis.
 
 Repository URL: {repo_url}
@@ -276,48 +374,44 @@ Repository Summary:
 - Other Files: {summary.get('other_files', 0)}
 
 I'll provide you with lists of files categorized by type. Please select up to 3 files that are most likely to contain security vulnerabilities or malicious behavior.
-
-Program Files:
 """
             
-            # Add program files
-            for file_info in program_files:
-                file_path = file_info.get("path", "")
-                prompt += f"- {file_path}\n"
+            footer = """
+Please rank the top 3 files in order of importance for security analysis. For each file, provide a brief explanation of why you selected it.
+
+Respond with JSON containing a "files" array of up to 3 objects with "path" and "reason", most important first.
+The paths must be exactly as they appear in the list above, with no additional formatting.
+"""
             
-            # Add config files if there are few program files
+            # Program files always come first; config and client files are only added
+            # when there are few program files
+            sections = [("Program Files", program_files)]
             if len(program_files) < 3 and config_files:
-                prompt += "\nConfig Files:\n"
-                for file_info in config_files:
-                    file_path = file_info.get("path", "")
-                    prompt += f"- {file_path}\n"
-            
-            # Add client files if there are very few program and config files
+                sections.append(("Config Files", config_files))
             if len(program_files) + len(config_files) < 3 and client_files:
-                prompt += "\nClient Files:\n"
-                for file_info in client_files[:10]:  # Limit to first 10 client files
-                    file_path = file_info.get("path", "")
-                    prompt += f"- {file_path}\n"
+                sections.append(("Client Files", client_files))
             
-            prompt += """
-Please rank the top 3 files in order of importance for security analysis. For each file, provide a brief explanation of why you selected it.
-
-IMPORTANT: Format your response exactly as shown below. Do NOT use backticks, asterisks, or any other markdown formatting in the file paths:
-
-1. file_path - reason for selection
-2. file_path - reason for selection
-3. file_path - reason for selection
-
-The file paths should be exactly as they appear in the list above, with no additional formatting.
-"""
+            # Pack as many files as fit, in section order, instead of a fixed number per section
+            budget = self.prompt_builder.remaining_budget(header, footer)
+            prompt = header
+            for title, files in sections:
+                section_header = f"\n{title}:\n"
+                budget -= self.prompt_builder.count_tokens(section_header)
+                ranked = sorted(files, key=lambda f: file_priority(f.get("path", ""), f.get("category")))
+                entries = self.prompt_builder.pack_items([f"- {f.get('path', '')}" for f in ranked], budget)
+                section_body = "".join(f"{entry}\n" for entry in entries)
+                prompt += section_header + section_body
+                budget -= self.prompt_builder.count_tokens(section_body)
+                if len(entries) < len(files):
+                    break  # Budget exhausted
+            prompt += footer
             
         else:  # structure_only approach
             # For the structure-only approach, we provide the raw structure and let the LLM decide
-            files = repo_data.get("files", [])
             structure = repo_data.get("structure", {})
             summary = repo_data.get("summary", {})
             
-            prompt = f"""
+            header = f"""
 You are a security expert specializing in Solana blockchain programs. Your task is to select the most relevant files for security analysis.
 
 Repository URL: {repo_url}
@@ -327,104 +421,82 @@ Repository Summary:
 
 Examine the repository structure below and identify which files are likely to contain Solana program code (typically Rust files, especially those in 'programs' directories, or files like Anchor.toml).
 
-Repository Structure:
-{json.dumps(structure, indent=2)[:3000]}  # Truncated to avoid token limits
-
+Repository Structure ({PATH_TRIE_NOTATION}):
+"""
+            
+            footer = """
 Based on the structure, select up to 3 files that are most likely to contain security vulnerabilities or malicious behavior in Solana program code.
 
 Please rank the top 3 files in order of importance for security analysis. For each file, provide a brief explanation of why you selected it.
 
-IMPORTANT: Format your response exactly as shown below. Do NOT use backticks, asterisks, or any other markdown formatting in the file paths:
-
-1. file_path - reason for selection
-2. file_path - reason for selection
-3. file_path - reason for selection
-
-The file paths should be exactly as they appear in the repository structure, with no additional formatting.
+Respond with JSON containing a "files" array of up to 3 objects with "path" and "reason", most important first.
+The paths must be written out in full, exactly as they appear in the repository, with no additional formatting.
 """
+            
+            budget = self.prompt_builder.remaining_budget(header, footer)
+            prompt = header + self.prompt_builder.encode_structure(structure, budget) + "\n" + footer
         
         return prompt
     
-    def _parse_file_selection_response(self, response: str, repo_data: Dict) -> List[str]:
+    def _known_file_paths(self, repo_data: Dict) -> List[str]:
         """
-        Parse the LLM's file selection response to get the list of selected files.
+        Get the file paths present in the repository data given to the LLM.
         
         Args:
-            response (str): The LLM's response
+            repo_data (Dict): Repository data (either categorized files or structure)
+            
+        Returns:
+            List[str]: Known file paths
+        """
+        if "structure" in repo_data:
+            return [f["path"] for f in flatten_structure(repo_data.get("structure", {}))]
+        
+        paths = []
+        for category in ("program", "client", "config", "test", "other"):
+            paths.extend(f.get("path", "") for f in repo_data.get(category, []))
+        return [path for path in paths if path]
+    
+    def _validate_file_selection(self, selection: Dict, repo_data: Dict) -> List[str]:
+        """
+        Check that a file selection names at least one file, and only files that exist in the repository.
+        
+        Args:
+            selection (Dict): The decoded file selection response
+            repo_data (Dict): Repository data (for validation)
+            
+        Returns:
+            List[str]: Validation errors (empty if the selection is valid)
+        """
+        if not selection["files"]:
+            return ["$.files: select at least one file"]
+        
+        known_paths = set(self._known_file_paths(repo_data))
+        if not known_paths:
+            return []
+        
+        errors = []
+        for index, file_info in enumerate(selection["files"]):
+            if self._clean_file_path(file_info["path"]) not in known_paths:
+                errors.append(f"$.files[{index}].path: '{file_info['path']}' is not a file in the repository")
+        return errors
+    
+    def _parse_file_selection_response(self, selection: Dict, repo_data: Dict) -> List[str]:
+        """
+        Get the list of selected files from the LLM's (validated) file selection response.
+        
+        Args:
+            selection (Dict): The decoded file selection response (see FILE_SELECTION_SCHEMA)
             repo_data (Dict): Repository data (for validation)
             
         Returns:
             List[str]: List of selected file paths
         """
-        # This is a simplified parser. In a real implementation, we would use regex or more robust parsing.
         selected_files = []
         
-        # Split the response into lines
-        lines = response.strip().split('\n')
-        
-        # First, try to find numbered lines with file paths (1. file_path - reason)
-        for line in lines:
-            # Look for numbered lines (1. file_path - reason)
-            if line.strip() and line[0].isdigit() and '. ' in line and ' - ' in line:
-                # Extract the file path (everything between the number and the dash)
-                parts = line.split(' - ', 1)
-                if len(parts) > 0:
-                    file_with_num = parts[0].strip()
-                    # Remove the number and dot
-                    file_path = file_with_num.split('. ', 1)[-1].strip()
-                    
-                    # Clean up the file path (remove backticks, brackets, etc.)
-                    file_path = self._clean_file_path(file_path)
-                    
-                    # Validate that this looks like a file path (contains a dot or slash)
-                    if ('.' in file_path or '/' in file_path) and file_path not in selected_files:
-                        selected_files.append(file_path)
-        
-        # If no files were found using the numbered format, try to find file paths in the text
-        if not selected_files:
-            # Look for file paths in the text (simple heuristic)
-            import re
-            file_patterns = [
-                r'`([^`]+\.(rs|toml|json|js|ts|py))`',  # Paths in backticks
-                r'([a-zA-Z0-9_\-/.]+\.(rs|toml|json|js|ts|py))',  # Paths with extensions
-                r'(anchor/[a-zA-Z0-9_\-/.]+)',  # Paths starting with anchor/
-                r'(programs/[a-zA-Z0-9_\-/.]+)'  # Paths starting with programs/
-            ]
-            
-            for pattern in file_patterns:
-                matches = re.findall(pattern, response)
-                for match in matches:
-                    if isinstance(match, tuple):
-                        match = match[0]  # Take the first group if there are multiple
-                    
-                    # Clean up the file path
-                    file_path = self._clean_file_path(match)
-                    
-                    if file_path and file_path not in selected_files:
-                        selected_files.append(file_path)
-                
-                if selected_files:
-                    break
-        
-        # If we still don't have any files, use a fallback approach
-        if not selected_files:
-            # Use a generic fallback approach
-            print("Warning: Could not parse file paths from LLM response.")
-            
-            # Try to extract some reasonable files from the repository data
-            if "program" in repo_data:
-                # This is the hybrid approach data
-                program_files = repo_data.get("program", [])
-                for file_info in program_files[:3]:  # Take up to 3 program files
-                    file_path = file_info.get("path", "")
-                    if file_path and file_path not in selected_files:
-                        selected_files.append(file_path)
-            elif "files" in repo_data:
-                # This is the structure-only approach data
-                files = repo_data.get("files", [])
-                for file_path in files[:3]:  # Take up to 3 files
-                    if file_path and (file_path.endswith('.rs') or file_path.endswith('.toml')) and file_path not in selected_files:
-                        selected_files.append(file_path)
+        for file_info in selection.get("files", []):
+            file_path = self._clean_file_path(file_info["path"])
+            if file_path and file_path not in selected_files:
+                selected_files.append(file_path)
         
         # Limit to 3 files
         selected_files = selected_files[:3]
@@ -516,8 +588,8 @@ I'll provide you with the content of the selected files. For each file, analyze
    - Fee manipulation
    - Ownership concentration
 
-Provide a detailed analysis with specific line references and explanations of each issue found.
-If no issues are found in a particular category, explicitly state that.
+For each issue found, give a detailed description, its severity, the file and the specific lines.
+If no issues are found in a particular category, return an empty list for it.
 
 Also provide an overall risk score on a scale of 0-10, where:
 - 0-2: Very Low Risk
@@ -526,226 +598,46 @@ Also provide an overall risk score on a scale of 0-10, where:
 - 7-8: High Risk
 - 9-10: Critical Risk
 
+Finally, summarize the analysis and your recommendations in a few sentences.
+Respond with JSON matching the requested schema.
+
 Here are the files to analyze:
 """
         
-        # Add content of each file to the prompt
-        for file_path, content in file_contents.items():
-            prompt += f"\n\n--- FILE: {file_path} ---\n{content}\n--- END FILE ---"
+        # Add the files in selection order, truncating or omitting whatever doesn't fit the budget
+        budget = self.prompt_builder.remaining_budget(prompt)
+        prompt += self.prompt_builder.pack_file_contents(file_contents, budget)
         
         return prompt
     
-    def _parse_security_analysis_response(self, response: str) -> Dict[str, Any]:
+    def _parse_security_analysis_response(self, analysis: Dict) -> Dict[str, Any]:
         """
-        Parse the LLM's security analysis response into a structured format.
+        Convert the LLM's (validated) security analysis response into the analysis results format.
         
         Args:
-            response (str): The LLM's response
+            analysis (Dict): The decoded security analysis response (see SECURITY_ANALYSIS_SCHEMA)
             
         Returns:
             Dict[str, Any]: Parsed analysis results
         """
-        # Initialize the result structure
         security_vulnerabilities = {
-            "unauthorized_access": [],
-            "reentrancy": [],
-            "integer_overflow": [],
-            "improper_validation": [],
-            "insecure_randomness": []
+            category: analysis["security_vulnerabilities"][category]
+            for category in SECURITY_VULNERABILITY_CATEGORIES
         }
         
         malicious_behavior = {
-            "backdoors": [],
-            "rugpull_mechanisms": [],
-            "honeypot_patterns": [],
-            "fee_manipulation": [],
-            "ownership_concentration": []
+            category: analysis["malicious_behavior"][category]
+            for category in MALICIOUS_BEHAVIOR_CATEGORIES
         }
         
-        # Extract overall risk score
-        import re
-        risk_score = 0
-        risk_match = re.search(r'risk score:?\s*(\d+)[/\\]10', response, re.IGNORECASE)
-        if not risk_match:
-            risk_match = re.search(r'overall risk:?\s*(\d+)[/\\]10', response, re.IGNORECASE)
-        if not risk_match:
-            risk_match = re.search(r'risk:?\s*(\d+)[/\\]10', response, re.IGNORECASE)
-        
-        if risk_match:
-            risk_score = int(risk_match.group(1))
-        
-        # Define patterns to match vulnerability and behavior sections
-        section_patterns = {
-            "unauthorized_access": [
-                r'unauthorized access vulnerabilities?.*?(?=##|\n\n\w|$)',
-                r'access control vulnerabilities?.*?(?=##|\n\n\w|$)'
-            ],
-            "reentrancy": [
-                r'reentrancy vulnerabilities?.*?(?=##|\n\n\w|$)'
-            ],
-            "integer_overflow": [
-                r'integer overflow/underflow.*?(?=##|\n\n\w|$)',
-                r'arithmetic vulnerabilities?.*?(?=##|\n\n\w|$)'
-            ],
-            "improper_validation": [
-                r'improper validation.*?(?=##|\n\n\w|$)',
-                r'input validation.*?(?=##|\n\n\w|$)'
-            ],
-            "insecure_randomness": [
-                r'insecure randomness.*?(?=##|\n\n\w|$)',
-                r'random number.*?(?=##|\n\n\w|$)'
-            ],
-            "backdoors": [
-                r'backdoors?.*?(?=##|\n\n\w|$)'
-            ],
-            "rugpull_mechanisms": [
-                r'rugpull mechanisms?.*?(?=##|\n\n\w|$)',
-                r'rug pull.*?(?=##|\n\n\w|$)'
-            ],
-            "honeypot_patterns": [
-                r'honeypot patterns?.*?(?=##|\n\n\w|$)'
-            ],
-            "fee_manipulation": [
-                r'fee manipulation.*?(?=##|\n\n\w|$)'
-            ],
-            "ownership_concentration": [
-                r'ownership concentration.*?(?=##|\n\n\w|$)',
-                r'centralized control.*?(?=##|\n\n\w|$)'
-            ]
-        }
-        
-        # Extract findings for each category
-        for category, patterns in section_patterns.items():
-            for pattern in patterns:
-                matches = re.search(pattern, response, re.IGNORECASE | re.DOTALL)
-                if matches:
-                    section_text = matches.group(0)
-                    
-                    # Skip if "No X detected" or "No X found" or "No X vulnerabilities"
-                    if re.search(r'no .*(detected|found|vulnerabilities|issues)', section_text, re.IGNORECASE):
-                        continue
-                    
-                    # Extract individual findings
-                    findings = self._extract_findings(section_text)
-                    
-                    # Determine which dictionary to update
-                    if category in ["unauthorized_access", "reentrancy", "integer_overflow", "improper_validation", "insecure_randomness"]:
-                        security_vulnerabilities[category].extend(findings)
-                    else:
-                        malicious_behavior[category].extend(findings)
-        
         return {
             "security_vulnerabilities": security_vulnerabilities,
             "malicious_behavior": malicious_behavior,
-            "overall_risk_score": risk_score,
-            "summary": self._extract_summary(response),
-            "raw_llm_response": response
+            "overall_risk_score": min(10, max(0, analysis["overall_risk_score"])),
+            "summary": analysis["summary"] or "Analysis completed. See detailed findings for more information.",
+            "raw_llm_response": json.dumps(analysis)
         }
     
-    def _extract_findings(self, section_text: str) -> List[Dict[str, str]]:
-        """
-        Extract individual findings from a section of the LLM response.
-        
-        Args:
-            section_text (str): Text of a section from the LLM response
-            
-        Returns:
-            List[Dict[str, str]]: List of findings with details
-        """
-        findings = []
-        
-        # Look for bullet points or numbered items
-        import re
-
-        # Pattern to match file and line information
-        file_line_pattern = r'(?:found in|file:?)\s+([a-zA-Z0-9_\-/.]+)(?:,?\s+lines?:?\s+(\d+(?:-\d+)?))?\b'
-        
-        # Split by bullet points or numbered items
-        items = re.split(r'\n\s*[-*]\s+|\n\s*\d+\.\s+', section_text)
-        
-        for item in items:
-            if not item.strip():
-                continue
-                
-            finding = {
-                "description": item.strip(),
-                "severity": "unknown",
-                "file": "unknown",
-                "lines": "unknown"
-            }
-            
-            # Extract severity
-            severity_match = re.search(r'severity:?\s*(critical|high|medium|low|info)', item, re.IGNORECASE)
-            if severity_match:
-                finding["severity"] = severity_match.group(1).lower()
-            elif "critical" in item.lower():
-                finding["severity"] = "critical"
-            elif "high" in item.lower():
-                finding["severity"] = "high"
-            elif "medium" in item.lower() or "moderate" in item.lower():
-                finding["severity"] = "medium"
-            elif "low" in item.lower():
-                finding["severity"] = "low"
-            
-            # Extract file and line information
-            file_line_match = re.search(file_line_pattern, item, re.IGNORECASE)
-            if file_line_match:
-                finding["file"] = file_line_match.group(1)
-                if file_line_match.group(2):
-                    finding["lines"] = file_line_match.group(2)
-            
-            findings.append(finding)
-        
-        # If no items were found but there's content, add the whole section as one finding
-        if not findings and section_text.strip():
-            finding = {
-                "description": section_text.strip(),
-                "severity": "unknown",
-                "file": "unknown",
-                "lines": "unknown"
-            }
-            
-            # Extract severity, file, and line information from the whole section
-            severity_match = re.search(r'severity:?\s*(critical|high|medium|low|info)', section_text, re.IGNORECASE)
-            if severity_match:
-                finding["severity"] = severity_match.group(1).lower()
-            
-            file_line_match = re.search(file_line_pattern, section_text, re.IGNORECASE)
-            if file_line_match:
-                finding["file"] = file_line_match.group(1)
-                if file_line_match.group(2):
-                    finding["lines"] = file_line_match.group(2)
-            
-            findings.append(finding)
-        
-        return findings
-    
-    def _extract_summary(self, response: str) -> str:
-        """
-        Extract a summary from the LLM response.
-        
-        Args:
-            response (str): The LLM's response
-            
-        Returns:
-            str: Summary of the analysis
-        """
-        # Look for a summary section
-        import re
-        summary_match = re.search(r'summary:?\s*(.*?)(?=##|\n\n\w|$)', response, re.IGNORECASE | re.DOTALL)
-        
-        if summary_match:
-            return summary_match.group(1).strip()
-        
-        # If no summary section, look for recommendations
-        recommendations_match = re.search(r'recommendations:?\s*(.*?)(?=##|\n\n\w|$)', response, re.IGNORECASE | re.DOTALL)
-        
-        if recommendations_match:
-            return "Recommendations: " + recommendations_match.group(1).strip()
-        
-        # If no summary or recommendations, return a generic summary
-        return "Analysis completed. See detailed findings for more information."
-    
     def get_analysis_stats(self) -> Dict[str, Any]:
         """
         Get statistics about the analysis.
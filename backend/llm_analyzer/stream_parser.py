@@ -0,0 +1,91 @@
+import json
+from typing import List, Optional
+
+
+class LineVerdictParser:
+    """
+    Incremental parser for the verdicts of a line-by-line analysis, fed with chunks of a streamed
+    LLM response. Verdicts may be `{"line": ..., "assessment": ..., "explanation": ...}` objects
+    (structured output) or `[line_number, "good"/"bad", "explanation"]` tuples, and are always
+    emitted as `[line_number, "good"/"bad", "explanation"]`.
+
+    The parser tracks JSON strings and bracket nesting as text arrives, so each verdict can be
+    emitted as soon as its closing bracket is seen. It works whether the verdicts are wrapped in
+    `{"lines": [...]}` or sent as a bare array, and ignores anything that isn't a valid verdict.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._in_string = False
+        self._escaped = False
+        # One entry per open array or object: [start offset in the buffer, opening bracket, whether it contains a nested one]
+        self._open = []
+        self._length = 0
+
+    def feed(self, text: str) -> List[list]:
+        """
+        Feed the next chunk of the response.
+
+        Args:
+            text (str): Newly received text
+
+        Returns:
+            List[list]: Verdicts completed by this chunk, in order
+        """
+        verdicts = []
+
+        for char in text:
+            self._buffer.append(char)
+            self._length += 1
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                if self._open:
+                    self._open[-1][2] = True
+                self._open.append([self._length - 1, char, False])
+            elif char in "]}" and self._open:
+                start, _, has_nested = self._open.pop()
+                # Verdicts are innermost arrays or objects sitting inside an array
+                if not has_nested and self._open and self._open[-1][1] == "[":
+                    verdict = self._parse_verdict("".join(self._buffer[start:]))
+                    if verdict is not None:
+                        verdicts.append(verdict)
+
+        # Nothing before the outermost open bracket can be part of a verdict anymore
+        if not self._open and not self._in_string:
+            self._buffer = []
+            self._length = 0
+
+        return verdicts
+
+    @staticmethod
+    def _parse_verdict(text: str) -> Optional[list]:
+        """Parse a candidate verdict array or object into `[line_number, "good"/"bad", "explanation"]`, or return None."""
+        try:
+            value = json.loads(text)
+        except ValueError:
+            return None
+
+        if isinstance(value, dict):
+            value = [value.get("line"), value.get("assessment"), value.get("explanation")]
+
+        if len(value) < 3 or not isinstance(value[1], str) or not isinstance(value[2], str):
+            return None
+        if value[1].lower() not in ("good", "bad"):
+            return None
+        try:
+            line_number = int(value[0])
+        except (TypeError, ValueError):
+            return None
+
+        return [line_number, value[1].lower(), value[2]]
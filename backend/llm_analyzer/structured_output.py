@@ -0,0 +1,219 @@
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_analyzer.prompt_builder import PromptBuilder
+
+# Finding categories of the security analysis, as returned to callers
+SECURITY_VULNERABILITY_CATEGORIES = [
+    "unauthorized_access",
+    "reentrancy",
+    "integer_overflow",
+    "improper_validation",
+    "insecure_randomness"
+]
+
+MALICIOUS_BEHAVIOR_CATEGORIES = [
+    "backdoors",
+    "rugpull_mechanisms",
+    "honeypot_patterns",
+    "fee_manipulation",
+    "ownership_concentration"
+]
+
+
+def _object(properties: Dict[str, Dict]) -> Dict:
+    """Build a strict object schema where every property is required."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+
+def _array(items: Dict) -> Dict:
+    return {"type": "array", "items": items}
+
+
+_STRING = {"type": "string"}
+
+_FINDING = _object({
+    "description": _STRING,
+    "severity": {"type": "string", "enum": ["critical", "high", "medium", "low", "info"]},
+    "file": _STRING,
+    "lines": _STRING
+})
+
+# Ranked files picked for the security analysis (SolanaSecurityAnalyzer._parse_file_selection_response)
+FILE_SELECTION_SCHEMA = _object({
+    "files": _array(_object({"path": _STRING, "reason": _STRING}))
+})
+
+# Single file picked for the line-by-line analysis
+SINGLE_FILE_SELECTION_SCHEMA = _object({
+    "selected_file": _STRING,
+    "reason": _STRING
+})
+
+# Full security analysis (SolanaSecurityAnalyzer._parse_security_analysis_response)
+SECURITY_ANALYSIS_SCHEMA = _object({
+    "security_vulnerabilities": _object({category: _array(_FINDING) for category in SECURITY_VULNERABILITY_CATEGORIES}),
+    "malicious_behavior": _object({category: _array(_FINDING) for category in MALICIOUS_BEHAVIOR_CATEGORIES}),
+    "overall_risk_score": {"type": "integer"},
+    "summary": _STRING
+})
+
+# Line-by-line analysis. Strict schemas can't express tuples, so each verdict is an object
+LINE_ANALYSIS_SCHEMA = _object({
+    "lines": _array(_object({
+        "line": {"type": "integer"},
+        "assessment": {"type": "string", "enum": ["good", "bad"]},
+        "explanation": _STRING
+    })),
+    "summary": _STRING
+})
+
+# Short descriptions of repository files, keyed by path
+FILE_DESCRIPTIONS_SCHEMA = _object({
+    "descriptions": _array(_object({"path": _STRING, "description": _STRING}))
+})
+
+
+class StructuredOutputError(ValueError):
+    """Raised when an LLM response doesn't match its schema, even after a repair attempt."""
+
+    def __init__(self, message: str, errors: List[str], response: str):
+        super().__init__(message)
+        self.errors = errors
+        self.response = response
+
+
+def response_format(name: str, schema: Dict) -> Dict:
+    """
+    Build the `response_format` argument requesting strict JSON-schema output.
+
+    Args:
+        name (str): Name of the schema
+        schema (Dict): The JSON schema
+
+    Returns:
+        Dict: The response_format for the chat completions API
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "schema": schema, "strict": True}
+    }
+
+
+def validate(instance: Any, schema: Dict, path: str = "$") -> List[str]:
+    """
+    Strictly validate a value against the subset of JSON schema used above
+    (object, array, string, integer, number, boolean and enum).
+
+    Args:
+        instance (Any): The decoded JSON value
+        schema (Dict): The JSON schema
+        path (str): Location of the value, used in error messages
+
+    Returns:
+        List[str]: Validation errors (empty if the value is valid)
+    """
+    expected = schema.get("type")
+
+    if expected == "object":
+        if not isinstance(instance, dict):
+            return [f"{path}: expected an object"]
+        errors = []
+        properties = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in instance:
+                errors.append(f"{path}: missing required property '{key}'")
+        if schema.get("additionalProperties") is False:
+            for key in instance:
+                if key not in properties:
+                    errors.append(f"{path}: unexpected property '{key}'")
+        for key, value in instance.items():
+            if key in properties:
+                errors.extend(validate(value, properties[key], f"{path}.{key}"))
+        return errors
+
+    if expected == "array":
+        if not isinstance(instance, list):
+            return [f"{path}: expected an array"]
+        errors = []
+        for index, item in enumerate(instance):
+            errors.extend(validate(item, schema.get("items", {}), f"{path}[{index}]"))
+        return errors
+
+    if expected == "string" and not isinstance(instance, str):
+        return [f"{path}: expected a string"]
+    # bool is a subclass of int, so exclude it explicitly
+    if expected == "integer" and (not isinstance(instance, int) or isinstance(instance, bool)):
+        return [f"{path}: expected an integer"]
+    if expected == "number" and (not isinstance(instance, (int, float)) or isinstance(instance, bool)):
+        return [f"{path}: expected a number"]
+    if expected == "boolean" and not isinstance(instance, bool):
+        return [f"{path}: expected a boolean"]
+
+    if "enum" in schema and instance not in schema["enum"]:
+        return [f"{path}: expected one of {schema['enum']}"]
+
+    return []
+
+
+def parse_structured_response(response: str, schema: Dict) -> Any:
+    """
+    Decode and validate a structured LLM response in a single pass.
+
+    Args:
+        response (str): The raw LLM response
+        schema (Dict): The JSON schema it must match
+
+    Returns:
+        Any: The decoded value
+
+    Raises:
+        StructuredOutputError: If the response isn't valid JSON or doesn't match the schema
+    """
+    try:
+        value = json.loads(response)
+    except (TypeError, ValueError) as e:
+        raise StructuredOutputError(f"Response is not valid JSON: {str(e)}", [f"$: invalid JSON ({str(e)})"], response)
+
+    errors = validate(value, schema)
+    if errors:
+        raise StructuredOutputError(f"Response does not match the schema: {'; '.join(errors[:5])}", errors, response)
+    return value
+
+
+def build_repair_prompt(prompt: str, error: StructuredOutputError, prompt_builder: Optional[PromptBuilder] = None) -> str:
+    """
+    Build a follow-up prompt asking the LLM to fix a response that failed validation.
+
+    Args:
+        prompt (str): The original prompt
+        error (StructuredOutputError): The validation failure
+        prompt_builder (Optional[PromptBuilder]): Budget of the prompt. If given, the previous response
+            is cut to whatever is left of it after the original prompt and the instructions
+
+    Returns:
+        str: The repair prompt
+    """
+    problems = "\n".join(f"- {problem}" for problem in error.errors[:20])
+    header = (
+        f"{prompt}\n\n"
+        "Your previous response did not match the required JSON schema:\n"
+        f"{problems}\n\n"
+        "Previous response:\n"
+    )
+    footer = "\n\nRespond again with only the corrected JSON."
+
+    response = error.response
+    if prompt_builder is not None:
+        response = prompt_builder.truncate(response, prompt_builder.remaining_budget(header, footer))
+        if not response:
+            response = "(omitted, too long)"
+    return header + response + footer
@@ -19,6 +19,16 @@ sys.path.append(parent_dir)
 # Import the analyzer modules
 from llm_analyzer.security_analyzer import SolanaSecurityAnalyzer
 from github_fetcher.github_fetcher import GitHubFetcher
+from llm_analyzer.prompt_builder import PATH_TRIE_NOTATION
+from llm_analyzer.stream_parser import LineVerdictParser
+from llm_analyzer.structured_output import (
+    LINE_ANALYSIS_SCHEMA,
+    SINGLE_FILE_SELECTION_SCHEMA,
+    StructuredOutputError,
+    build_repair_prompt,
+    parse_structured_response,
+    response_format,
+)
 
 def print_section(title):
     """Print a section header to make the output more readable."""
@@ -30,17 +40,19 @@ def print_step(step_number, description):
     """Print a step header to make the output more readable."""
     print(f"\n--- STEP {step_number}: {description} ---")
 
-def analyze_repository_line_by_line(repo_url, llm_provider="openai", model_name="gpt-4o-mini-2024-07-18"):
+def prepare_line_by_line_analysis(repo_url, llm_provider="openai", model_name="gpt-4o-mini-2024-07-18", analyzer=None):
     """
-    Analyze a Solana repository for security vulnerabilities using line-by-line analysis.
+    Select the most important file of a repository and build the line-by-line analysis prompt for it
+    (steps 1-8 of the line-by-line analysis).
     
     Args:
         repo_url (str): URL of the GitHub repository to analyze
         llm_provider (str): The LLM provider to use (e.g., "openai")
         model_name (str): The name of the model to use
+        analyzer (Optional[SolanaSecurityAnalyzer]): An existing analyzer to reuse. If None, a new one is created
         
     Returns:
-        Dict[str, Any]: Analysis results
+        Dict[str, Any]: Analysis context (analyzer, selected file, analyzed lines and prompt), or {"error": ...}
     """
     print_section("INITIALIZING")
     print(f"Repository URL: {repo_url}")
@@ -49,10 +61,18 @@ def analyze_repository_line_by_line(repo_url, llm_provider="openai", model_name=
     
     start_time = time.time()
     
-    # Step 1: Initialize the analyzer
+    # Step 1: Initialize the analyzer (or reuse the one we were given)
     print_step(1, "Initializing the SolanaSecurityAnalyzer")
-    analyzer = SolanaSecurityAnalyzer(llm_provider=llm_provider, model_name=model_name)
-    print(f"Analyzer initialized with {llm_provider} provider and {model_name} model")
+    if analyzer is None:
+        analyzer = SolanaSecurityAnalyzer(llm_provider=llm_provider, model_name=model_name)
+        print(f"Analyzer initialized with {llm_provider} provider and {model_name} model")
+    else:
+        llm_provider = analyzer.llm_provider
+        model_name = analyzer.model_name
+        print(f"Reusing analyzer with {llm_provider} provider and {model_name} model")
+    
+    # The analyzer may be shared across scans, so only count the calls made by this one
+    llm_api_calls_before = analyzer.llm_api_calls
     
     # Step 2: Initialize the GitHub fetcher
     print_step(2, "Initializing the GitHubFetcher")
@@ -75,58 +95,52 @@ def analyze_repository_line_by_line(repo_url, llm_provider="openai", model_name=
     
     # Step 4: Prepare the prompt for file selection
     print_step(4, "Preparing prompt for file selection")
-    file_selection_prompt = f"""
+    prompt_builder = analyzer.prompt_builder
+    selection_header = f"""
 You are a security expert specializing in Solana blockchain programs. Your task is to select the single most important file for security analysis.
 
 Repository URL: {repo_url}
 
 Examine the repository structure below and identify which file is most likely to contain Solana program code (typically Rust files, especially those in 'programs' directories, or files like Anchor.toml).
 
-Repository Structure:
-{json.dumps(repo_structure['structure'], indent=2)[:3000]}  # Truncated to avoid token limits
-
+Repository Structure ({PATH_TRIE_NOTATION}):
+"""
+    selection_footer = """
 Based on the structure, select the SINGLE most important file that is most likely to contain security vulnerabilities or malicious behavior in Solana program code.
 
-IMPORTANT: Format your response exactly as shown below. Do NOT use backticks, asterisks, or any other markdown formatting in the file path:
-
-Selected file: file_path
-Reason: brief explanation of why you selected this file
-
-The file path should be exactly as it appears in the repository structure, with no additional formatting.
+Respond with JSON containing "selected_file" and "reason" (a brief explanation of why you selected this file).
+The file path must be written out in full, exactly as it appears in the repository, with no additional formatting.
 """
+    # Compact the structure and keep the highest-priority files that fit the budget
+    structure_budget = prompt_builder.remaining_budget(selection_header, selection_footer)
+    encoded_structure = prompt_builder.encode_structure(repo_structure['structure'], structure_budget)
+    file_selection_prompt = selection_header + encoded_structure + "\n" + selection_footer
     print("File selection prompt prepared")
     
     # Step 5: Call the LLM API to select the most important file
     print_step(5, "Calling LLM API to select the most important file")
     print(f"Sending request to {llm_provider} API ({model_name})...")
-    file_selection_response = analyzer._call_llm_api(file_selection_prompt)
+    repo_paths = {f['path'] for f in repo_structure['files']}
+    
+    def validate_selection(selection):
+        if selection["selected_file"].strip() not in repo_paths:
+            return [f"$.selected_file: '{selection['selected_file']}' is not a file in the repository"]
+        return []
+    
+    try:
+        file_selection = analyzer._call_llm_structured(
+            file_selection_prompt, "file_selection", SINGLE_FILE_SELECTION_SCHEMA, validator=validate_selection
+        )
+    except StructuredOutputError as e:
+        print(f"Error: Could not determine which file to analyze: {str(e)}")
+        return {"error": "Could not determine which file to analyze"}
     print("\nLLM Response for file selection:")
-    print(file_selection_response)
+    print(file_selection)
     
     # Step 6: Parse the file selection response
     print_step(6, "Parsing file selection response")
-    # Extract the selected file path using regex
-    import re
-    selected_file_match = re.search(r'Selected file:?\s*([^\n]+)', file_selection_response)
-    
-    if selected_file_match:
-        selected_file = selected_file_match.group(1).strip()
-        print(f"Selected file: {selected_file}")
-    else:
-        # Fallback: try to find any file path in the response
-        file_path_match = re.search(r'([a-zA-Z0-9_\-/.]+\.(rs|toml|json|js|ts|py))', file_selection_response)
-        if file_path_match:
-            selected_file = file_path_match.group(0)
-            print(f"Selected file (fallback method): {selected_file}")
-        else:
-            # Last resort: use the first Rust file in the repository
-            rust_files = [f['path'] for f in repo_structure['files'] if f['path'].endswith('.rs')]
-            if rust_files:
-                selected_file = rust_files[0]
-                print(f"Selected file (last resort): {selected_file}")
-            else:
-                print("Error: Could not determine which file to analyze")
-                return {"error": "Could not determine which file to analyze"}
+    selected_file = file_selection["selected_file"].strip()
+    print(f"Selected file: {selected_file}")
     
     # Step 7: Fetch content of the selected file
     print_step(7, "Fetching content of the selected file")
@@ -144,21 +158,7 @@ The file path should be exactly as it appears in the repository structure, with
     # Step 8: Prepare the prompt for line-by-line analysis
     print_step(8, "Preparing prompt for line-by-line analysis")
     
-    # Limit to first 250 lines to avoid token limits
-    file_lines = file_content.split('\n')
-    lines_to_analyze = file_lines[:250]
-    
-    print(f"Analyzing first {len(lines_to_analyze)} lines of {len(file_lines)} total lines")
-    
-    # Create a numbered version of the code for the prompt
-    numbered_code = ""
-    for i, line in enumerate(lines_to_analyze, 1):
-        numbered_code += f"{i}: {line}\n"
-    
-    # Escape any curly braces in the code to avoid f-string formatting issues
-    numbered_code = numbered_code.replace("{", "{{").replace("}", "}}")
-    
-    line_analysis_prompt = f"""
+    analysis_header = f"""
 You are a security expert specializing in Solana blockchain programs. Your task is to analyze the following Solana code for security vulnerabilities and malicious behavior, line by line.
 
 Repository URL: {repo_url}
@@ -166,116 +166,111 @@ File: {selected_file}
 
 Below is the code with line numbers. For each line that contains a security-relevant pattern (either good or bad), provide an assessment.
 
-{numbered_code}
-
+"""
+    analysis_footer = """
 For each security-relevant line, provide:
 1. The line number
 2. Whether it's a "good" or "bad" practice
 3. A brief explanation of why
 
-Format your response as a JSON array of arrays, where each inner array contains:
-[line_number, "good"/"bad", "explanation"]
-
-For example:
-[
-  [12, "good", "Proper validation of account ownership"],
-  [25, "bad", "Missing input validation, could lead to integer overflow"],
-  [37, "good", "Correctly checks for signer authorization"]
-]
-
-After the line-by-line analysis, provide a summary of the overall security posture of the code, which would include overview, vulnerabilities and recommendations.
-Format your response as follows:
+Respond with JSON containing a "lines" array of objects with "line", "assessment" ("good" or "bad") and "explanation", for example:
+{"line": 25, "assessment": "bad", "explanation": "Missing input validation, could lead to integer overflow"}
 
-```json
-{{
-  "lines": [
-    [line_number, "good"/"bad", "explanation"],
-    ...
-  ],
-  "summary": "## Summary\n\nOverall assessment of the code's security\n\n## Vulnerabilities\n<vulnerabilities>\n\n## Recommendations\n<recommendations>"
-}}
-```
+After the line-by-line analysis, provide a "summary" of the overall security posture of the code, which would include overview, vulnerabilities and recommendations, formatted as:
+"## Summary\n\nOverall assessment of the code's security\n\n## Vulnerabilities\n<vulnerabilities>\n\n## Recommendations\n<recommendations>"
 """
-    print("Line-by-line analysis prompt prepared")
-    
-    # Step 9: Call the LLM API for line-by-line analysis
-    print_step(9, "Calling LLM API for line-by-line analysis")
-    print(f"Sending request to {llm_provider} API ({model_name})...")
-    line_analysis_response = analyzer._call_llm_api(line_analysis_prompt)
-    print("\nLLM Response for line-by-line analysis (preview):")
-    response_preview = line_analysis_response[:500] + "..." if len(line_analysis_response) > 500 else line_analysis_response
-    print(response_preview)
     
-    # Step 10: Parse the line-by-line analysis response
-    print_step(10, "Parsing line-by-line analysis response")
+    # Analyze at most the first 250 lines, and fewer if they don't fit the context budget
+    file_lines = file_content.split('\n')
+    numbered_lines = [f"{i}: {line}" for i, line in enumerate(file_lines, 1)]
+    code_budget = prompt_builder.remaining_budget(analysis_header, analysis_footer)
+    numbered_lines = prompt_builder.pack_lines(numbered_lines, code_budget, max_lines=250)
+    lines_to_analyze = file_lines[:len(numbered_lines)]
     
-    # Extract the JSON part of the response
-    json_match = re.search(r'```json\s*(.*?)\s*```', line_analysis_response, re.DOTALL)
+    print(f"Analyzing first {len(lines_to_analyze)} lines of {len(file_lines)} total lines")
     
-    if json_match:
-        json_str = json_match.group(1)
-        try:
-            analysis_results = json.loads(json_str)
-            print("Successfully parsed JSON response")
-        except json.JSONDecodeError:
-            print("Error: Could not parse JSON response, trying fallback method")
-            # Fallback: try to extract the lines and summary separately
-            analysis_results = {"lines": [], "summary": ""}
-            
-            # Try to extract lines
-            lines_match = re.search(r'"lines":\s*(\[\s*\[.*?\]\s*\])', line_analysis_response, re.DOTALL)
-            if lines_match:
-                try:
-                    lines_str = lines_match.group(1)
-                    analysis_results["lines"] = json.loads(lines_str)
-                    print(f"Extracted {len(analysis_results['lines'])} lines using fallback method")
-                except:
-                    print("Error: Could not parse lines using fallback method")
-            
-            # Try to extract summary
-            summary_match = re.search(r'"summary":\s*"(.*?)"', line_analysis_response, re.DOTALL)
-            if summary_match:
-                analysis_results["summary"] = summary_match.group(1)
-                print("Extracted summary using fallback method")
-    else:
-        # If no JSON format is found, try to parse the response as best as possible
-        print("Error: Could not find JSON in response, using best-effort parsing")
-        
-        # Initialize results
-        analysis_results = {"lines": [], "summary": ""}
-        
-        # Look for line numbers followed by "good" or "bad"
-        line_pattern = r'(\d+)[^\n]*?(good|bad)[^\n]*?:?\s*([^\n]+)'
-        line_matches = re.findall(line_pattern, line_analysis_response, re.IGNORECASE)
-        
-        for match in line_matches:
-            line_num = int(match[0])
-            assessment = match[1].lower()
-            explanation = match[2].strip()
-            analysis_results["lines"].append([line_num, assessment, explanation])
-        
-        print(f"Extracted {len(analysis_results['lines'])} lines using regex pattern")
-        
-        # Try to extract a summary
-        summary_match = re.search(r'summary:?\s*([^\n]+(?:\n[^\n]+)*)', line_analysis_response, re.IGNORECASE)
-        if summary_match:
-            analysis_results["summary"] = summary_match.group(1).strip()
-            print("Extracted summary using regex pattern")
+    line_analysis_prompt = analysis_header + "\n".join(numbered_lines) + "\n" + analysis_footer
+    print("Line-by-line analysis prompt prepared")
     
-    # Add metadata to the results
-    analysis_results["metadata"] = {
-        "repository_url": repo_url,
-        "analyzed_file": selected_file,
-        "analysis_time": time.time() - start_time,
+    return {
+        "analyzer": analyzer,
+        "repo_url": repo_url,
         "llm_provider": llm_provider,
         "model_name": model_name,
-        "llm_api_calls": analyzer.llm_api_calls
+        "selected_file": selected_file,
+        "lines_to_analyze": lines_to_analyze,
+        "prompt": line_analysis_prompt,
+        "start_time": start_time,
+        "llm_api_calls_before": llm_api_calls_before
+    }
+
+def parse_line_analysis_response(line_analysis):
+    """
+    Convert the LLM's (validated) line-by-line analysis response into the results format.
+    
+    Args:
+        line_analysis (Dict[str, Any]): The decoded line-by-line analysis (see LINE_ANALYSIS_SCHEMA)
+        
+    Returns:
+        Dict[str, Any]: Parsed results with "lines" ([line_number, "good"/"bad", "explanation"] lists) and "summary"
+    """
+    return {
+        "lines": [[verdict["line"], verdict["assessment"], verdict["explanation"]] for verdict in line_analysis["lines"]],
+        "summary": line_analysis["summary"]
     }
+
+def _finalize_line_analysis(context, analysis_results):
+    """Attach metadata and the analyzed source to parsed line-by-line results."""
+    analyzer = context["analyzer"]
+    analysis_results["metadata"] = {
+        "repository_url": context["repo_url"],
+        "analyzed_file": context["selected_file"],
+        "analysis_time": time.time() - context["start_time"],
+        "llm_provider": context["llm_provider"],
+        "model_name": context["model_name"],
+        "llm_api_calls": analyzer.llm_api_calls - context["llm_api_calls_before"]
+    }
+    
+    # Keep the exact source that was analyzed so callers don't have to fetch the file again
+    analysis_results["raw_code"] = "\n".join(context["lines_to_analyze"])
+    return analysis_results
+
+def analyze_repository_line_by_line(repo_url, llm_provider="openai", model_name="gpt-4o-mini-2024-07-18", analyzer=None):
+    """
+    Analyze a Solana repository for security vulnerabilities using line-by-line analysis.
+    
+    Args:
+        repo_url (str): URL of the GitHub repository to analyze
+        llm_provider (str): The LLM provider to use (e.g., "openai")
+        model_name (str): The name of the model to use
+        analyzer (Optional[SolanaSecurityAnalyzer]): An existing analyzer to reuse. If None, a new one is created
+        
+    Returns:
+        Dict[str, Any]: Analysis results, including the analyzed source under "raw_code"
+    """
+    context = prepare_line_by_line_analysis(repo_url, llm_provider, model_name, analyzer)
+    if "error" in context:
+        return context
+    
+    # Step 9: Call the LLM API for line-by-line analysis
+    print_step(9, "Calling LLM API for line-by-line analysis")
+    print(f"Sending request to {context['llm_provider']} API ({context['model_name']})...")
+    try:
+        line_analysis = context["analyzer"]._call_llm_structured(context["prompt"], "line_analysis", LINE_ANALYSIS_SCHEMA)
+    except StructuredOutputError as e:
+        print(f"Error: Could not parse line-by-line analysis: {str(e)}")
+        return {"error": f"Could not parse line-by-line analysis: {str(e)}"}
+    print(f"\nLLM returned {len(line_analysis['lines'])} line verdicts")
+    
+    # Step 10: Parse the line-by-line analysis response
+    print_step(10, "Parsing line-by-line analysis response")
+    analysis_results = parse_line_analysis_response(line_analysis)
+    analysis_results = _finalize_line_analysis(context, analysis_results)
     
     # Step 11: Print the results
     print_step(11, "Printing analysis results")
     
-    print(f"\nAnalyzed file: {selected_file}")
+    print(f"\nAnalyzed file: {context['selected_file']}")
     print(f"Analysis time: {analysis_results['metadata']['analysis_time']:.2f} seconds")
     print(f"LLM API calls: {analysis_results['metadata']['llm_api_calls']}")
     
@@ -290,6 +285,67 @@ Format your response as follows:
     
     return analysis_results
 
+def stream_repository_line_by_line(repo_url, llm_provider="openai", model_name="gpt-4o-mini-2024-07-18", analyzer=None):
+    """
+    Streaming variant of analyze_repository_line_by_line. Yields each line verdict as soon as the
+    LLM has finished generating it, instead of waiting for the whole completion.
+    
+    Args:
+        repo_url (str): URL of the GitHub repository to analyze
+        llm_provider (str): The LLM provider to use (e.g., "openai")
+        model_name (str): The name of the model to use
+        analyzer (Optional[SolanaSecurityAnalyzer]): An existing analyzer to reuse. If None, a new one is created
+        
+    Yields:
+        Dict[str, Any]: Events, in order: one "source" event (analyzed file and code), a "line" event per
+        [line_number, "good"/"bad", "explanation"] verdict, and a final "result" event with the full
+        results (same format as analyze_repository_line_by_line). The result event's "superseded" is True
+        if the streamed response failed validation and was repaired, in which case its verdicts replace the
+        streamed ones. On failure a single "error" event is yielded.
+    """
+    context = prepare_line_by_line_analysis(repo_url, llm_provider, model_name, analyzer)
+    if "error" in context:
+        yield {"type": "error", "error": context["error"]}
+        return
+    
+    yield {
+        "type": "source",
+        "analyzed_file": context["selected_file"],
+        "raw_code": "\n".join(context["lines_to_analyze"])
+    }
+    
+    print_step(9, "Streaming line-by-line analysis from the LLM")
+    parser = LineVerdictParser()
+    response_chunks = []
+    format_spec = response_format("line_analysis", LINE_ANALYSIS_SCHEMA)
+    for delta in context["analyzer"]._stream_llm_api(context["prompt"], response_format=format_spec):
+        response_chunks.append(delta)
+        for verdict in parser.feed(delta):
+            yield {"type": "line", "line": verdict}
+    
+    # The summary is only complete at the end, so validate the full response once
+    print_step(10, "Parsing line-by-line analysis response")
+    analyzer = context["analyzer"]
+    superseded = False
+    try:
+        line_analysis = parse_structured_response("".join(response_chunks), LINE_ANALYSIS_SCHEMA)
+    except StructuredOutputError as e:
+        # Only a response that breaks the schema costs a second (non-streamed) call, and only one:
+        # the repair prompt is sent as is rather than through _call_llm_structured, which could repair it again
+        print(f"Warning: line_analysis response failed validation ({str(e)}), asking the LLM to repair it...")
+        try:
+            response = analyzer._call_llm_api(
+                build_repair_prompt(context["prompt"], e, analyzer.prompt_builder), response_format=format_spec
+            )
+            line_analysis = analyzer._validate_structured_response(response, LINE_ANALYSIS_SCHEMA)
+        except StructuredOutputError as e:
+            yield {"type": "error", "error": f"Could not parse line-by-line analysis: {str(e)}"}
+            return
+        # The verdicts streamed so far came from the invalid response
+        superseded = True
+    analysis_results = parse_line_analysis_response(line_analysis)
+    yield {"type": "result", "result": _finalize_line_analysis(context, analysis_results), "superseded": superseded}
+
 if __name__ == "__main__":
     print_section("SOLANA SECURITY ANALYZER - LINE-BY-LINE ANALYSIS TEST")
     
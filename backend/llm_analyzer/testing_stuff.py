@@ -10,6 +10,7 @@ import re
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from github_fetcher.github_fetcher import GitHubFetcher
 from llm_analyzer.security_analyzer import SolanaSecurityAnalyzer
+from llm_analyzer.structured_output import FILE_SELECTION_SCHEMA
 
 # Test repository URL
 # TEST_REPO_URL = "https://github.com/solana-developers/CRUD-dApp"
@@ -72,7 +73,7 @@ def test_file_selection():
         # Call the LLM API to select files
         print("Asking LLM to select files for analysis...")
         start_time = time.time()
-        file_selection_response = analyzer._call_llm_api(file_selection_prompt)
+        file_selection_response = analyzer._call_llm_structured(file_selection_prompt, "file_selection", FILE_SELECTION_SCHEMA)
 
         print(file_selection_response)
         return
@@ -126,7 +127,7 @@ def test_file_selection_hybrid():
         # Call the LLM API to select files
         print("Asking LLM to select files for analysis...")
         start_time = time.time()
-        file_selection_response = analyzer._call_llm_api(file_selection_prompt)
+        file_selection_response = analyzer._call_llm_structured(file_selection_prompt, "file_selection", FILE_SELECTION_SCHEMA)
         
         print("\nLLM Response (Hybrid Approach):")
         print(file_selection_response)
@@ -177,7 +178,7 @@ def test_file_selection_structure():
         # Call the LLM API to select files
         print("Asking LLM to select files for analysis...")
         start_time = time.time()
-        file_selection_response = analyzer._call_llm_api(file_selection_prompt)
+        file_selection_response = analyzer._call_llm_structured(file_selection_prompt, "file_selection", FILE_SELECTION_SCHEMA)
         
         print("\nLLM Response (Structure-Only Approach):")
         print(file_selection_response)
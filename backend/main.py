@@ -1,8 +1,10 @@
+import asyncio
 import os
-import pickle
 import sys
+import threading
 from collections import defaultdict
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
 from fastapi import FastAPI
@@ -25,12 +27,13 @@ sys.path.append(parent_dir)
 
 from datetime import datetime
 
-from backend.agents.nft_recommendation.market_nft_trends import main
 from backend.failed_transactions import (
     get_minting_activity_query_by_minutes,
     get_trading_activity_query_by_minutes,
     get_transaction_fees_and_failure_df,
 )
+from backend.market_digest import MarketDigest
+from backend.predictors import predict_failed_tx
 from backend.tps_nft_data import get_tps
 
 app = FastAPI()
@@ -44,30 +47,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load the saved model and scaler
-model_dir = Path(__file__).resolve().parent / "models"
-model_path = model_dir / "xgboost_model.pkl"
-scaler_path = model_dir / "scaler.pkl"
 import random
 
-with open(model_path, 'rb') as file:
-    model = pickle.load(file)
-with open(scaler_path, 'rb') as file:
-    scaler = pickle.load(file)
+# Models are loaded on first prediction (and then kept), not at import
+
+# NFT trend analysis and news headlines are refreshed in the background, so requests never wait on a scrape
+market_digest = MarketDigest()
+
+@app.on_event("startup")
+async def start_market_digest():
+    market_digest.start()
+
+@app.on_event("shutdown")
+async def stop_market_digest():
+    await market_digest.stop()
 
 @app.get('/api/nft-analysis')
 async def get_nft_analysis():
-    try:
-        # Get both sentiment and market trends data
-        result = main()
-        print(result)
-        return result
-    
-    except Exception as e:
+    analysis = market_digest.get("nft_analysis")
+    if analysis is None:
+        # The first refresh hasn't finished yet
         return {
-            "status": "error",
-            "message": str(e)
-}
+            "reasoning": "No market data available",
+            "sentiment_score": 0,
+            "updated_at": None
+        }
+    return analysis
 
 @app.get("/api/transaction-fees")
 async def get_transaction_fees():
@@ -336,24 +341,8 @@ async def predict_congestion():
 
         print("LOADED input data: ", input_data)
 
-        # Convert to DataFrame with explicit column order
-        input_df = pd.DataFrame([input_data])[
-            ["number_of_trades", "total_items_traded", "total_volume_usd", "total_fees_sol", "tx_count"]
-        ]
-
-        # Load model and scaler
-        model_path = "./models/xgboost_model_V2.pkl"
-        scaler_path = "./models/scaler_side_by_side.pkl"
-
-        with open(model_path, 'rb') as file:
-            model = pickle.load(file)
-        with open(scaler_path, 'rb') as file:
-            scaler = pickle.load(file)
-
-        # Scale the input
         try:
-            input_scaled = scaler.transform(input_df)
-            prediction = float(model.predict(input_scaled)[0])
+            prediction = predict_failed_tx(input_data)
 
             # Handle any NaN or infinite values
             if np.isnan(prediction) or np.isinf(prediction):
@@ -439,19 +428,18 @@ async def predict_congestion():
 
 @app.get('/api/news-information')
 async def get_news_information():
-    import random
-    news_txt = f'./metrics_cache/news_data_cache.txt'
-    with open(news_txt, 'r') as f:
-        news_lines = f.read().split("\n")
-
-    news_lines = [line for line in news_lines if line.strip()]
-    random.shuffle(news_lines)
-
-    news_txt = news_txt[:5]
+    news = market_digest.get("news")
+    if news is None:
+        return {
+            "status": "error",
+            "message": "News digest is not available yet"
+        }
 
     return {
         "status": "success",
-        "data": news_lines
+        "data": news["headlines"],
+        "sentiment_score": news["sentiment_score"],
+        "updated_at": news["updated_at"]
     }
 
 
@@ -464,6 +452,21 @@ class ProgramIdRequest(BaseModel):
 class ScanRequest(BaseModel):
     githubUrl: str
 
+# One analyzer (and the GitHub fetcher it owns) per process, so the env files and
+# the repository structure cache are loaded once instead of on every request
+_security_analyzer = None
+
+def get_security_analyzer():
+    global _security_analyzer
+    if _security_analyzer is None:
+        from backend.llm_analyzer.security_analyzer import SolanaSecurityAnalyzer
+        # LLM_PROVIDER=fake (with LLM_RECORDINGS_PATH) replays recorded responses for offline benchmarks
+        _security_analyzer = SolanaSecurityAnalyzer(
+            llm_provider=os.getenv("LLM_PROVIDER", "openai"),
+            model_name=os.getenv("LLM_MODEL", "gpt-4o-mini")
+        )
+    return _security_analyzer
+
 # Mock repository structures for different program IDs
 MOCK_REPO_STRUCTURES = {
     "default": {
@@ -639,9 +642,6 @@ MOCK_SECURITY_ISSUES = [
 @app.post('/api/validate-program')
 async def validate_program_id(request: ProgramIdRequest = Body(...)):
     import requests
-
-    from backend.github_fetcher.github_fetcher import GitHubFetcher
-    from backend.llm_analyzer.security_analyzer import SolanaSecurityAnalyzer
     
     program_id = request.programId
     repo_url = None
@@ -684,12 +684,11 @@ async def validate_program_id(request: ProgramIdRequest = Body(...)):
                 "repoUrl": repo_url
             }
         
-        # Step 3: Initialize the GitHub fetcher and get the repository structure
-        github_fetcher = GitHubFetcher()
-        repo_structure = github_fetcher.get_complete_repository_structure(repo_url)
+        # Step 3: Get the repository structure using the shared GitHub fetcher
+        analyzer = get_security_analyzer()
+        repo_structure = analyzer.github_fetcher.get_complete_repository_structure(repo_url)
         
         # Step 4: Generate descriptions for each file using LLM
-        analyzer = SolanaSecurityAnalyzer(llm_provider="openai", model_name="gpt-4o-mini")
         enhanced_structure = await generate_file_descriptions(repo_structure, analyzer, repo_url)
         
         return {
@@ -721,70 +720,50 @@ async def generate_file_descriptions(repo_structure, analyzer, repo_url):
     Returns:
         dict: Enhanced repository structure with descriptions
     """
-    # Create a simplified version of the structure for the LLM prompt
-    simplified_structure = json.dumps(repo_structure, indent=2)
+    # Same module path as the analyzer's own imports (security_analyzer puts backend/ on sys.path),
+    # so this StructuredOutputError is the class the analyzer raises
+    from llm_analyzer.prompt_builder import PATH_TRIE_NOTATION
+    from llm_analyzer.structured_output import FILE_DESCRIPTIONS_SCHEMA, StructuredOutputError
     
-    # Prepare the prompt for the LLM
-    description_prompt = f"""
+    # Prepare the prompt for the LLM, with as many of the highest-priority files as fit the prompt budget
+    header = f"""
 You are a Solana blockchain expert. I need brief descriptions for files in a Solana repository.
 
 Repository URL: {repo_url}
 
-Below is the repository structure:
-{simplified_structure}
-
-For each file in this structure, provide a brief (5-10 word) description of what the file likely contains or does based on its name and location.
-Format your response as a JSON object with the same structure, but replace each file path with a brief description.
-
-For example, if the input is:
-{{
-  "src": {{
-    "lib.rs": {{
-      "path": "src/lib.rs",
-      "type": "file"
-    }}
-  }}
-}}
-
-Your response should be:
-{{
-  "src": {{
-    "lib.rs": "Main program entry point and logic"
-  }}
-}}
-
-Only include files, not metadata like "path" or "type". Keep the same nested structure.
+Below are the files of the repository ({PATH_TRIE_NOTATION}):
+"""
+    footer = """
+For each file, provide a brief (5-10 word) description of what the file likely contains or does based on its name and location.
+Respond with JSON containing a "descriptions" array of objects with the full file "path" and its "description".
 """
+    budget = analyzer.prompt_builder.remaining_budget(header, footer)
+    description_prompt = header + analyzer.prompt_builder.encode_structure(repo_structure, budget) + "\n" + footer
     
-    # Call the LLM API
-    llm_response = analyzer._call_llm_api(description_prompt)
+    # Start from basic descriptions so every file has one, then use the LLM's where it gave them
+    enhanced_structure = create_fallback_descriptions(repo_structure)
     
-    # Extract the JSON from the response
-    import re
-    json_match = re.search(r'```json\s*(.*?)\s*```', llm_response, re.DOTALL)
+    try:
+        response = analyzer._call_llm_structured(description_prompt, "file_descriptions", FILE_DESCRIPTIONS_SCHEMA)
+    except StructuredOutputError as e:
+        print(f"Warning: Could not generate file descriptions, using basic descriptions: {str(e)}")
+        return enhanced_structure
     
-    if json_match:
-        try:
-            enhanced_structure = json.loads(json_match.group(1))
-            return enhanced_structure
-        except json.JSONDecodeError:
-            pass
+    descriptions = {item["path"].strip("/"): item["description"] for item in response["descriptions"]}
     
-    # If we couldn't parse the JSON or no JSON was found, try to extract it without code blocks
-    try:
-        # Find the first { and the last }
-        start_idx = llm_response.find('{')
-        end_idx = llm_response.rfind('}')
-        
-        if start_idx != -1 and end_idx != -1:
-            json_str = llm_response[start_idx:end_idx+1]
-            enhanced_structure = json.loads(json_str)
-            return enhanced_structure
-    except (json.JSONDecodeError, ValueError):
-        pass
+    def apply_descriptions(structure, described, prefix):
+        for key, value in structure.items():
+            if not isinstance(value, dict):
+                continue
+            if value.get("type") == "file":
+                path = value.get("path", prefix + key)
+                if path in descriptions:
+                    described[key] = descriptions[path]
+            elif "type" not in value:
+                apply_descriptions(value, described[key], prefix + key + "/")
     
-    # If all else fails, create a simple description based on file extensions
-    return create_fallback_descriptions(repo_structure)
+    apply_descriptions(repo_structure, enhanced_structure, "")
+    return enhanced_structure
 
 def create_fallback_descriptions(repo_structure):
     """
@@ -859,10 +838,36 @@ def create_fallback_descriptions(repo_structure):
     
     return process_structure(repo_structure)
 
-@app.post('/api/scan')
-async def scan_code(request: ScanRequest = Body(...)):
+def format_line_verdict(line_info):
+    """
+    Reformat a line verdict from [line_number, "good"/"bad", "explanation"]
+    to [line_number, "explanation", "Good"/"Bad"] for the client.
+    """
+    line_num, assessment, explanation = line_info[:3]
+    # Line number has to be decremented by 1 since the line number starts from 1 in the analysis results
+    # but starts from 0 in the reformatted lines
+    return [line_num - 1, explanation, assessment.capitalize()]
+
+def build_scan_report(analysis_results, github_url):
+    """Generate the markdown report for a finished line-by-line analysis."""
     import time
 
+    summary = analysis_results.get("summary", "No summary available")
+    metadata = analysis_results["metadata"]
+    
+    return f"""
+
+{summary}
+
+## Metadata
+- Repository URL: {github_url}
+- Analyzed File: {metadata["analyzed_file"]}
+- Analysis Time: {metadata["analysis_time"]:.2f} seconds
+- Analysis Date: {time.strftime("%Y-%m-%d %H:%M:%S")}
+"""
+
+@app.post('/api/scan')
+async def scan_code(request: ScanRequest = Body(...)):
     from backend.llm_analyzer.testing import analyze_repository_line_by_line
     
     github_url = request.githubUrl
@@ -875,54 +880,22 @@ async def scan_code(request: ScanRequest = Body(...)):
         # file selection, content retrieval, and line-by-line analysis
         analysis_results = analyze_repository_line_by_line(
             repo_url=github_url,
-            llm_provider="openai",
-            model_name="gpt-4o-mini"
+            analyzer=get_security_analyzer()
         )
         
         if "error" in analysis_results:
             raise ValueError(analysis_results["error"])
         
-        # Extract the raw code from the selected file
-        selected_file = analysis_results["metadata"]["analyzed_file"]
-        raw_code = ""
-        try:
-            # We need to re-fetch the file content since it's not stored in the results
-            from backend.github_fetcher.github_fetcher import GitHubFetcher
-            github_fetcher = GitHubFetcher()
-            raw_code = github_fetcher.read_file(github_url, selected_file)
-            # Limit to first 250 lines to match what was analyzed
-            raw_code = "\n".join(raw_code.split("\n")[:250])
-        except Exception as e:
-            print(f"Warning: Could not fetch raw code: {str(e)}")
-            # If we can't fetch the raw code, we'll return an empty string
+        # The analysis returns the exact source it looked at (at most the first 250 lines)
+        raw_code = analysis_results.get("raw_code", "")
         
-        # Reformat the lines from [line_number, "good"/"bad", "explanation"]
-        # to [line_number, "explanation", "Good"/"Bad"]
-        reformatted_lines = []
-        for line_info in analysis_results.get("lines", []):
-            if len(line_info) >= 3:
-                line_num, assessment, explanation = line_info
-                # Capitalize the assessment and move it to the third position
-                reformatted_lines.append([line_num, explanation, assessment.capitalize()])
-
-        # Line number has to be decremented by 1 since the line number starts from 1 in the analysis results
-        # but starts from 0 in the reformatted lines
-        for line in reformatted_lines:
-            line[0] = line[0] - 1
-        
-        # Generate a report based on the analysis results
-        summary = analysis_results.get("summary", "No summary available")
+        reformatted_lines = [
+            format_line_verdict(line_info)
+            for line_info in analysis_results.get("lines", [])
+            if len(line_info) >= 3
+        ]
         
-        report = f"""
-
-{summary}
-
-## Metadata
-- Repository URL: {github_url}
-- Analyzed File: {selected_file}
-- Analysis Time: {analysis_results["metadata"]["analysis_time"]:.2f} seconds
-- Analysis Date: {time.strftime("%Y-%m-%d %H:%M:%S")}
-"""
+        report = build_scan_report(analysis_results, github_url)
         
         return {
             "status": "success",
@@ -955,3 +928,225 @@ This is a mock response provided as a fallback. In a production environment, you
 """
         }
 
+@app.post('/api/scan/stream')
+async def scan_code_stream(request: ScanRequest = Body(...)):
+    """
+    Streaming version of /api/scan. Responds with newline-delimited JSON events:
+    a "source" event with the analyzed file and code, one "line" event per verdict
+    as soon as the LLM has produced it, then a "report" event (or an "error" event).
+    If the report's "superseded" is true, its Lines replace the streamed verdicts.
+    """
+    from fastapi.responses import StreamingResponse
+
+    from backend.llm_analyzer.testing import stream_repository_line_by_line
+    
+    github_url = request.githubUrl
+    
+    def event_stream():
+        try:
+            print(f"Starting streaming security analysis for repository: {github_url}")
+            
+            for event in stream_repository_line_by_line(repo_url=github_url, analyzer=get_security_analyzer()):
+                if event["type"] == "error":
+                    raise ValueError(event["error"])
+                
+                if event["type"] == "source":
+                    payload = {
+                        "event": "source",
+                        "RawCode": event["raw_code"],
+                        "AnalyzedFile": event["analyzed_file"]
+                    }
+                elif event["type"] == "line":
+                    payload = {"event": "line", "Line": format_line_verdict(event["line"])}
+                else:
+                    analysis_results = event["result"]
+                    payload = {
+                        "event": "report",
+                        "status": "success",
+                        "Lines": [format_line_verdict(line) for line in analysis_results.get("lines", []) if len(line) >= 3],
+                        "Report": build_scan_report(analysis_results, github_url),
+                        "metadata": analysis_results["metadata"],
+                        # The streamed "line" events came from a response that had to be repaired: use Lines instead
+                        "superseded": event["superseded"]
+                    }
+                
+                yield json.dumps(payload) + "\n"
+        
+        except Exception as e:
+            print(f"Error in streaming security analysis: {str(e)}")
+            yield json.dumps({"event": "error", "status": "error", "message": str(e)}) + "\n"
+    
+    # A sync generator is iterated in a worker thread, so the blocking LLM stream doesn't stall the event loop
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+# The visual analyzer (and its CLIP model) and the similarity index are created on first use
+# (in worker threads, so behind a lock to create each only once)
+_visual_analyzer = None
+_nft_similarity_index = None
+_nft_similarity_lock = threading.RLock()
+
+def get_visual_analyzer():
+    global _visual_analyzer
+    with _nft_similarity_lock:
+        if _visual_analyzer is None:
+            from backend.agents.nft_recommendation.visual_nft_scorer import VisualImpactAnalyzer
+            _visual_analyzer = VisualImpactAnalyzer()
+        return _visual_analyzer
+
+def get_nft_similarity_index():
+    global _nft_similarity_index
+    with _nft_similarity_lock:
+        if _nft_similarity_index is None:
+            from backend.agents.nft_recommendation.embedding_index import NFTSimilarityIndex
+            _nft_similarity_index = NFTSimilarityIndex(get_visual_analyzer().cache)
+        return _nft_similarity_index
+
+@app.get('/api/nft/similar')
+async def get_similar_nfts(cid: str, k: int = 10):
+    """
+    Find the NFTs that look most like a given one, by cosine similarity of their CLIP image embeddings.
+    NFTs are searchable once they have been scored; an unknown CID is downloaded and embedded first.
+    """
+    if not 1 <= k <= 100:
+        return {"status": "error", "message": "k must be between 1 and 100"}
+    
+    try:
+        # Loading CLIP, the embedding cache and the index, and searching it, all block, so they run off the event loop
+        analyzer = await asyncio.to_thread(get_visual_analyzer)
+        if cid not in analyzer.cache:
+            await analyzer.analyze_impact_async([cid])
+            if cid not in analyzer.cache:
+                return {"status": "error", "message": f"Could not download or embed {cid}"}
+        
+        similar = await asyncio.to_thread(lambda: get_nft_similarity_index().search(cid, k))
+        return {
+            "status": "success",
+            "cid": cid,
+            "similar": [{"cid": similar_cid, "similarity": similarity} for similar_cid, similarity in similar]
+        }
+    
+    except Exception as e:
+        print(f"Error finding similar NFTs: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+# Contract and transaction history of the sepolia subgraph, mirrored locally and kept in sync in the background
+# (every SUBGRAPH_SYNC_INTERVAL seconds; 0 disables syncing)
+SUBGRAPH_SYNC_INTERVAL = float(os.getenv('SUBGRAPH_SYNC_INTERVAL', 60))
+_subgraph_store = None
+_subgraph_syncer = None
+_subgraph_sync_task = None
+
+def get_subgraph_store():
+    global _subgraph_store
+    if _subgraph_store is None:
+        from backend.python_integration.subgraph_store import SubgraphStore
+        _subgraph_store = SubgraphStore()
+    return _subgraph_store
+
+def get_subgraph_sync_status():
+    """The mirror's synced block, and when the background sync last succeeded or failed (and why)."""
+    status = {"synced_block": get_subgraph_store().synced_block, "sync_enabled": _subgraph_syncer is not None}
+    if _subgraph_syncer is not None:
+        status.update(_subgraph_syncer.status())
+    return status
+
+@app.on_event("startup")
+async def start_subgraph_sync():
+    global _subgraph_syncer, _subgraph_sync_task
+    if SUBGRAPH_SYNC_INTERVAL > 0:
+        from backend.python_integration.subgraph_store import SubgraphSyncer
+        _subgraph_syncer = SubgraphSyncer(get_subgraph_store())
+        _subgraph_sync_task = asyncio.create_task(_subgraph_syncer.run(SUBGRAPH_SYNC_INTERVAL))
+
+@app.on_event("shutdown")
+async def stop_subgraph_sync():
+    if _subgraph_sync_task is not None:
+        _subgraph_sync_task.cancel()
+
+@app.get('/api/subgraph/contracts')
+async def get_subgraph_contracts(creator: Optional[str] = None, limit: int = 50, offset: int = 0):
+    """Smart contracts from the local subgraph mirror, newest first."""
+    if not 1 <= limit <= 1000:
+        return {"status": "error", "message": "limit must be between 1 and 1000"}
+    
+    try:
+        store = get_subgraph_store()
+        contracts = store.query('smart_contracts', where={'creator': creator} if creator else None,
+                                limit=limit, offset=offset)
+        return {"status": "success", **get_subgraph_sync_status(), "data": contracts}
+    
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get('/api/subgraph/transactions')
+async def get_subgraph_transactions(address: Optional[str] = None, since: Optional[int] = None,
+                                    until: Optional[int] = None, limit: int = 100):
+    """Transactions from the local subgraph mirror, newest first, optionally from or to an address and within [since, until)."""
+    if not 1 <= limit <= 1000:
+        return {"status": "error", "message": "limit must be between 1 and 1000"}
+    
+    try:
+        store = get_subgraph_store()
+        if address:
+            # Both directions, each answered from its own index
+            transactions = (store.query('transactions', where={'from': address}, since=since, until=until, limit=limit) +
+                            store.query('transactions', where={'to': address}, since=since, until=until, limit=limit))
+            transactions = sorted({t['id']: t for t in transactions}.values(), key=lambda t: -t['timestamp'])[:limit]
+        else:
+            transactions = store.query('transactions', since=since, until=until, limit=limit)
+        return {"status": "success", **get_subgraph_sync_status(), "data": transactions}
+    
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get('/api/subgraph/prices')
+async def get_subgraph_prices(since: Optional[int] = None, until: Optional[int] = None, limit: int = 1000):
+    """ETH price history recorded by the subgraph, oldest first, within [since, until)."""
+    if not 1 <= limit <= 10000:
+        return {"status": "error", "message": "limit must be between 1 and 10000"}
+    
+    try:
+        store = get_subgraph_store()
+        prices = store.query('price_data', since=since, until=until, descending=False, limit=limit)
+        return {"status": "success", **get_subgraph_sync_status(), "data": prices}
+    
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@app.get('/api/fee-estimate')
+async def get_fee_estimate(tps: float, failure_rate: float = 0.05, volume_usd: float = 10000.0):
+    """
+    Estimated average transaction fee of a what-if scenario, interpolated from the precomputed fee surface.
+    failure_rate is failed transactions per unit of TPS.
+    """
+    try:
+        from backend.fee_service import get_fee_prediction_service
+        service = get_fee_prediction_service()
+        # The surface is computed (and cached on disk) on first use, so that first call runs off the event loop
+        surface = await asyncio.to_thread(lambda: service.surface)
+        return {
+            "status": "success",
+            "data": {
+                "tps": tps,
+                "failure_rate": failure_rate,
+                "volume_usd": volume_usd,
+                "predicted_fee_sol": surface.estimate(tps, failure_rate, volume_usd)
+            }
+        }
+    
+    except Exception as e:
+        print(f"Error estimating fee: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+@app.get('/api/fee-surface')
+async def get_fee_surface():
+    """The whole fee surface (axes and predicted fees), so the UI can interpolate scenarios itself."""
+    try:
+        from backend.fee_service import get_fee_prediction_service
+        service = get_fee_prediction_service()
+        surface = await asyncio.to_thread(lambda: service.surface)
+        return {"status": "success", "data": surface.to_dict()}
+    
+    except Exception as e:
+        print(f"Error loading fee surface: {str(e)}")
+        return {"status": "error", "message": str(e)}
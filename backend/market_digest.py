@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from backend.agents.nft_recommendation.market_nft_trends import NFTMarketAnalyzer
+from backend.python_integration.NFT_scraper_part2 import NFTTrendScraper
+
+METRICS_CACHE_DIR = Path(__file__).resolve().parent / "metrics_cache"
+DIGEST_PATH = METRICS_CACHE_DIR / "market_digest.json"
+NEWS_PATH = METRICS_CACHE_DIR / "news_data_cache.txt"
+
+# Seconds between refreshes (override with MARKET_DIGEST_INTERVAL)
+REFRESH_INTERVAL = int(os.getenv('MARKET_DIGEST_INTERVAL', 1800))
+
+# Number of headlines served by /api/news-information
+NEWS_LIMIT = 5
+
+
+class MarketDigest:
+    """
+    Precomputed NFT trend analysis and news headlines, refreshed by a background task and kept in
+    memory and on disk. Requests only read the latest digest, so they never wait on a scrape.
+
+    The digest has one section per source ("nft_analysis" and "news"), each with its own
+    `updated_at`, so a failed refresh of one source keeps serving the previous version of it.
+    """
+
+    def __init__(self, digest_path: Path = DIGEST_PATH, news_path: Path = NEWS_PATH,
+                 interval: int = REFRESH_INTERVAL):
+        """
+        Initialize the digest, loading the last one saved to disk if there is one.
+
+        Args:
+            digest_path (Path): Where the digest is saved
+            news_path (Path): Text file of news headlines, one per line
+            interval (int): Seconds between refreshes
+        """
+        self.digest_path = Path(digest_path)
+        self.news_path = Path(news_path)
+        self.interval = interval
+        self.sections: Dict[str, Dict] = self._load()
+        self.analyzer = NFTMarketAnalyzer()
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.digest_path.exists():
+            return {}
+        try:
+            with open(self.digest_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not load market digest from {self.digest_path}: {str(e)}")
+            return {}
+
+    def _save(self):
+        """Write the digest atomically, so a crash never leaves a half-written file."""
+        with self._lock:
+            sections = dict(self.sections)
+        tmp_path = self.digest_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(sections, f, indent=2)
+        os.replace(tmp_path, self.digest_path)
+
+    def _set(self, name: str, section: Dict):
+        section["updated_at"] = datetime.now().isoformat()
+        with self._lock:
+            # Replace rather than mutate, so readers always see a complete section
+            self.sections = {**self.sections, name: section}
+        self._save()
+
+    def get(self, name: str) -> Optional[Dict]:
+        """
+        Get the latest version of a section.
+
+        Args:
+            name (str): "nft_analysis" or "news"
+
+        Returns:
+            Optional[Dict]: The section, with its `updated_at` timestamp, or None if it hasn't been computed yet
+        """
+        return self.sections.get(name)
+
+    def refresh_news(self):
+        """Score the cached news headlines and keep the strongest signals (blocking: file I/O and scoring)."""
+        with open(self.news_path, 'r') as f:
+            headlines = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+        sentiment = self.analyzer.analyze_sentiment(headlines)
+
+        # Strongest signals (bullish or bearish) first; ties keep the file's order
+        ranked = sorted(zip(headlines, sentiment["signal_scores"]), key=lambda item: -abs(item[1]))[:NEWS_LIMIT]
+        self._set("news", {
+            "headlines": [headline for headline, _ in ranked],
+            "scores": [score for _, score in ranked],
+            "sentiment_score": sentiment["nft_sentiment"],
+        })
+
+    async def refresh_nft_analysis(self):
+        """Scrape the NFT trend pages and score their full text."""
+        contents = await NFTTrendScraper().get_trend_content_async(full_text=True)
+        if not contents:
+            # Keep serving the previous analysis rather than an empty one
+            print("Warning: No NFT trend content scraped, keeping the previous analysis")
+            return
+
+        # Scoring and saving block, so they run in a worker thread instead of stalling the event loop
+        texts = [item['text'] for item in contents]
+        sentiment = await asyncio.to_thread(self.analyzer.analyze_sentiment, texts)
+        await asyncio.to_thread(self._set, "nft_analysis", {
+            "reasoning": sentiment["market_trends"],
+            "sentiment_score": sentiment["nft_sentiment"],
+            "sources": [item['url'] for item in contents],
+        })
+
+    async def refresh(self):
+        """Refresh every section. A section that fails to refresh keeps its previous version."""
+        try:
+            await asyncio.to_thread(self.refresh_news)
+        except Exception as e:
+            print(f"Error refreshing news digest: {str(e)}")
+        try:
+            await self.refresh_nft_analysis()
+        except Exception as e:
+            print(f"Error refreshing NFT trend digest: {str(e)}")
+
+    def _seconds_until_stale(self) -> float:
+        """Seconds until the oldest section is due for a refresh (0 if any section is missing)."""
+        if not all(name in self.sections for name in ("news", "nft_analysis")):
+            return 0
+        oldest = min(datetime.fromisoformat(section["updated_at"]) for section in self.sections.values())
+        return max(0.0, self.interval - (datetime.now() - oldest).total_seconds())
+
+    async def run(self):
+        """Refresh the digest forever, starting as soon as the saved one is stale."""
+        await asyncio.sleep(self._seconds_until_stale())
+        while True:
+            print("Refreshing market digest...")
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the refresh task on the running event loop (once)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Cancel the refresh task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import pickle
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional
+
+import numpy as np
+import xgboost as xgb
+
+MODEL_DIR = Path(__file__).resolve().parent / "models"
+
+CONGESTION_FEATURES = ["tps", "avg_fee_sol", "total_fees_sol", "tx_count"]
+FAILED_TX_FEATURES = ["number_of_trades", "total_items_traded", "total_volume_usd", "total_fees_sol", "tx_count"]
+FEE_FEATURES = ["tps", "failed_tx_count", "tx_count", "total_volume_usd", "congestion_ratio", "tx_per_second"]
+
+# Models served by the API. Each is saved as <path>.ubj (the booster, in XGBoost's native UBJSON format)
+# and <path>.meta.json (feature order and scaler parameters as plain arrays). The pickles written by
+# earlier versions of the training scripts are still loaded if a model hasn't been exported yet.
+SERVED_MODELS = {
+    "congestion": {
+        "path": MODEL_DIR / "congestion_model",
+        "features": CONGESTION_FEATURES,
+        "legacy_model": MODEL_DIR / "xgboost_model.pkl",
+        "legacy_scaler": MODEL_DIR / "scaler.pkl",
+        "legacy_features": None,
+    },
+    "failed-tx": {
+        "path": MODEL_DIR / "failed_tx_model",
+        "features": FAILED_TX_FEATURES,
+        "legacy_model": MODEL_DIR / "xgboost_model_V2.pkl",
+        "legacy_scaler": MODEL_DIR / "scaler_side_by_side.pkl",
+        "legacy_features": None,
+    },
+    "fee": {
+        "path": MODEL_DIR / "fee_model",
+        "features": FEE_FEATURES,
+        "legacy_model": MODEL_DIR / "fee_prediction_model.pkl",
+        "legacy_scaler": MODEL_DIR / "fee_prediction_scaler.pkl",
+        "legacy_features": MODEL_DIR / "fee_prediction_features.pkl",
+    },
+}
+
+
+def _fingerprint(paths: List[Path]) -> str:
+    """Changes whenever one of the files is rewritten."""
+    return "|".join(f"{os.path.getmtime(path)}:{os.path.getsize(path)}" for path in paths)
+
+
+def _booster_of(model) -> xgb.Booster:
+    """The booster of an XGBoost model, cut to its best iteration if it was trained with early stopping."""
+    if isinstance(model, xgb.Booster):
+        return model
+    booster = model.get_booster()
+    # predict() of an early-stopped model only uses the trees up to the best iteration
+    if getattr(model, 'early_stopping_rounds', None):
+        booster = booster[:model.best_iteration + 1]
+    return booster
+
+
+class NativeModel:
+    """
+    An XGBoost booster and the MinMaxScaler parameters of its inputs, as plain arrays.
+
+    predict() scales with NumPy and scores with Booster.inplace_predict, which skips building a
+    DMatrix. predict_one() scores a single row from a mapping of feature values through a compiled
+    function (see compile()), without pandas.
+    """
+
+    def __init__(self, booster: xgb.Booster, features: List[str], scale: np.ndarray, offset: np.ndarray,
+                 clip_range: Optional[List[float]] = None, fingerprint: str = ""):
+        """
+        Initialize the model.
+
+        Args:
+            booster (xgb.Booster): Trained booster
+            features (List[str]): Input features, in the order the booster expects them
+            scale (np.ndarray): Scaler multipliers (MinMaxScaler.scale_)
+            offset (np.ndarray): Scaler offsets (MinMaxScaler.min_)
+            clip_range (Optional[List[float]]): Range to clip scaled inputs to, if the scaler clips (MinMaxScaler.clip)
+            fingerprint (str): Identifies the files the model was loaded from
+        """
+        self.booster = booster
+        self.features = list(features)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.offset = np.asarray(offset, dtype=np.float64)
+        self.clip_range = clip_range
+        self.fingerprint = fingerprint
+        self.predict_one = self.compile()
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Scale inputs (rows in the order of `features`) like the fitted MinMaxScaler."""
+        X_scaled = np.asarray(X, dtype=np.float64) * self.scale + self.offset
+        if self.clip_range is not None:
+            np.clip(X_scaled, self.clip_range[0], self.clip_range[1], out=X_scaled)
+        return X_scaled
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict from unscaled inputs.
+
+        Args:
+            X (np.ndarray): Rows of inputs, in the order of `features`
+
+        Returns:
+            np.ndarray: One prediction per row
+        """
+        return np.asarray(self.booster.inplace_predict(self.transform(X)), dtype=np.float64)
+
+    def compile(self) -> Callable[[Mapping[str, float]], float]:
+        """
+        Compile a single-row predictor.
+
+        The feature order, the scaler's scale and min vectors and the booster are bound once, so a
+        call only gathers the row's values into an array in feature order, scales it with two
+        in-place NumPy operations and walks the trees: no DataFrame, column selection or
+        scaler.transform on the way.
+
+        Returns:
+            Callable[[Mapping[str, float]], float]: Prediction from a mapping of feature name to value
+                (raising KeyError on a missing feature)
+        """
+        features = tuple(self.features)
+        n_features = len(features)
+        scale = self.scale.copy()
+        offset = self.offset.copy()
+        clip_range = self.clip_range
+        inplace_predict = self.booster.inplace_predict
+
+        def predict_row(data: Mapping[str, float]) -> float:
+            x = np.fromiter(map(data.__getitem__, features), dtype=np.float64, count=n_features)
+            x *= scale
+            x += offset
+            if clip_range is not None:
+                np.clip(x, clip_range[0], clip_range[1], out=x)
+            return float(inplace_predict(x.reshape(1, n_features))[0])
+
+        return predict_row
+
+
+def export_model(model, scaler, features: List[str], path: Path):
+    """
+    Save a trained model in XGBoost's native format and its scaler as plain arrays.
+
+    Args:
+        model: Trained XGBRegressor (or Booster)
+        scaler: Fitted MinMaxScaler of the model's inputs
+        features (List[str]): Input features, in order
+        path (Path): Path without extension; writes <path>.ubj and <path>.meta.json
+    """
+    path = Path(path)
+    os.makedirs(path.parent, exist_ok=True)
+    booster = _booster_of(model)
+    meta = {
+        "features": list(features),
+        "scaler": {
+            "scale": np.asarray(scaler.scale_, dtype=np.float64).tolist(),
+            "min": np.asarray(scaler.min_, dtype=np.float64).tolist(),
+            "data_min": np.asarray(scaler.data_min_, dtype=np.float64).tolist(),
+            "data_max": np.asarray(scaler.data_max_, dtype=np.float64).tolist(),
+            "feature_range": [float(bound) for bound in scaler.feature_range],
+            "clip": bool(getattr(scaler, 'clip', False)),
+        },
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "xgboost_version": xgb.__version__,
+    }
+
+    # Booster first, then the metadata, each written atomically
+    tmp_path = path.with_name(path.name + '.tmp.ubj')
+    booster.save_model(str(tmp_path))
+    os.replace(tmp_path, path.with_suffix('.ubj'))
+    tmp_path = path.with_name(path.name + '.meta.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, path.with_name(path.name + '.meta.json'))
+    print(f"Model saved at: {path.with_suffix('.ubj')}")
+
+
+def load_native_model(path: Path) -> NativeModel:
+    """Load a model saved by export_model (no pickle involved)."""
+    path = Path(path)
+    model_path = path.with_suffix('.ubj')
+    meta_path = path.with_name(path.name + '.meta.json')
+    booster = xgb.Booster()
+    booster.load_model(str(model_path))
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    scaler = meta["scaler"]
+    return NativeModel(booster, meta["features"], scaler["scale"], scaler["min"],
+                       scaler["feature_range"] if scaler.get("clip") else None, _fingerprint([model_path, meta_path]))
+
+
+def _unpickle_legacy(spec: Dict):
+    """The pickled model, scaler, features and file paths of a served model. Only use with trusted files."""
+    with open(spec["legacy_model"], 'rb') as file:
+        model = pickle.load(file)
+    with open(spec["legacy_scaler"], 'rb') as file:
+        scaler = pickle.load(file)
+    features = spec["features"]
+    paths = [spec["legacy_model"], spec["legacy_scaler"]]
+    if spec["legacy_features"] is not None:
+        with open(spec["legacy_features"], 'rb') as file:
+            features = pickle.load(file)
+        paths.append(spec["legacy_features"])
+    return model, scaler, features, paths
+
+
+def load_legacy_model(spec: Dict) -> NativeModel:
+    """Load a served model from the pickles of earlier training scripts."""
+    model, scaler, features, paths = _unpickle_legacy(spec)
+    clip_range = list(scaler.feature_range) if getattr(scaler, 'clip', False) else None
+    return NativeModel(_booster_of(model), features, scaler.scale_, scaler.min_, clip_range, _fingerprint(paths))
+
+
+class ModelRegistry:
+    """
+    The served models, each loaded once on first use: from its native export if there is one,
+    otherwise from its legacy pickles.
+    """
+
+    def __init__(self, specs: Optional[Dict[str, Dict]] = None):
+        """
+        Initialize the registry.
+
+        Args:
+            specs (Optional[Dict[str, Dict]]): Models by name (like SERVED_MODELS). If None, uses SERVED_MODELS
+        """
+        self.specs = specs or SERVED_MODELS
+        self._models: Dict[str, NativeModel] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> NativeModel:
+        """
+        Get a model by name.
+
+        Args:
+            name (str): Model name (a key of the registry's specs)
+
+        Returns:
+            NativeModel: The loaded model
+        """
+        with self._lock:
+            if name not in self._models:
+                spec = self.specs[name]
+                if spec["path"].with_suffix('.ubj').exists():
+                    self._models[name] = load_native_model(spec["path"])
+                else:
+                    print(f"No native export of the {name} model, loading its pickles "
+                          f"(run `python model_registry.py convert` to export it)")
+                    self._models[name] = load_legacy_model(spec)
+            return self._models[name]
+
+    def reload(self, name: str) -> NativeModel:
+        """Drop a model from the registry (e.g. after retraining) and load it again."""
+        with self._lock:
+            self._models.pop(name, None)
+        return self.get(name)
+
+
+_registry = ModelRegistry()
+
+
+def get_model(name: str) -> NativeModel:
+    """Get a served model from the process-wide registry."""
+    return _registry.get(name)
+
+
+def convert_legacy_models(names: Optional[List[str]] = None):
+    """Export the legacy pickles of served models in the native format."""
+    for name in names or SERVED_MODELS:
+        spec = SERVED_MODELS[name]
+        if not spec["legacy_model"].exists():
+            print(f"No pickled {name} model to convert")
+            continue
+        model, scaler, features, _ = _unpickle_legacy(spec)
+        export_model(model, scaler, features, spec["path"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the served models")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert = subparsers.add_parser("convert", help="Export pickled models in XGBoost's native format")
+    convert.add_argument("models", nargs="*", help=f"Models to convert: {', '.join(SERVED_MODELS)} (default: all)")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.models if name not in SERVED_MODELS]
+    if unknown:
+        parser.error(f"Unknown models: {', '.join(unknown)}")
+
+    if args.command == "convert":
+        convert_legacy_models(args.models or None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import sys
+from typing import Dict
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.fee_service import get_fee_prediction_service
+from backend.model_registry import get_model
+
+# Inference only: importing this module loads no data and trains nothing, and models are loaded
+# (through the model registry) on first use. Training lives in train_models.py.
+
+
+def predict_congestion(new_data: Dict) -> float:
+    """
+    Predict failed transactions (congestion) from network metrics.
+
+    Args:
+        new_data (Dict): Metrics with keys tps, avg_fee_sol, total_fees_sol and tx_count
+
+    Returns:
+        float: Predicted number of failed transactions
+    """
+    return get_model("congestion").predict_one(new_data)
+
+
+def predict_failed_tx(new_data: Dict) -> float:
+    """
+    Predict failed transactions from NFT trading and transaction metrics.
+
+    Args:
+        new_data (Dict): Metrics with keys number_of_trades, total_items_traded, total_volume_usd,
+            total_fees_sol and tx_count
+
+    Returns:
+        float: Predicted number of failed transactions
+    """
+    return get_model("failed-tx").predict_one(new_data)
+
+
+def predict_transaction_fee(new_data: Dict, debug: bool = False) -> float:
+    """
+    Predict the average transaction fee from network metrics.
+
+    Args:
+        new_data (Dict): Metrics with keys tps, failed_tx_count, tx_count and total_volume_usd
+        debug (bool): Print the model inputs and a rule-based fee for comparison
+
+    Returns:
+        float: Predicted average transaction fee in SOL
+    """
+    service = get_fee_prediction_service()
+    prediction = service.predict(new_data)
+
+    if debug:
+        print("\nInput features:")
+        print(service.feature_frame({key: np.array([float(value)]) for key, value in new_data.items()}))
+        print("\nRaw prediction:", prediction)
+
+        # Also calculate using a simple rule-based approach for comparison
+        base_fee = 0.000125  # Base fee in SOL
+        congestion_factor = new_data['failed_tx_count'] / max(new_data['tx_count'], 1) * 10
+        tps_factor = new_data['tps'] / 2000  # Normalize to a typical max TPS
+
+        rule_based_fee = base_fee * (1 + congestion_factor) * (1 + tps_factor)
+        print(f"\nRule-based fee: {rule_based_fee:.8f} SOL")
+
+    return prediction
@@ -1,93 +1,238 @@
 from googlesearch import search
+import aiohttp
+import asyncio
+import os
+import re
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
+from collections import OrderedDict
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+try:
+    import lxml.html
+    import lxml.etree
+except ImportError:
+    print("Warning: lxml not installed, extracting page text with the slower BeautifulSoup parser.")
+    lxml = None
+
+# Crawl limits: total open connections, concurrent requests per domain and seconds between them
+MAX_CONNECTIONS = 16
+MAX_PER_DOMAIN = 2
+DOMAIN_DELAY = 0.5
+REQUEST_TIMEOUT = 10
+
+# Length of the content preview of each page. Only the start of a page is parsed, so there's
+# no need to download whole pages
+CONTENT_LENGTH = 1000
+MAX_HTML_BYTES = 512 * 1024
+
+# Search results and page content are reused for this long (override with SCRAPER_CACHE_TTL)
+CACHE_TTL = int(os.getenv('SCRAPER_CACHE_TTL', 3600))
+
+# Max entries of each cache (override with SCRAPER_CACHE_SIZE); the oldest entries are evicted first
+CACHE_SIZE = int(os.getenv('SCRAPER_CACHE_SIZE', 1024))
+
+# Shared by every scraper in the process: url or query -> (time fetched, value), oldest first
+_content_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_search_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _cache_get(cache: "OrderedDict[str, tuple]", key: str):
+    with _cache_lock:
+        entry = cache.get(key)
+    if entry and time.time() - entry[0] < CACHE_TTL:
+        return entry[1]
+    return None
+
+
+def _cache_put(cache: "OrderedDict[str, tuple]", key: str, value):
+    now = time.time()
+    with _cache_lock:
+        cache.pop(key, None)
+        cache[key] = (now, value)
+        # Entries are kept in the order they were fetched, so the expired ones are all at the front
+        while cache:
+            fetched_at, _ = next(iter(cache.values()))
+            if now - fetched_at < CACHE_TTL and len(cache) <= CACHE_SIZE:
+                break
+            cache.popitem(last=False)
+
+
 #general comment
 class NFTTrendScraper:
     def __init__(self):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
         }
+        self.queries = [
+            "latest NFT trends 2024",
+            "NFT market trends analysis",
+            "popular NFT projects current",
+            "NFT trading trends",
+            "NFT technology developments"
+        ]
 
     def search_google(self, query: str, num_results: int = 5) -> List[str]:
         """Search Google for NFT trends"""
+        cached = _cache_get(_search_cache, query)
+        if cached is not None:
+            return cached
         try:
             print(f"Searching for: {query}")
             urls = list(search(query, num_results=num_results))
+            _cache_put(_search_cache, query, urls)
             return urls
         except Exception as e:
             print(f"Error searching Google: {e}")
             return []
 
+    @staticmethod
+    def extract_text(html: str) -> Optional[str]:
+        """Extract the visible text of a page, with whitespace collapsed"""
+        if lxml is not None:
+            try:
+                doc = lxml.html.fromstring(html)
+                lxml.etree.strip_elements(doc, 'script', 'style', 'noscript', with_tail=False)
+                text = doc.text_content()
+            except (lxml.etree.ParserError, ValueError):
+                return None
+        else:
+            soup = BeautifulSoup(html, 'html.parser')
+            # Remove script and style elements
+            for script in soup(["script", "style", "noscript"]):
+                script.decompose()
+            text = soup.get_text(" ")
+
+        text = _WHITESPACE.sub(' ', text).strip()
+        return text if text else None
+
     def get_content(self, url: str) -> str:
         """Get main content from URL if response is successful"""
+        cached = _cache_get(_content_cache, url)
+        if cached is not None:
+            return cached[:CONTENT_LENGTH]
         try:
             print(f"Fetching content from: {url}")
-            response = requests.get(url, headers=self.headers, timeout=10)
-            
+            response = requests.get(url, headers=self.headers, timeout=REQUEST_TIMEOUT)
+
             # Only process successful responses (not 404 or 403)
             if response.status_code not in [404, 403]:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Remove script and style elements
-                for script in soup(["script", "style"]):
-                    script.decompose()
-
-                # Get text content
-                text = soup.get_text()
-                
-                # Clean up text: remove extra whitespace and empty lines
-                lines = (line.strip() for line in text.splitlines())
-                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                text = ' '.join(chunk for chunk in chunks if chunk)
-                
-                return text if text else None
+                text = self.extract_text(response.text[:MAX_HTML_BYTES])
+                if text:
+                    _cache_put(_content_cache, url, text)
+                    return text[:CONTENT_LENGTH]
             return None
         except Exception as e:
             print(f"Error fetching {url}: {e}")
             return None
 
-    def get_trend_content(self) -> List[str]:
-        """Get content from NFT trend searches"""
-        queries = [
-            "latest NFT trends 2024",
-            "NFT market trends analysis",
-            "popular NFT projects current",
-            "NFT trading trends",
-            "NFT technology developments"
-        ]
-        
-        all_content = []
-        
-        for query in queries:
-            # Get URLs from Google
-            urls = self.search_google(query)
-            
-            # Get content from each URL
+    async def _fetch_content(self, session: aiohttp.ClientSession, url: str,
+                             domain_limits: Dict[str, asyncio.Semaphore], domain_last: Dict[str, float]) -> Optional[str]:
+        """Fetch a page politely (bounded per domain, spaced out in time) and extract its full text"""
+        cached = _cache_get(_content_cache, url)
+        if cached is not None:
+            return cached
+
+        domain = urlparse(url).netloc
+        limit = domain_limits.setdefault(domain, asyncio.Semaphore(MAX_PER_DOMAIN))
+        try:
+            async with limit:
+                wait = domain_last.get(domain, 0) + DOMAIN_DELAY - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                domain_last[domain] = time.monotonic()
+
+                print(f"Fetching content from: {url}")
+                async with session.get(url, headers=self.headers) as response:
+                    # Only process successful responses (not 404 or 403)
+                    if response.status in (404, 403):
+                        return None
+                    html = await response.content.read(MAX_HTML_BYTES)
+                    encoding = response.get_encoding() if response.charset else 'utf-8'
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+
+        # Parsing is CPU-bound, so keep it off the event loop
+        text = await asyncio.to_thread(self.extract_text, html.decode(encoding, errors='replace'))
+        if not text:
+            return None
+        _cache_put(_content_cache, url, text)
+        return text
+
+    async def get_trend_content_async(self, full_text: bool = False) -> List[Dict[str, str]]:
+        """
+        Get content from NFT trend searches, running the searches and page fetches concurrently
+
+        Args:
+            full_text (bool): Also include the full text of each page (under 'text'), e.g. for scoring
+
+        Returns:
+            List[Dict[str, str]]: Query, URL and content preview of each page
+        """
+        # The search library blocks, so run the queries in worker threads
+        results = await asyncio.gather(*(asyncio.to_thread(self.search_google, query) for query in self.queries))
+
+        # De-duplicate URLs across queries, keeping the first query that found each
+        url_queries = {}
+        for query, urls in zip(self.queries, results):
             for url in urls:
-                content = self.get_content(url)
-                if content:  # Only add non-None content
-                    all_content.append({
-                        'query': query,
-                        'url': url,
-                        'content': content[:1000]  # Limit content length for manageability
-                    })
-                    print(f"Found content from: {url}")
-        
+                url_queries.setdefault(url, query)
+
+        connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=MAX_PER_DOMAIN, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        domain_limits: Dict[str, asyncio.Semaphore] = {}
+        domain_last: Dict[str, float] = {}
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            contents = await asyncio.gather(*(
+                self._fetch_content(session, url, domain_limits, domain_last) for url in url_queries
+            ))
+
+        all_content = []
+        for (url, query), content in zip(url_queries.items(), contents):
+            if content:  # Only add non-None content
+                item = {
+                    'query': query,
+                    'url': url,
+                    'content': content[:CONTENT_LENGTH]
+                }
+                if full_text:
+                    item['text'] = content
+                all_content.append(item)
+                print(f"Found content from: {url}")
+
         return all_content
 
+    def get_trend_content(self) -> List[Dict[str, str]]:
+        """Get content from NFT trend searches"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.get_trend_content_async())
+
+        # Called from inside an event loop: crawl on a separate loop in a worker thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.get_trend_content_async()).result()
+
 def main():
     scraper = NFTTrendScraper()
     contents = scraper.get_trend_content()
-    
+
     print("\nCollected Content:")
     for i, item in enumerate(contents, 1):
         print(f"\n{i}. Query: {item['query']}")
         print(f"URL: {item['url']}")
         print(f"Preview: {item['content'][:200]}...")  # Show first 200 chars
-    
+
     print(f"\nTotal successful content pieces collected: {len(contents)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,5 +1,3 @@
-from gql import gql, Client
-from gql.transport.aiohttp import AIOHTTPTransport
 import asyncio
 import os
 from dotenv import load_dotenv
@@ -7,11 +5,41 @@ from datetime import datetime
 import pandas as pd
 import sys
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.python_integration.graphql_client import get_graphql_client
+
 from dotenv import load_dotenv
 env_path = os.path.join(os.path.dirname(__file__), './.env.local')
 load_dotenv(env_path)
 
 
+SOL_USDT_SWAP_FILTER = {
+    "token0": "So11111111111111111111111111111111111111112",  # SOL
+    "token1": "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB"   # USDT
+}
+
+SOL_USDT_SWAPS_QUERY = """
+query RecentSwaps($first: Int!, $where: Swap_filter!) {
+    swaps(
+        first: $first,
+        orderBy: timestamp,
+        orderDirection: desc,
+        where: $where
+        subgraphError: deny
+    ) {
+        timestamp
+        amount0
+        amount1
+        amountUSD
+        pool {
+            token0Price
+            token1Price
+        }
+    }
+}
+"""
+
+
 class SOLUSDTTracker:
     def __init__(self):
         load_dotenv()
@@ -19,44 +47,17 @@ class SOLUSDTTracker:
         if not api_key:
             raise ValueError("GRAPH_API_KEY not found in environment variables")
 
+        self.swap_filter = SOL_USDT_SWAP_FILTER
         # Using Uniswap v3 subgraph for SOL/USDT pair
-        self.transport = AIOHTTPTransport(
-            url=f'https://gateway.thegraph.com/api/{api_key}/subgraphs/id/ELUcwgpm14LKPLrBRuVvPvNKHQ9HvwmtKgKSH6123cr7',
-            headers={'Content-Type': 'application/json'}
-        )
-        self.client = Client(
-            transport=self.transport,
-            fetch_schema_from_transport=True
+        # Shared with every other tracker of this subgraph: no schema round trip, one connection pool
+        self.client = get_graphql_client(
+            f'https://gateway.thegraph.com/api/{api_key}/subgraphs/id/ELUcwgpm14LKPLrBRuVvPvNKHQ9HvwmtKgKSH6123cr7'
         )
 
     async def get_sol_usdt_swaps(self, limit=50):
-        """Get recent SOL/USDT swap data and return as DataFrame"""
-        query = gql("""
-        {
-            swaps(
-                first: $limit,
-                orderBy: timestamp,
-                orderDirection: desc,
-                where: {
-                    token0: "So11111111111111111111111111111111111111112",  # SOL
-                    token1: "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB"   # USDT
-                }
-                subgraphError: deny
-            ) {
-                timestamp
-                amount0
-                amount1
-                amountUSD
-                pool {
-                    token0Price
-                    token1Price
-                }
-            }
-        }
-        """.replace("$limit", str(limit)))
-
+        """Get recent SOL/USDT swap data and return as DataFrame (at most 1000; use SwapSyncer for longer history)"""
         try:
-            result = await self.client.execute_async(query)
+            result = await self.client.execute(SOL_USDT_SWAPS_QUERY, {'first': min(limit, 1000), 'where': self.swap_filter})
             if result and 'swaps' in result:
                 # Create list of dictionaries for DataFrame
                 swaps_data = [{
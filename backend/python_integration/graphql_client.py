@@ -0,0 +1,305 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+
+import aiohttp
+from graphql import (DocumentNode, FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLSchema, NameNode,
+                     Node, OperationDefinitionNode, OperationType, SelectionSetNode, VariableNode, Visitor,
+                     build_client_schema, build_schema, get_introspection_query, parse, print_ast, print_schema,
+                     validate, visit)
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+
+# Schemas fetched by introspection are kept here, so they're fetched once per endpoint rather than per client
+SCHEMA_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.graphql_cache')
+
+_NAME = re.compile(r'^[_A-Za-z][_0-9A-Za-z]*$')
+
+# A batch request: a query, or a query and its variables
+BatchRequest = Union[str, Tuple[str, Optional[Dict]]]
+
+
+class GraphQLQueryError(Exception):
+    """The endpoint answered with GraphQL errors."""
+
+    def __init__(self, errors: List[Dict]):
+        self.errors = errors
+        super().__init__("; ".join(error.get('message', str(error)) for error in errors))
+
+
+@lru_cache(maxsize=256)
+def parse_document(query: str) -> DocumentNode:
+    """Parse a query, once per distinct query text."""
+    return parse(query)
+
+
+def _replace(node: Node, **changes) -> Node:
+    """A copy of an AST node with some fields changed (AST nodes are immutable in graphql-core 3.3)."""
+    return type(node)(**{**{key: getattr(node, key, None) for key in node.keys}, **changes})
+
+
+class _PrefixNames(Visitor):
+    """Prefixes every variable and fragment name of a document, so it can be merged with others."""
+
+    def __init__(self, prefix: str):
+        super().__init__()
+        self.prefix = prefix
+
+    def _prefixed(self, node: Node) -> Node:
+        return _replace(node, name=NameNode(value=self.prefix + node.name.value))
+
+    def leave_variable(self, node: VariableNode, *_):
+        return self._prefixed(node)
+
+    def leave_fragment_spread(self, node: FragmentSpreadNode, *_):
+        return self._prefixed(node)
+
+    def leave_fragment_definition(self, node: FragmentDefinitionNode, *_):
+        return self._prefixed(node)
+
+
+@lru_cache(maxsize=128)
+def merge_documents(requests: Tuple[Tuple[str, str], ...]) -> Tuple[str, Tuple[Tuple[str, str, str], ...]]:
+    """
+    Merge several queries into one, so they're sent in a single round trip.
+
+    Each root field of request `key` is aliased `key__<response name>`, and each of its variables
+    and fragments is renamed `key_<name>`, so requests can't collide even when they query the same
+    field or define fragments with the same name.
+
+    Args:
+        requests (Tuple[Tuple[str, str], ...]): (key, query) pairs
+
+    Returns:
+        Tuple: The merged query text, and (key, response name, alias) of every root field
+    """
+    variable_definitions = []
+    selections = []
+    fragments = []
+    fields = []
+
+    for key, query in requests:
+        if not _NAME.match(key):
+            raise ValueError(f"Batch key {key!r} is not a valid GraphQL name")
+        document = visit(parse_document(query), _PrefixNames(f"{key}_"))
+        operations = [d for d in document.definitions if isinstance(d, OperationDefinitionNode)]
+        if len(operations) != 1 or operations[0].operation != OperationType.QUERY:
+            raise ValueError(f"Batch request {key!r} must contain exactly one query operation")
+        operation = operations[0]
+
+        variable_definitions.extend(operation.variable_definitions or ())
+        for selection in operation.selection_set.selections:
+            if not isinstance(selection, FieldNode):
+                raise ValueError(f"Batch request {key!r} may only select fields at the root")
+            response_name = selection.alias.value if selection.alias else selection.name.value
+            alias = f"{key}__{response_name}"
+            selections.append(_replace(selection, alias=NameNode(value=alias)))
+            fields.append((key, response_name, alias))
+        fragments.extend(d for d in document.definitions if isinstance(d, FragmentDefinitionNode))
+
+    operation = OperationDefinitionNode(
+        operation=OperationType.QUERY,
+        name=NameNode(value="Batch"),
+        variable_definitions=tuple(variable_definitions),
+        directives=(),
+        selection_set=SelectionSetNode(selections=tuple(selections))
+    )
+    merged = DocumentNode(definitions=(operation, *fragments))
+    return print_ast(merged), tuple(fields)
+
+
+class GraphQLClient:
+    """
+    Async GraphQL client for one endpoint with a persistent, pooled aiohttp session.
+
+    Unlike gql's Client with fetch_schema_from_transport=True, creating one costs no round trip: the
+    schema is only needed to validate queries locally, and it's loaded from a file cache (introspected
+    once per endpoint, on first validation). Parsed and validated queries are cached by their text,
+    and execute_batch() merges several queries into a single request.
+    """
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+                 pool_size: Optional[int] = None, retries: int = DEFAULT_RETRIES, validate_queries: bool = False,
+                 schema_cache_dir: str = SCHEMA_CACHE_DIR):
+        """
+        Initialize the client.
+
+        Args:
+            url (str): GraphQL endpoint
+            headers (Optional[Dict[str, str]]): Extra request headers
+            timeout (Optional[float]): Request timeout in seconds. If None, uses GRAPHQL_TIMEOUT or the default
+            pool_size (Optional[int]): Max open connections. If None, uses GRAPHQL_POOL_SIZE or the default
+            retries (int): Retries on connection errors and 5xx responses
+            validate_queries (bool): Validate queries against the (cached) schema before sending them
+            schema_cache_dir (str): Directory of the schema cache
+        """
+        self.url = url
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        self.timeout = timeout or float(os.getenv('GRAPHQL_TIMEOUT', DEFAULT_TIMEOUT))
+        self.pool_size = pool_size or int(os.getenv('GRAPHQL_POOL_SIZE', DEFAULT_POOL_SIZE))
+        self.retries = retries
+        self.validate_queries = validate_queries
+        # The URL may embed an API key, so the cache file is named by its hash
+        self.schema_path = os.path.join(schema_cache_dir, f"{hashlib.sha256(url.encode()).hexdigest()[:16]}.graphql")
+
+        self._schema: Optional[GraphQLSchema] = None
+        self._validated: set = set()
+        # One session per event loop, since a session can't be used from a loop other than its own
+        self._sessions = weakref.WeakKeyDictionary()
+        self._sessions_lock = threading.Lock()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """The pooled session of the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        with self._sessions_lock:
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+                session = aiohttp.ClientSession(
+                    connector=connector, headers=self.headers, timeout=aiohttp.ClientTimeout(total=self.timeout)
+                )
+                self._sessions[loop] = session
+            return session
+
+    async def close(self):
+        """Close the session of the running event loop."""
+        with self._sessions_lock:
+            session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def _post(self, query: str, variables: Optional[Dict] = None) -> Dict:
+        """Send one request and return its data, raising GraphQLQueryError on GraphQL errors."""
+        payload = {'query': query, 'variables': variables or {}}
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._get_session().post(self.url, data=json.dumps(payload)) as response:
+                    if response.status >= 500 and attempt < self.retries:
+                        print(f"GraphQL endpoint returned {response.status}, retrying")
+                    else:
+                        response.raise_for_status()
+                        result = await response.json(content_type=None)
+                        if result.get('errors'):
+                            raise GraphQLQueryError(result['errors'])
+                        return result.get('data') or {}
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise
+                print(f"Error querying {self.url}: {type(e).__name__} {str(e)}, retrying")
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def get_schema(self) -> GraphQLSchema:
+        """The endpoint's schema, from the file cache or else introspected once and cached."""
+        if self._schema is None:
+            if os.path.exists(self.schema_path):
+                with open(self.schema_path, 'r') as f:
+                    self._schema = build_schema(f.read())
+            else:
+                print(f"Fetching GraphQL schema of {self.url.split('/api/')[0]}...")
+                self._schema = build_client_schema(await self._post(get_introspection_query()))
+                os.makedirs(os.path.dirname(self.schema_path), exist_ok=True)
+                tmp_path = self.schema_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    f.write(print_schema(self._schema))
+                os.replace(tmp_path, self.schema_path)
+        return self._schema
+
+    async def _check(self, query: str):
+        """Parse (and optionally validate) a query, once per distinct query text."""
+        document = parse_document(query)
+        if self.validate_queries and query not in self._validated:
+            errors = validate(await self.get_schema(), document)
+            if errors:
+                raise GraphQLQueryError([{'message': error.message} for error in errors])
+            self._validated.add(query)
+
+    async def execute(self, query: str, variables: Optional[Dict] = None) -> Dict:
+        """
+        Run a query.
+
+        Args:
+            query (str): GraphQL query
+            variables (Optional[Dict]): Query variables
+
+        Returns:
+            Dict: The response data
+        """
+        await self._check(query)
+        return await self._post(query, variables)
+
+    async def execute_batch(self, requests: Dict[str, BatchRequest]) -> Dict[str, Dict]:
+        """
+        Run several queries in a single round trip by merging them into one aliased query.
+
+        Args:
+            requests (Dict[str, BatchRequest]): Queries (optionally with variables) by key. Keys must be GraphQL names
+
+        Returns:
+            Dict[str, Dict]: The response data of each query, by key, as if it had been run alone
+        """
+        queries = {}
+        variables = {}
+        for key, request in requests.items():
+            query, query_variables = (request, None) if isinstance(request, str) else request
+            queries[key] = query
+            for name, value in (query_variables or {}).items():
+                variables[f"{key}_{name}"] = value
+
+        merged, fields = merge_documents(tuple(queries.items()))
+        await self._check(merged)
+        data = await self._post(merged, variables)
+
+        results = {key: {} for key in requests}
+        for key, response_name, alias in fields:
+            results[key][response_name] = data.get(alias)
+        return results
+
+    def execute_sync(self, query: str, variables: Optional[Dict] = None) -> Dict:
+        """Run a query from synchronous code."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._execute_and_close(query, variables))
+
+        # Called from inside an event loop: run the query on its own loop in a worker thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self._execute_and_close(query, variables)).result()
+
+    async def _execute_and_close(self, query: str, variables: Optional[Dict]) -> Dict:
+        # The session of a temporary loop can't outlive it
+        try:
+            return await self.execute(query, variables)
+        finally:
+            await self.close()
+
+
+_clients: Dict[str, GraphQLClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_graphql_client(url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> GraphQLClient:
+    """
+    Get the process-wide client for an endpoint, so every tracker querying it shares one
+    connection pool, schema and query cache.
+
+    Args:
+        url (str): GraphQL endpoint
+        headers (Optional[Dict[str, str]]): Extra request headers (used when the client is created)
+        **kwargs: Other GraphQLClient options (used when the client is created)
+
+    Returns:
+        GraphQLClient: The shared client
+    """
+    with _clients_lock:
+        if url not in _clients:
+            _clients[url] = GraphQLClient(url, headers=headers, **kwargs)
+        return _clients[url]
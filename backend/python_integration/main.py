@@ -1,10 +1,12 @@
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
 from price_tracker import PriceTracker
 import os
+import sys
 from dotenv import load_dotenv
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.python_integration.graphql_client import get_graphql_client
+
 class SubgraphInteractor:
     def __init__(self):
         # Load environment variables
@@ -13,26 +15,14 @@ class SubgraphInteractor:
         # Get Graph URL from environment variable
         graph_url = os.getenv('GRAPH_URL', 'https://api.studio.thegraph.com/query/103469/sepolia/v0.0.4')
 
-        # Set up transport with proper headers
-        transport = RequestsHTTPTransport(
-            url=graph_url,
-            headers={
-                'Content-Type': 'application/json',
-            },
-            verify=True,
-            retries=3,
-        )
-
-        self.client = Client(
-            transport=transport,
-            fetch_schema_from_transport=True
-        )
+        # Shared client: no schema round trip, and retries on connection errors and 5xxs
+        self.client = get_graphql_client(graph_url)
 
     def test_connection(self):
         """Test the connection to the subgraph"""
         try:
             # Simple query to test connection
-            query = gql("""
+            query = """
             {
                 _meta {
                     block {
@@ -42,8 +32,8 @@ class SubgraphInteractor:
                     hasIndexingErrors
                 }
             }
-            """)
-            result = self.client.execute(query)
+            """
+            result = self.client.execute_sync(query)
             print("Connection test result:", result)
             return True
         except Exception as e:
@@ -52,7 +42,7 @@ class SubgraphInteractor:
 
     def fetch_smart_contracts(self):
         """Fetch smart contracts"""
-        query = gql("""
+        query = """
         {
             smartContracts(first: 5, orderBy: timestamp, orderDirection: asc) {
                 id
@@ -62,10 +52,10 @@ class SubgraphInteractor:
                 transactionHash
             }
         }
-        """)
+        """
 
         try:
-            result = self.client.execute(query)
+            result = self.client.execute_sync(query)
             print("Raw response:", result)  # Debug print
             return result.get('smartContracts', [])
         except Exception as e:
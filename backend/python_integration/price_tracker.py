@@ -1,10 +1,122 @@
-from gql import gql, Client
-from gql.transport.aiohttp import AIOHTTPTransport
 import asyncio
 import os
+import sys
 from dotenv import load_dotenv
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.python_integration.graphql_client import get_graphql_client
+
+MARKET_OVERVIEW_QUERY = """
+{
+    factories(first: 5) {
+        id
+        poolCount
+        txCount
+        totalVolumeUSD
+    }
+    bundles(first: 1) {
+        id
+        ethPriceUSD
+    }
+}
+"""
+
+TOKENS_QUERY = """
+{
+    tokens(
+        first: 5,
+        orderBy: totalValueLockedUSD,
+        orderDirection: desc,
+        subgraphError: deny
+    ) {
+        id
+        symbol
+        name
+        decimals
+        volume
+        volumeUSD
+        totalValueLockedUSD
+        txCount
+        poolCount
+    }
+}
+"""
+
+POOLS_QUERY = """
+{
+    pools(
+        first: 5,
+        orderBy: totalValueLockedUSD,
+        orderDirection: desc,
+        subgraphError: deny
+    ) {
+        id
+        token0 {
+            id
+            symbol
+            name
+        }
+        token1 {
+            id
+            symbol
+            name
+        }
+        feeTier
+        liquidity
+        sqrtPrice
+        token0Price
+        token1Price
+        volumeUSD
+        totalValueLockedUSD
+    }
+}
+"""
+
+# WETH address
+ETH_SWAP_FILTER = {"token0": "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"}
+
+ETH_SWAPS_QUERY = """
+query RecentSwaps($first: Int!, $where: Swap_filter!) {
+    swaps(
+        first: $first,
+        orderBy: timestamp,
+        orderDirection: desc,
+        where: $where
+        subgraphError: deny
+    ) {
+        timestamp
+        amount0
+        amount1
+        amountUSD
+        token0 {
+            symbol
+        }
+        token1 {
+            symbol
+        }
+        pool {
+            token0Price
+            token1Price
+        }
+    }
+}
+"""
+
+
+def format_eth_swaps(swaps):
+    """Convert raw swap entities to ETH trades."""
+    formatted_swaps = []
+    for swap in swaps:
+        formatted_swaps.append({
+            'timestamp': datetime.fromtimestamp(int(swap['timestamp'])),
+            'eth_amount': abs(float(swap['amount0'])),  # Convert to positive number
+            'usd_value': float(swap['amountUSD']),
+            'pair': f"{swap['token0']['symbol']}/{swap['token1']['symbol']}",
+            'price': float(swap['pool']['token1Price']) if float(swap['amount0']) > 0 else float(swap['pool']['token0Price'])
+        })
+    return formatted_swaps
+
 class PriceTracker:
     def __init__(self):
         load_dotenv()
@@ -12,34 +124,16 @@ class PriceTracker:
         if not api_key:
             raise ValueError("GRAPH_API_KEY not found in environment variables")
 
-        self.transport = AIOHTTPTransport(
-            url=f'https://gateway.thegraph.com/api/{api_key}/subgraphs/id/HUZDsRpEVP2AvzDCyzDHtdc64dyDxx8FQjzsmqSg4H3B',
-            headers={'Content-Type': 'application/json'}
-        )
-        self.client = Client(
-            transport=self.transport,
-            fetch_schema_from_transport=True
+        self.swap_filter = ETH_SWAP_FILTER
+        # Shared with every other tracker of this subgraph: no schema round trip, one connection pool
+        self.client = get_graphql_client(
+            f'https://gateway.thegraph.com/api/{api_key}/subgraphs/id/HUZDsRpEVP2AvzDCyzDHtdc64dyDxx8FQjzsmqSg4H3B'
         )
 
     async def get_market_overview(self):
         """Get overview of market data including ETH price and factory stats"""
-        query = gql("""
-        {
-            factories(first: 5) {
-                id
-                poolCount
-                txCount
-                totalVolumeUSD
-            }
-            bundles(first: 1) {
-                id
-                ethPriceUSD
-            }
-        }
-        """)
-
         try:
-            result = await self.client.execute_async(query)
+            result = await self.client.execute(MARKET_OVERVIEW_QUERY)
             return result
         except Exception as e:
             print(f"Error fetching market overview: {e}")
@@ -47,29 +141,8 @@ class PriceTracker:
 
     async def get_token_data(self, token_address):
         """Get detailed data for a specific token"""
-        query = gql("""
-        {
-            tokens(
-                first: 5,
-                orderBy: totalValueLockedUSD,
-                orderDirection: desc,
-                subgraphError: deny
-            ) {
-                id
-                symbol
-                name
-                decimals
-                volume
-                volumeUSD
-                totalValueLockedUSD
-                txCount
-                poolCount
-            }
-        }
-        """)
-        
         try:
-            result = await self.client.execute_async(query)
+            result = await self.client.execute(TOKENS_QUERY)
             return result
         except Exception as e:
             print(f"Error fetching token data: {e}")
@@ -77,98 +150,55 @@ class PriceTracker:
 
     async def get_pool_data(self, first=5):
         """Get data for top pools"""
-        query = gql("""
-        {
-            pools(
-                first: 5,
-                orderBy: totalValueLockedUSD,
-                orderDirection: desc,
-                subgraphError: deny
-            ) {
-                id
-                token0 {
-                    id
-                    symbol
-                    name
-                }
-                token1 {
-                    id
-                    symbol
-                    name
-                }
-                feeTier
-                liquidity
-                sqrtPrice
-                token0Price
-                token1Price
-                volumeUSD
-                totalValueLockedUSD
-            }
-        }
-        """)
-        
         try:
-            result = await self.client.execute_async(query)
+            result = await self.client.execute(POOLS_QUERY)
             return result
         except Exception as e:
             print(f"Error fetching pool data: {e}")
             return None
 
     async def get_recent_eth_swaps(self, limit=50):
-        """Get recent ETH swaps/transactions"""
-        query = gql("""
-        {
-            swaps(
-                first: 50,
-                orderBy: timestamp,
-                orderDirection: desc,
-                where: {
-                    token0: "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"  # WETH address
-                }
-                subgraphError: deny
-            ) {
-                timestamp
-                amount0
-                amount1
-                amountUSD
-                token0 {
-                    symbol
-                }
-                token1 {
-                    symbol
-                }
-                pool {
-                    token0Price
-                    token1Price
-                }
-            }
-        }
-        """)
-
+        """Get recent ETH swaps/transactions (at most 1000; use SwapSyncer for longer history)"""
         try:
-            result = await self.client.execute_async(query)
+            result = await self.client.execute(ETH_SWAPS_QUERY, {'first': min(limit, 1000), 'where': self.swap_filter})
             if result and 'swaps' in result:
-                formatted_swaps = []
-                for swap in result['swaps']:
-                    formatted_swaps.append({
-                        'timestamp': datetime.fromtimestamp(int(swap['timestamp'])),
-                        'eth_amount': abs(float(swap['amount0'])),  # Convert to positive number
-                        'usd_value': float(swap['amountUSD']),
-                        'pair': f"{swap['token0']['symbol']}/{swap['token1']['symbol']}",
-                        'price': float(swap['pool']['token1Price']) if float(swap['amount0']) > 0 else float(swap['pool']['token0Price'])
-                    })
-                return formatted_swaps
+                return format_eth_swaps(result['swaps'])
             return []
         except Exception as e:
             print(f"Error fetching ETH swaps: {e}")
             return []
 
+    async def get_market_snapshot(self):
+        """
+        Get the market overview, top tokens, top pools and recent ETH swaps in a single round trip
+
+        Returns:
+            Dict with 'overview', 'tokens', 'pools' (raw query results) and 'swaps' (formatted), or None on error
+        """
+        try:
+            results = await self.client.execute_batch({
+                'overview': MARKET_OVERVIEW_QUERY,
+                'tokens': TOKENS_QUERY,
+                'pools': POOLS_QUERY,
+                'swaps': (ETH_SWAPS_QUERY, {'first': 50, 'where': self.swap_filter})
+            })
+            return {
+                'overview': results['overview'],
+                'tokens': results['tokens'],
+                'pools': results['pools'],
+                'swaps': format_eth_swaps(results['swaps'].get('swaps') or [])
+            }
+        except Exception as e:
+            print(f"Error fetching market snapshot: {e}")
+            return None
+
 async def main():
     tracker = PriceTracker()
     
-    # Get market overview
-    print("\nFetching market overview...")
-    overview = await tracker.get_market_overview()
+    # Get market overview, top pools and recent ETH swaps in one request
+    print("\nFetching market snapshot...")
+    snapshot = await tracker.get_market_snapshot() or {}
+    overview = snapshot.get('overview')
     if overview:
         print("\nMarket Overview:")
         if 'bundles' in overview and overview['bundles']:
@@ -181,9 +211,8 @@ async def main():
             print(f"Total Transactions: {factory['txCount']}")
             print(f"Total Volume: ${float(factory['totalVolumeUSD']):,.2f}")
 
-    # Get top pools
-    print("\nFetching top pools...")
-    pools = await tracker.get_pool_data(5)
+    # Top pools
+    pools = snapshot.get('pools')
     if pools and 'pools' in pools:
         print("\nTop Pools:")
         for pool in pools['pools']:
@@ -191,9 +220,8 @@ async def main():
             print(f"TVL: ${float(pool['totalValueLockedUSD']):,.2f}")
             print(f"Volume: ${float(pool['volumeUSD']):,.2f}")
 
-    # Get recent ETH transactions
-    print("\nFetching recent ETH swaps...")
-    swaps = await tracker.get_recent_eth_swaps()
+    # Recent ETH transactions
+    swaps = snapshot.get('swaps')
     
     if swaps:
         print("\nRecent ETH Transactions:")
@@ -208,5 +236,7 @@ async def main():
     else:
         print("No recent ETH swaps found")
 
+    await tracker.client.close()
+
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
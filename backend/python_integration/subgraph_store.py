@@ -0,0 +1,265 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.python_integration.graphql_client import GraphQLClient, get_graphql_client
+
+DEFAULT_GRAPH_URL = 'https://api.studio.thegraph.com/query/103469/sepolia/v0.0.4'
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.subgraph_store', 'sepolia.db')
+
+# The Graph returns at most 1000 entities per query
+PAGE_SIZE = 1000
+
+# Entities of the MainContract subgraph (see backend/schema.graphql):
+# table -> (GraphQL collection, {field: SQLite type}, indexed columns)
+# BigInts that can exceed 64 bits (wei amounts) are stored as TEXT
+ENTITIES = {
+    'smart_contracts': ('smartContracts', {
+        'id': 'TEXT', 'address': 'TEXT', 'creator': 'TEXT', 'timestamp': 'INTEGER', 'transactionHash': 'TEXT',
+    }, ['address', 'creator', 'timestamp']),
+    'transactions': ('transactions', {
+        'id': 'TEXT', 'hash': 'TEXT', 'value': 'TEXT', 'timestamp': 'INTEGER', 'ethPrice': 'REAL',
+        'from': 'TEXT', 'to': 'TEXT', 'blockNumber': 'INTEGER', 'gasPrice': 'TEXT', 'gasUsed': 'INTEGER',
+    }, ['timestamp', 'from', 'to', 'blockNumber']),
+    'price_data': ('priceDatas', {
+        'id': 'TEXT', 'price': 'REAL', 'timestamp': 'INTEGER', 'blockNumber': 'INTEGER',
+    }, ['timestamp']),
+    'admin_changes': ('adminChangeds', {
+        'id': 'TEXT', 'previousAdmin': 'TEXT', 'newAdmin': 'TEXT', 'blockNumber': 'INTEGER',
+        'blockTimestamp': 'INTEGER', 'transactionHash': 'TEXT',
+    }, ['blockTimestamp', 'newAdmin']),
+    'upgrades': ('upgradeds', {
+        'id': 'TEXT', 'implementation': 'TEXT', 'blockNumber': 'INTEGER', 'blockTimestamp': 'INTEGER',
+        'transactionHash': 'TEXT',
+    }, ['blockTimestamp', 'implementation']),
+}
+
+META_QUERY = """
+{
+    _meta {
+        block {
+            number
+        }
+    }
+}
+"""
+
+
+def _page_query(collection: str, fields: List[str]) -> str:
+    """
+    Query for one page of the entities changed since a block, at a fixed block (so every page
+    of a sync sees the same snapshot), ordered by id for an id_gt cursor.
+    """
+    filter_type = collection[0].upper() + collection[1:-1] + '_filter'
+    return f"""
+query Page($first: Int!, $block: Int!, $where: {filter_type}!) {{
+    {collection}(first: $first, orderBy: id, orderDirection: asc, where: $where, block: {{number: $block}}) {{
+        {' '.join(fields)}
+    }}
+}}
+"""
+
+
+class SubgraphStore:
+    """
+    Local SQLite mirror of the MainContract subgraph's entities, indexed by time and address, so
+    contract and transaction history is answered locally instead of by the subgraph.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Open (and if needed create) the store.
+
+        Args:
+            db_path (Optional[str]): SQLite file. If None, uses SUBGRAPH_DB_PATH or the default
+        """
+        self.db_path = db_path or os.getenv('SUBGRAPH_DB_PATH', DEFAULT_DB_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        # One connection shared by the syncer and readers; WAL lets reads proceed during a sync
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._create_tables()
+
+    def _create_tables(self):
+        with self._lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value INTEGER)")
+            for table, (_, fields, indexed) in ENTITIES.items():
+                columns = ', '.join(f'"{field}" {kind}' + (' PRIMARY KEY' if field == 'id' else '')
+                                    for field, kind in fields.items())
+                self.connection.execute(f'CREATE TABLE IF NOT EXISTS {table} ({columns})')
+                for column in indexed:
+                    self.connection.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ("{column}")')
+
+    @property
+    def synced_block(self) -> Optional[int]:
+        """Block the store was last synced to, or None if it has never been synced."""
+        with self._lock:
+            row = self.connection.execute("SELECT value FROM sync_state WHERE key = 'block'").fetchone()
+        return row['value'] if row else None
+
+    def upsert(self, table: str, entities: List[Dict]):
+        """Insert or replace entities (with their GraphQL field names) in a table."""
+        if not entities:
+            return
+        fields = list(ENTITIES[table][1])
+        columns = ', '.join(f'"{field}"' for field in fields)
+        placeholders = ', '.join('?' for _ in fields)
+        with self._lock, self.connection:
+            self.connection.executemany(
+                f'INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})',
+                [tuple(entity.get(field) for field in fields) for entity in entities]
+            )
+
+    def set_synced_block(self, block: int):
+        with self._lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('block', ?)", (block,))
+
+    def query(self, table: str, where: Optional[Dict] = None, order_by: str = 'timestamp',
+              descending: bool = True, limit: int = 100, offset: int = 0, since: Optional[int] = None,
+              until: Optional[int] = None) -> List[Dict]:
+        """
+        Read entities from the store.
+
+        Args:
+            table (str): Table name (a key of ENTITIES)
+            where (Optional[Dict]): Column -> value equality filters
+            order_by (str): Column to order by
+            descending (bool): Newest first
+            limit (int): Max rows
+            offset (int): Rows to skip
+            since (Optional[int]): Only rows with order_by >= since
+            until (Optional[int]): Only rows with order_by < until
+
+        Returns:
+            List[Dict]: Matching entities, with their GraphQL field names
+        """
+        fields = ENTITIES[table][1]
+        for column in [order_by, *(where or {})]:
+            if column not in fields:
+                raise ValueError(f"Unknown column {column} of {table}")
+
+        conditions, params = [], []
+        for column, value in (where or {}).items():
+            conditions.append(f'"{column}" = ?')
+            params.append(value.lower() if isinstance(value, str) and value.startswith('0x') else value)
+        if since is not None:
+            conditions.append(f'"{order_by}" >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append(f'"{order_by}" < ?')
+            params.append(until)
+
+        sql = f'SELECT * FROM {table}'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += f' ORDER BY "{order_by}" {"DESC" if descending else "ASC"} LIMIT ? OFFSET ?'
+        with self._lock:
+            rows = self.connection.execute(sql, (*params, limit, offset)).fetchall()
+        return [dict(row) for row in rows]
+
+
+class SubgraphSyncer:
+    """
+    Keeps a SubgraphStore in sync with the subgraph incrementally: each sync fetches only the
+    entities changed since the last synced block (via _change_block), at the block reported by
+    _meta, paging every entity type in the same batched request.
+    """
+
+    def __init__(self, store: SubgraphStore, client: Optional[GraphQLClient] = None):
+        """
+        Initialize the syncer.
+
+        Args:
+            store (SubgraphStore): Store to keep in sync
+            client (Optional[GraphQLClient]): Subgraph client. If None, uses the shared client for GRAPH_URL
+        """
+        self.store = store
+        self.client = client or get_graphql_client(os.getenv('GRAPH_URL', DEFAULT_GRAPH_URL))
+        self.queries = {table: _page_query(collection, list(fields))
+                        for table, (collection, fields, _) in ENTITIES.items()}
+        # Outcome of the latest syncs, so callers can tell a failing sync from an empty subgraph
+        self.last_synced_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[str] = None
+
+    async def sync(self) -> Dict[str, int]:
+        """
+        Fetch every entity changed since the last sync.
+
+        Returns:
+            Dict[str, int]: Number of entities fetched per table
+        """
+        head = (await self.client.execute(META_QUERY))['_meta']['block']['number']
+        last_block = self.store.synced_block
+        if last_block is not None and head <= last_block:
+            return {table: 0 for table in ENTITIES}
+
+        since = {'_change_block': {'number_gte': last_block + 1}} if last_block is not None else {}
+        cursors = {table: "" for table in ENTITIES}
+        counts = {table: 0 for table in ENTITIES}
+
+        # One request per round pages every entity type that still has more
+        while cursors:
+            results = await self.client.execute_batch({
+                table: (self.queries[table], {
+                    'first': PAGE_SIZE, 'block': head, 'where': {**since, 'id_gt': cursor}
+                })
+                for table, cursor in cursors.items()
+            })
+            for table, result in results.items():
+                page = result.get(ENTITIES[table][0]) or []
+                await asyncio.to_thread(self.store.upsert, table, page)
+                counts[table] += len(page)
+                if len(page) < PAGE_SIZE:
+                    del cursors[table]
+                else:
+                    cursors[table] = page[-1]['id']
+
+        # Only once everything up to head is stored, so an interrupted sync starts over from the last block
+        self.store.set_synced_block(head)
+        return counts
+
+    async def run(self, interval: float):
+        """Sync forever, every `interval` seconds."""
+        while True:
+            try:
+                counts = await self.sync()
+                self.last_synced_at = datetime.now(timezone.utc).isoformat()
+                self.last_error = None
+                if any(counts.values()):
+                    print(f"Synced subgraph entities: {counts}")
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {str(e)}"
+                self.last_error_at = datetime.now(timezone.utc).isoformat()
+                print(f"Error syncing subgraph: {self.last_error}")
+            await asyncio.sleep(interval)
+
+    def status(self) -> Dict[str, Optional[str]]:
+        """When the store was last synced, and the error of the latest sync if it failed."""
+        return {
+            "last_synced_at": self.last_synced_at,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at
+        }
+
+
+async def main():
+    store = SubgraphStore()
+    syncer = SubgraphSyncer(store)
+    print(f"Syncing subgraph into {store.db_path}...")
+    print(await syncer.sync())
+    print(f"Synced to block {store.synced_block}")
+    for contract in store.query('smart_contracts', limit=5):
+        print(contract)
+    await syncer.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,318 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.python_integration.graphql_client import GraphQLClient
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.swap_store')
+
+# The Graph returns at most 1000 entities per query
+PAGE_SIZE = 1000
+
+# History is split into windows of this many seconds, synced concurrently and recorded as they finish
+DEFAULT_WINDOW_SECONDS = 6 * 3600
+DEFAULT_MAX_WINDOWS = 4
+
+# Recent swaps may not be indexed yet, so incremental syncs stop this many seconds before now
+INDEXING_LAG = 120
+
+# Chunks are merged into one file once there are this many
+MAX_CHUNKS = 64
+
+# Pages are ordered by id (unique, so an id_gt cursor never skips or repeats a swap) within a time window
+SWAP_PAGE_QUERY = """
+query SwapPage($first: Int!, $where: Swap_filter!) {
+    swaps(first: $first, orderBy: id, orderDirection: asc, where: $where, subgraphError: deny) {
+        id
+        timestamp
+        amount0
+        amount1
+        amountUSD
+        pool {
+            token0Price
+            token1Price
+        }
+    }
+}
+"""
+
+# Column name -> dtype of the store
+COLUMNS = {
+    'id': str,
+    'timestamp': np.int64,
+    'amount0': np.float64,
+    'amount1': np.float64,
+    'amount_usd': np.float64,
+    'token0_price': np.float64,
+    'token1_price': np.float64,
+}
+
+
+def swaps_to_columns(swaps: List[Dict]) -> Dict[str, np.ndarray]:
+    """Convert raw swap entities to typed columns."""
+    return {
+        'id': np.array([swap['id'] for swap in swaps], dtype=str),
+        'timestamp': np.array([int(swap['timestamp']) for swap in swaps], dtype=np.int64),
+        'amount0': np.array([float(swap['amount0']) for swap in swaps]),
+        'amount1': np.array([float(swap['amount1']) for swap in swaps]),
+        'amount_usd': np.array([float(swap['amountUSD']) for swap in swaps]),
+        'token0_price': np.array([float(swap['pool']['token0Price']) for swap in swaps]),
+        'token1_price': np.array([float(swap['pool']['token1Price']) for swap in swaps]),
+    }
+
+
+def _merge_ranges(ranges: List[List[int]]) -> List[List[int]]:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+# Chunk files are numbered in the order they're written: chunk_000042.npz
+CHUNK_PATTERN = re.compile(r'chunk_(\d+)\.npz')
+
+
+def _chunk_index(path: str) -> int:
+    """Number of a chunk file."""
+    return int(CHUNK_PATTERN.fullmatch(os.path.basename(path)).group(1))
+
+
+class SwapStore:
+    """
+    Local columnar store of swaps: one .npz file of typed column arrays per synced window, plus a
+    state file recording which time ranges have been fully synced, so a sync resumes where it left off.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize the store, loading its state if it exists.
+
+        Args:
+            directory (str): Directory of the store (one per tracked pair)
+        """
+        self.directory = directory
+        self.state_path = os.path.join(directory, 'state.json')
+        os.makedirs(directory, exist_ok=True)
+
+        self.ranges: List[List[int]] = []
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as f:
+                self.ranges = json.load(f).get('ranges', [])
+        # After a compaction the chunk numbers have gaps, so count on from the highest one rather than
+        # from the number of chunks, which would eventually overwrite the compacted chunk
+        self._next_chunk = max((_chunk_index(path) for path in self._chunk_paths()), default=-1) + 1
+
+    def _chunk_paths(self) -> List[str]:
+        # Leaves out the temporary files of chunks being written (chunk_000042.npz.tmp.npz)
+        paths = glob.glob(os.path.join(self.directory, 'chunk_*.npz'))
+        return sorted((path for path in paths if CHUNK_PATTERN.fullmatch(os.path.basename(path))), key=_chunk_index)
+
+    def _save_state(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'ranges': self.ranges}, f)
+        os.replace(tmp_path, self.state_path)
+
+    @property
+    def first_synced(self) -> Optional[int]:
+        """Start of the earliest synced range (a Unix timestamp), or None if nothing is synced."""
+        return self.ranges[0][0] if self.ranges else None
+
+    @property
+    def last_synced(self) -> Optional[int]:
+        """End of the latest synced range (a Unix timestamp), or None if nothing is synced."""
+        return self.ranges[-1][1] if self.ranges else None
+
+    def missing(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """The parts of [start, end) that haven't been synced."""
+        gaps = []
+        cursor = start
+        for synced_start, synced_end in self.ranges:
+            if synced_end <= cursor:
+                continue
+            if synced_start >= end:
+                break
+            if synced_start > cursor:
+                gaps.append((cursor, synced_start))
+            cursor = max(cursor, synced_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def append(self, columns: Dict[str, np.ndarray]):
+        """Write swaps as a new chunk (atomically, so a crash never leaves a partial chunk)."""
+        if not len(columns['id']):
+            return
+        path = os.path.join(self.directory, f'chunk_{self._next_chunk:06d}.npz')
+        self._next_chunk += 1
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **columns)
+        os.replace(tmp_path, path)
+
+    def mark_synced(self, start: int, end: int):
+        """Record that every swap in [start, end) is stored."""
+        self.ranges = _merge_ranges(self.ranges + [[start, end]])
+        self._save_state()
+
+    def load(self) -> Dict[str, np.ndarray]:
+        """Every stored swap as typed columns, deduplicated by id and sorted by time."""
+        chunks = []
+        for path in self._chunk_paths():
+            with np.load(path) as chunk:
+                chunks.append({name: chunk[name] for name in COLUMNS})
+        if not chunks:
+            return {name: np.array([], dtype=dtype) for name, dtype in COLUMNS.items()}
+
+        columns = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in COLUMNS}
+        # A window that was re-synced after a crash may have been written twice
+        _, first = np.unique(columns['id'], return_index=True)
+        order = first[np.argsort(columns['timestamp'][first], kind='stable')]
+        return {name: values[order] for name, values in columns.items()}
+
+    def compact(self):
+        """Merge all chunks into one, if there are many."""
+        paths = self._chunk_paths()
+        if len(paths) <= MAX_CHUNKS:
+            return
+        columns = self.load()
+        self.append(columns)
+        for path in paths:
+            os.remove(path)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Every stored swap as a DataFrame indexed by time."""
+        df = pd.DataFrame(self.load())
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
+        return df.set_index('timestamp')
+
+
+class SwapSyncer:
+    """
+    Backfills and incrementally syncs the swaps of a pair from a subgraph into a SwapStore.
+
+    History is split into time windows that are synced concurrently. Each window is paged with
+    GraphQL variables and an id cursor, then stored and recorded as synced, so an interrupted sync
+    resumes from the windows that didn't finish.
+    """
+
+    def __init__(self, client: GraphQLClient, swap_filter: Dict, store: SwapStore,
+                 window_seconds: int = DEFAULT_WINDOW_SECONDS, max_windows: int = DEFAULT_MAX_WINDOWS):
+        """
+        Initialize the syncer.
+
+        Args:
+            client (GraphQLClient): Client of the subgraph
+            swap_filter (Dict): Swap_filter selecting the pair's swaps (e.g. {"token0": ..., "token1": ...})
+            store (SwapStore): Where swaps are stored
+            window_seconds (int): Length of each synced window
+            max_windows (int): Windows synced at the same time
+        """
+        self.client = client
+        self.swap_filter = swap_filter
+        self.store = store
+        self.window_seconds = window_seconds
+        self.max_windows = max_windows
+
+    async def _sync_window(self, start: int, end: int, semaphore: asyncio.Semaphore) -> int:
+        """Fetch every swap in [start, end), store it and record the window. Returns the number of swaps."""
+        async with semaphore:
+            swaps = []
+            last_id = ""
+            while True:
+                where = {**self.swap_filter, 'timestamp_gte': str(start), 'timestamp_lt': str(end), 'id_gt': last_id}
+                result = await self.client.execute(SWAP_PAGE_QUERY, {'first': PAGE_SIZE, 'where': where})
+                page = result.get('swaps') or []
+                swaps.extend(page)
+                if len(page) < PAGE_SIZE:
+                    break
+                last_id = page[-1]['id']
+
+            # Swaps first, then the range, so a crash in between only means re-syncing the window
+            self.store.append(swaps_to_columns(swaps))
+            self.store.mark_synced(start, end)
+            return len(swaps)
+
+    async def backfill(self, start: int, end: Optional[int] = None) -> int:
+        """
+        Sync every swap in [start, end) that isn't stored yet.
+
+        Args:
+            start (int): Unix timestamp to sync from
+            end (Optional[int]): Unix timestamp to sync to. If None, syncs up to shortly before now
+
+        Returns:
+            int: Number of swaps fetched
+        """
+        end = end or int(time.time()) - INDEXING_LAG
+        windows = [
+            (window_start, min(window_start + self.window_seconds, gap_end))
+            for gap_start, gap_end in self.store.missing(start, end)
+            for window_start in range(gap_start, gap_end, self.window_seconds)
+        ]
+        if not windows:
+            return 0
+
+        print(f"Syncing swaps in {len(windows)} windows...")
+        semaphore = asyncio.Semaphore(self.max_windows)
+        counts = await asyncio.gather(*(self._sync_window(s, e, semaphore) for s, e in windows))
+        self.store.compact()
+        return sum(counts)
+
+    async def sync(self, lookback_seconds: int = 24 * 3600) -> int:
+        """
+        Sync the swaps since the last sync (or over the lookback period, on the first sync), and
+        any window of the synced history that didn't finish (windows finish out of order).
+
+        Args:
+            lookback_seconds (int): History to backfill when the store is empty
+
+        Returns:
+            int: Number of swaps fetched
+        """
+        # From the start of the synced history, so backfill() also refills the gaps before last_synced
+        start = self.store.first_synced or int(time.time()) - lookback_seconds
+        return await self.backfill(start)
+
+
+def _make_syncer(pair: str, store_dir: str) -> SwapSyncer:
+    if pair == 'eth':
+        from backend.python_integration.price_tracker import PriceTracker
+        tracker = PriceTracker()
+    else:
+        from backend.python_integration.eth_price_tracker import SOLUSDTTracker
+        tracker = SOLUSDTTracker()
+    return SwapSyncer(tracker.client, tracker.swap_filter, SwapStore(os.path.join(store_dir, pair)))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Backfill and sync swap history into the local swap store")
+    parser.add_argument("pair", choices=["eth", "sol"], help="Tracked pair")
+    parser.add_argument("--days", type=float, default=1, help="History to backfill")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR, help="Directory of the swap stores")
+    args = parser.parse_args()
+
+    syncer = _make_syncer(args.pair, args.store_dir)
+    start_time = time.time()
+    count = await syncer.backfill(int(time.time() - args.days * 86400))
+    print(f"Fetched {count} swaps in {time.time() - start_time:.1f} seconds")
+
+    df = syncer.store.to_frame()
+    print(f"Store has {len(df)} swaps from {df.index.min()} to {df.index.max()}")
+    await syncer.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
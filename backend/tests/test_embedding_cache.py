@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.agents.nft_recommendation import embedding_cache
+from backend.agents.nft_recommendation.embedding_cache import EmbeddingCache
+
+
+def test_batches_are_logged_and_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, 'MIN_LOG_ENTRIES_TO_COMPACT', 4)
+    cache = EmbeddingCache(str(tmp_path), dim=4)
+    for i in range(10):
+        cache.put_embeddings([f"cid{i}"], np.full((1, 4), i, dtype=np.float32))
+
+    # Compacted at 4 and 8 entries, so only the last two batches are still in the log
+    with open(cache.log_path) as f:
+        assert f.read().split() == ['"cid8"', '"cid9"']
+
+    reopened = EmbeddingCache(str(tmp_path), dim=4)
+    assert reopened.rows == cache.rows
+    assert reopened.get_embeddings(["cid9"])["cid9"].tolist() == [9.0] * 4
+
+
+def test_partial_log_line_is_dropped(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), dim=4)
+    cache.put_embeddings(["cid0"], np.zeros((1, 4), dtype=np.float32))
+    with open(cache.log_path, 'a') as f:
+        f.write('"cid1')
+
+    reopened = EmbeddingCache(str(tmp_path), dim=4)
+    reopened.put_embeddings(["cid2"], np.ones((1, 4), dtype=np.float32))
+
+    assert EmbeddingCache(str(tmp_path), dim=4).rows == {"cid0": 0, "cid2": 1}
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.agents.nft_recommendation.embedding_index import NFTSimilarityIndex, build_index
+
+
+class Snapshot:
+    """An embedding cache frozen at some rows, like the snapshot a search takes."""
+
+    def __init__(self, cids, embeddings):
+        self.cids, self.embeddings = cids, embeddings
+
+    def get_embeddings(self, cids):
+        return {cid: self.embeddings[self.cids.index(cid)] for cid in cids if cid in self.cids}
+
+    def all_embeddings(self):
+        return self.cids[:], self.embeddings
+
+
+def test_search_resolves_positions_through_the_index_cids():
+    cids = [f"cid{i}" for i in range(5)]
+    embeddings = np.eye(5, dtype=np.float32) + 0.1
+
+    # This search's snapshot of the cache has 3 rows, but another search has since indexed all 5
+    index = NFTSimilarityIndex(Snapshot(cids[:3], embeddings[:3]))
+    index.index, index.cids = build_index(embeddings), cids
+
+    results = index.search("cid0", k=4)
+    assert sorted(cid for cid, _ in results) == ["cid1", "cid2", "cid3", "cid4"]
+
+
+def test_search_merges_rows_added_after_the_build():
+    cids = [f"cid{i}" for i in range(12)]
+    embeddings = np.eye(12, dtype=np.float32)
+    embeddings[11] = embeddings[0]
+
+    # 11 rows indexed and 1 added since: too few to rebuild, so the new row is searched exactly
+    index = NFTSimilarityIndex(Snapshot(cids, embeddings))
+    built = build_index(embeddings[:11])
+    index.index, index.cids = built, cids[:11]
+
+    assert index.search("cid0", k=1)[0][0] == "cid11"
+    assert index.index is built
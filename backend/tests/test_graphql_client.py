@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+from graphql import build_schema, parse, validate
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.python_integration.graphql_client import merge_documents
+from backend.python_integration.price_tracker import ETH_SWAPS_QUERY, MARKET_OVERVIEW_QUERY
+
+# Just enough of the Uniswap subgraph's schema to validate the tracker queries
+SCHEMA = build_schema("""
+    enum OrderDirection { asc desc }
+    enum Swap_orderBy { id timestamp }
+    enum _SubgraphErrorPolicy_ { allow deny }
+    input Swap_filter { token0: String, token1: String, id_gt: String }
+    type Factory { id: ID!, poolCount: String, txCount: String, totalVolumeUSD: String, name: String }
+    type Bundle { id: ID!, ethPriceUSD: String }
+    type Token { symbol: String }
+    type Pool { token0Price: String, token1Price: String }
+    type Swap {
+        id: ID!, timestamp: String, amount0: String, amount1: String, amountUSD: String,
+        token0: Token, token1: Token, pool: Pool
+    }
+    type Query {
+        factories(first: Int): [Factory!]!
+        bundles(first: Int): [Bundle!]!
+        swaps(first: Int, orderBy: Swap_orderBy, orderDirection: OrderDirection, where: Swap_filter,
+              subgraphError: _SubgraphErrorPolicy_): [Swap!]!
+    }
+""")
+
+
+def test_merge_market_overview_and_swaps():
+    merged, fields = merge_documents((("overview", MARKET_OVERVIEW_QUERY), ("swaps", ETH_SWAPS_QUERY)))
+
+    assert fields == (
+        ("overview", "factories", "overview__factories"),
+        ("overview", "bundles", "overview__bundles"),
+        ("swaps", "swaps", "swaps__swaps"),
+    )
+    assert "$swaps_first: Int!" in merged and "$swaps_where: Swap_filter!" in merged
+    assert "first: $swaps_first" in merged and "where: $swaps_where" in merged
+    assert validate(SCHEMA, parse(merged)) == []
+
+
+def test_merge_leaves_cached_documents_untouched():
+    merge_documents((("a", ETH_SWAPS_QUERY),))
+    merged, _ = merge_documents((("b", ETH_SWAPS_QUERY),))
+    assert "$b_first" in merged and "$a_" not in merged
+
+
+def test_merge_prefixes_fragments():
+    first = "query { factories(first: 1) { ...F } } fragment F on Factory { id }"
+    second = "query { factories(first: 2) { ...F } } fragment F on Factory { name }"
+    merged, _ = merge_documents((("one", first), ("two", second)))
+
+    assert "...one_F" in merged and "fragment one_F on Factory" in merged
+    assert "...two_F" in merged and "fragment two_F on Factory" in merged
+    assert validate(SCHEMA, parse(merged)) == []
+
+
+def test_merge_rejects_mutations():
+    with pytest.raises(ValueError):
+        merge_documents((("m", "mutation { doSomething }"),))
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("googlesearch")
+pytest.importorskip("bs4")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.agents.nft_recommendation.market_nft_trends import NFTMarketAnalyzer, score_signals
+
+
+def test_signals_without_lexicon_words_are_neutral():
+    bullish, bearish = score_signals(['nothing to see', 'plain text'])
+    assert bullish.tolist() == [0.0, 0.0] and bearish.tolist() == [0.0, 0.0]
+
+    sentiment = NFTMarketAnalyzer().analyze_sentiment(['nothing to see', 'plain text'])
+    assert sentiment["nft_sentiment"] == 0
+    assert sentiment["signal_scores"] == [0, 0]
+
+
+def test_mixed_signals():
+    signals = ['NFT sales surge to new highs', 'plain text', 'Floor prices crash', 'Bulls and bears']
+    sentiment = NFTMarketAnalyzer().analyze_sentiment(signals)
+
+    assert sentiment["signal_scores"] == [100, 0, -100, 0]
+    assert sentiment["nft_sentiment"] == 0
+    assert sentiment["market_trends"] == "Analyzed 4 market signals: 1 positive, 1 negative"
@@ -0,0 +1,47 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.python_integration.graphql_client import GraphQLClient
+from backend.python_integration.subgraph_store import SubgraphStore, SubgraphSyncer
+
+
+class SubgraphAt(GraphQLClient):
+    """A subgraph at block 100 with a single contract, answering from memory instead of over HTTP."""
+
+    def __init__(self, fail: bool = False):
+        super().__init__("http://subgraph.invalid")
+        self.fail = fail
+
+    async def _post(self, query, variables=None):
+        if self.fail:
+            raise ConnectionError("subgraph unreachable")
+        if '_meta' in query:
+            return {'_meta': {'block': {'number': 100}}}
+        contract = {'id': '0x1', 'address': '0xAbC', 'creator': '0xdef', 'timestamp': 5, 'transactionHash': '0x2'}
+        return {'smart_contracts__smartContracts': [contract]}
+
+
+def test_sync_stores_batched_pages(tmp_path):
+    store = SubgraphStore(str(tmp_path / "subgraph.db"))
+    counts = asyncio.run(SubgraphSyncer(store, SubgraphAt()).sync())
+
+    assert counts['smart_contracts'] == 1 and counts['transactions'] == 0
+    assert store.synced_block == 100
+    assert store.query('smart_contracts')[0]['address'] == '0xAbC'
+
+
+def test_run_records_sync_errors(tmp_path):
+    syncer = SubgraphSyncer(SubgraphStore(str(tmp_path / "subgraph.db")), SubgraphAt(fail=True))
+
+    async def run_once():
+        task = asyncio.create_task(syncer.run(60))
+        await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(run_once())
+    status = syncer.status()
+    assert status['last_synced_at'] is None
+    assert status['last_error'] == "ConnectionError: subgraph unreachable"
+    assert status['last_error_at'] is not None
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from backend.python_integration import swap_sync
+from backend.python_integration.graphql_client import GraphQLClient
+from backend.python_integration.swap_sync import INDEXING_LAG, SwapStore, SwapSyncer
+
+
+def swaps(ids, timestamps):
+    return {
+        'id': np.array(ids, dtype=str),
+        'timestamp': np.array(timestamps, dtype=np.int64),
+        **{name: np.zeros(len(ids)) for name in ('amount0', 'amount1', 'amount_usd', 'token0_price', 'token1_price')}
+    }
+
+
+def test_chunks_written_after_compaction_keep_the_history(tmp_path, monkeypatch):
+    monkeypatch.setattr(swap_sync, 'MAX_CHUNKS', 2)
+    store = SwapStore(str(tmp_path))
+    for i in range(3):
+        store.append(swaps([f"s{i}"], [i]))
+    store.compact()
+
+    # A restarted process appends as many chunks as there were before the compaction
+    store = SwapStore(str(tmp_path))
+    for i in range(3, 7):
+        store.append(swaps([f"s{i}"], [i]))
+
+    assert list(store.load()['id']) == [f"s{i}" for i in range(7)]
+
+
+class OneSwapPerWindow(GraphQLClient):
+    """A subgraph with one swap at the start of every requested window, recording the windows."""
+
+    def __init__(self):
+        super().__init__("http://subgraph.invalid")
+        self.windows = []
+
+    async def execute(self, query, variables=None):
+        start, end = int(variables['where']['timestamp_gte']), int(variables['where']['timestamp_lt'])
+        self.windows.append((start, end))
+        swap = {'id': f"swap{start}", 'timestamp': str(start), 'amount0': "1", 'amount1': "1", 'amountUSD': "1",
+                'pool': {'token0Price': "1", 'token1Price': "1"}}
+        return {'swaps': [swap]}
+
+
+def test_sync_refills_windows_that_did_not_finish(tmp_path):
+    end = int(time.time()) - INDEXING_LAG
+    store = SwapStore(str(tmp_path))
+    # The window [end - 2000, end - 1000) failed while the ones around it finished
+    store.mark_synced(end - 3000, end - 2000)
+    store.mark_synced(end - 1000, end - 10)
+
+    client = OneSwapPerWindow()
+    asyncio.run(SwapSyncer(client, {}, store, window_seconds=5000).sync())
+
+    assert (end - 2000, end - 1000) in client.windows
+    assert store.missing(end - 3000, end - 10) == []
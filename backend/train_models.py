@@ -0,0 +1,291 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import MinMaxScaler
+from xgboost import XGBRegressor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.model_registry import (CONGESTION_FEATURES, FAILED_TX_FEATURES, FEE_FEATURES, MODEL_DIR, SERVED_MODELS,
+                                    export_model)
+
+BACKEND_DIR = Path(__file__).resolve().parent
+METRICS_CSV_PATH = BACKEND_DIR / "metrics_cache" / "combined_df.csv"
+SIDE_BY_SIDE_CSV_PATH = BACKEND_DIR / "model_development" / "side_by_side_metrics.csv"
+LSTM_MODEL_PATH = MODEL_DIR / "prediction_model.h5"
+
+# Time steps of the LSTM congestion model's input sequences
+SEQ_LENGTH = 10
+
+# The network metrics behind the fee model's inputs (total_fees_sol is left out, as it might be too
+# predictive); fee_features() derives the rest of FEE_FEATURES from them
+FEE_BASE_FEATURES = ["tps", "failed_tx_count", "tx_count", "total_volume_usd"]
+
+
+def _print_regression_metrics(title: str, y_test, y_pred, digits: int = 2) -> dict:
+    mse = mean_squared_error(y_test, y_pred)
+    metrics = {
+        "mse": float(mse),
+        "rmse": float(np.sqrt(mse)),
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "r2": float(r2_score(y_test, y_pred))
+    }
+    print(f"\n{title}:")
+    print(f"Mean Squared Error: {metrics['mse']:.{digits}f}")
+    print(f"Root Mean Squared Error: {metrics['rmse']:.{digits}f}")
+    print(f"Mean Absolute Error: {metrics['mae']:.{digits}f}")
+    print(f"R² Score: {metrics['r2']:.4f}")
+    return metrics
+
+
+def train_congestion_model(csv_path: Path = METRICS_CSV_PATH) -> dict:
+    """
+    Train the XGBoost congestion model (failed transactions from network metrics) used by predict_congestion.
+
+    Args:
+        csv_path (Path): Combined network metrics
+
+    Returns:
+        dict: Test set metrics
+    """
+    target = "failed_tx_count"
+    df = pd.read_csv(csv_path)[CONGESTION_FEATURES + [target]].dropna()
+    X = df[CONGESTION_FEATURES]
+    y = df[target]
+
+    scaler = MinMaxScaler()
+    X_scaled = scaler.fit_transform(X)
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, shuffle=False)
+
+    model = XGBRegressor(
+        n_estimators=100,
+        learning_rate=0.1,
+        max_depth=6,
+        min_child_weight=1,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=42
+    )
+    model.fit(X_train, y_train, eval_set=[(X_test, y_test)], verbose=True)
+    metrics = _print_regression_metrics("Model Performance Metrics", y_test, model.predict(X_test))
+
+    export_model(model, scaler, CONGESTION_FEATURES, SERVED_MODELS["congestion"]["path"])
+    return metrics
+
+
+def train_failed_tx_model(csv_path: Path = SIDE_BY_SIDE_CSV_PATH) -> dict:
+    """
+    Train the XGBoost failed transaction model (from NFT trading and transaction metrics) used by predict_failed_tx.
+
+    Args:
+        csv_path (Path): Side-by-side trading and transaction metrics
+
+    Returns:
+        dict: Test set metrics
+    """
+    target = "failed_tx_count"
+    df = pd.read_csv(csv_path)[FAILED_TX_FEATURES + [target]].dropna()
+    X = df[FAILED_TX_FEATURES]
+    y = df[target]
+
+    scaler = MinMaxScaler()
+    X_scaled = scaler.fit_transform(X)
+    # A larger test size, since the dataset is small
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.3, shuffle=False)
+
+    model = XGBRegressor(
+        n_estimators=50,  # Fewer trees and shallower than the congestion model, to not overfit the small dataset
+        learning_rate=0.1,
+        max_depth=4,
+        min_child_weight=1,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=42
+    )
+    model.fit(X_train, y_train, eval_set=[(X_test, y_test)], verbose=True)
+    metrics = _print_regression_metrics("Model Performance Metrics", y_test, model.predict(X_test))
+
+    export_model(model, scaler, FAILED_TX_FEATURES, SERVED_MODELS["failed-tx"]["path"])
+    return metrics
+
+
+def fee_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the derived features of the fee model to a frame of network metrics."""
+    df = df.copy()
+    df['congestion_ratio'] = df['failed_tx_count'] / df['tps'].where(df['tps'] > 0, 1)
+    df['tx_per_second'] = df['tx_count'] / 3600  # Assuming data is hourly
+    return df
+
+
+def train_fee_model(csv_path: Path = METRICS_CSV_PATH, plots: bool = True) -> dict:
+    """
+    Train the XGBoost transaction fee model used by predict_transaction_fee and the fee surface.
+
+    Args:
+        csv_path (Path): Combined network metrics
+        plots (bool): Save feature importance and actual vs predicted plots next to the model
+
+    Returns:
+        dict: Test set metrics
+    """
+    df = pd.read_csv(csv_path)
+
+    # Analyze the target variable
+    target = "avg_fee_sol"
+    print("\nTarget variable statistics:")
+    print(df[target].describe())
+    print("\nUnique values in target variable:", len(df[target].unique()))
+
+    features = list(FEE_FEATURES)
+    df = fee_features(df[FEE_BASE_FEATURES + [target]].dropna())
+
+    print("\nCorrelation with avg_fee_sol:")
+    print(df.corr()[target].sort_values(ascending=False))
+
+    X = df[features]
+    y = df[target]
+    scaler = MinMaxScaler()
+    X_scaled = scaler.fit_transform(X)
+    # Chronological split, since this is time series data
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, shuffle=False)
+
+    # A linear baseline
+    linear_model = LinearRegression()
+    linear_model.fit(X_train, y_train)
+    _print_regression_metrics("Linear model performance", y_test, linear_model.predict(X_test), digits=8)
+
+    model = XGBRegressor(
+        n_estimators=300,
+        learning_rate=0.1,
+        max_depth=9,
+        min_child_weight=1,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=42
+    )
+    model.fit(X_train, y_train, eval_set=[(X_test, y_test)], verbose=True)
+    y_pred = model.predict(X_test)
+    metrics = _print_regression_metrics("Transaction Fee Prediction Model Performance", y_test, y_pred, digits=8)
+
+    if plots:
+        _save_fee_plots(model, features, y_test, y_pred)
+
+    export_model(model, scaler, features, SERVED_MODELS["fee"]["path"])
+    return metrics
+
+
+def _save_fee_plots(model, features, y_test, y_pred):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 6))
+    sorted_idx = np.argsort(model.feature_importances_)
+    plt.barh(range(len(sorted_idx)), model.feature_importances_[sorted_idx])
+    plt.yticks(range(len(sorted_idx)), np.array(features)[sorted_idx])
+    plt.title('Feature Importance for Transaction Fee Prediction')
+    plt.tight_layout()
+    plt.savefig(MODEL_DIR / 'feature_importance.png')
+    print(f"Feature importance plot saved to {MODEL_DIR / 'feature_importance.png'}")
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(np.asarray(y_test), label='Actual')
+    plt.plot(y_pred, label='Predicted')
+    plt.title('Actual vs Predicted Transaction Fees')
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(MODEL_DIR / 'actual_vs_predicted.png')
+    print(f"Actual vs Predicted plot saved to {MODEL_DIR / 'actual_vs_predicted.png'}")
+    plt.close('all')
+
+
+def create_sequences(data: np.ndarray, target_index: int, seq_length: int = SEQ_LENGTH):
+    """Sliding windows of `seq_length` rows, each labelled with the target of the row after it."""
+    X, y = [], []
+    for i in range(len(data) - seq_length):
+        X.append(data[i : i + seq_length])
+        y.append(data[i + seq_length, target_index])
+    return np.array(X), np.array(y)
+
+
+def train_congestion_lstm(csv_path: Path = METRICS_CSV_PATH, epochs: int = 50) -> dict:
+    """
+    Train the experimental LSTM congestion model on sequences of network metrics.
+
+    Args:
+        csv_path (Path): Combined network metrics
+        epochs (int): Training epochs
+
+    Returns:
+        dict: Test set metrics, in failed transactions
+    """
+    # TensorFlow is only needed (and only imported) here
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+    from tensorflow.keras.models import Sequential
+
+    features = ["tps", "avg_fee_sol", "total_fees_sol", "failed_tx_count", "tx_count"]
+    target = "failed_tx_count"
+    df = pd.read_csv(csv_path)[features].dropna()
+
+    scaler = MinMaxScaler()
+    df_scaled = scaler.fit_transform(df)
+    target_index = features.index(target)
+    X, y = create_sequences(df_scaled, target_index)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+    print("X_train shape:", X_train.shape)
+    print("X_test shape:", X_test.shape)
+
+    model = Sequential([
+        LSTM(64, return_sequences=True, input_shape=(SEQ_LENGTH, X.shape[2])),
+        Dropout(0.2),
+        LSTM(32, return_sequences=False),
+        Dropout(0.2),
+        Dense(16, activation="relu"),
+        Dense(1, activation="linear")  # Regression output
+    ])
+    model.compile(optimizer="adam", loss="mse", metrics=["mae"])
+    model.summary()
+    model.fit(X_train, y_train, epochs=epochs, batch_size=16, validation_data=(X_test, y_test))
+
+    # Back to the original scale: only the target column of the scaler applies
+    def unscale(values):
+        return values * (scaler.data_max_[target_index] - scaler.data_min_[target_index]) + scaler.data_min_[target_index]
+
+    metrics = _print_regression_metrics("LSTM Model Performance", unscale(y_test),
+                                        unscale(model.predict(X_test).flatten()))
+
+    # Saved in Keras' own format, apart from the XGBoost congestion model served by the API
+    model.save(LSTM_MODEL_PATH)
+    print(f"Model saved at: {LSTM_MODEL_PATH}")
+    return metrics
+
+
+TRAINERS = {
+    "congestion": train_congestion_model,
+    "failed-tx": train_failed_tx_model,
+    "fee": train_fee_model,
+    "congestion-lstm": train_congestion_lstm,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the network congestion and fee models")
+    parser.add_argument("models", nargs="+", choices=[*TRAINERS, "all"], help="Models to train")
+    parser.add_argument("--csv", type=Path, help="Training data (defaults to each model's usual dataset)")
+    args = parser.parse_args()
+
+    names = [name for name in TRAINERS if name != "congestion-lstm"] if "all" in args.models else args.models
+    kwargs = {"csv_path": args.csv} if args.csv else {}
+    for name in names:
+        print(f"\nTraining {name} model...")
+        TRAINERS[name](**kwargs)
+
+
+if __name__ == "__main__":
+    main()
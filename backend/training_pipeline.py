@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import sklearn
+import xgboost
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import ParameterSampler, TimeSeriesSplit
+from sklearn.preprocessing import MinMaxScaler
+from xgboost import XGBRegressor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.model_registry import (CONGESTION_FEATURES, FAILED_TX_FEATURES, FEE_FEATURES, MODEL_DIR, SERVED_MODELS,
+                                    export_model)
+from backend.train_models import FEE_BASE_FEATURES, METRICS_CSV_PATH, SIDE_BY_SIDE_CSV_PATH, fee_features
+
+# Every run is kept in versions/<model>/<version>/, and the best is also exported where the API serves it
+VERSIONS_DIR = MODEL_DIR / "versions"
+
+# Models trained by the pipeline (named like SERVED_MODELS): training data, inputs and target.
+# `raw_features` are read from the CSV and `prepare` derives the model inputs from them
+MODEL_SPECS = {
+    "congestion": {
+        "csv_path": METRICS_CSV_PATH,
+        "raw_features": CONGESTION_FEATURES,
+        "features": CONGESTION_FEATURES,
+        "target": "failed_tx_count",
+        "prepare": None,
+    },
+    "failed-tx": {
+        "csv_path": SIDE_BY_SIDE_CSV_PATH,
+        "raw_features": FAILED_TX_FEATURES,
+        "features": FAILED_TX_FEATURES,
+        "target": "failed_tx_count",
+        "prepare": None,
+    },
+    "fee": {
+        "csv_path": METRICS_CSV_PATH,
+        "raw_features": FEE_BASE_FEATURES,
+        "features": FEE_FEATURES,
+        "target": "avg_fee_sol",
+        "prepare": fee_features,
+    },
+}
+
+# Hyperparameters searched. The number of trees isn't: each fit stops early on its validation fold
+PARAM_GRID = {
+    "max_depth": [3, 4, 6, 9],
+    "learning_rate": [0.03, 0.1, 0.3],
+    "min_child_weight": [1, 3, 5],
+    "subsample": [0.7, 0.8, 1.0],
+    "colsample_bytree": [0.7, 0.8, 1.0],
+}
+MAX_ESTIMATORS = 1000
+EARLY_STOPPING_ROUNDS = 30
+
+DEFAULT_CANDIDATES = 30
+DEFAULT_SPLITS = 5
+DEFAULT_BUDGET = 15 * 60
+RANDOM_STATE = 42
+
+
+def load_dataset(spec: Dict, csv_path: Optional[Path] = None):
+    """
+    Load a model's training data, in the CSV's (chronological) row order.
+
+    Args:
+        spec (Dict): Entry of MODEL_SPECS
+        csv_path (Optional[Path]): Training data. If None, uses the spec's
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, str]: Features, target and the SHA-256 of the CSV
+    """
+    csv_path = csv_path or spec["csv_path"]
+    with open(csv_path, 'rb') as f:
+        data_hash = hashlib.sha256(f.read()).hexdigest()
+    df = pd.read_csv(csv_path)[spec["raw_features"] + [spec["target"]]].dropna()
+    if spec["prepare"] is not None:
+        df = spec["prepare"](df)
+    return df[spec["features"]].to_numpy(dtype=np.float64), df[spec["target"]].to_numpy(dtype=np.float64), data_hash
+
+
+def _regression_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+    return {
+        "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        "r2": float(r2_score(y_true, y_pred)) if len(y_true) > 1 else 0.0,
+    }
+
+
+def _fit_fold(params: Dict, X_train: np.ndarray, y_train: np.ndarray, X_val: np.ndarray, y_val: np.ndarray,
+              n_jobs: int) -> Dict:
+    """Fit one candidate on one fold, stopping early on the fold's validation set (runs in a worker process)."""
+    # The scaler only sees the training part of the fold, as it would in production
+    scaler = MinMaxScaler().fit(X_train)
+    model = XGBRegressor(
+        n_estimators=MAX_ESTIMATORS,
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        eval_metric="rmse",
+        n_jobs=n_jobs,
+        random_state=RANDOM_STATE,
+        **params
+    )
+    model.fit(scaler.transform(X_train), y_train, eval_set=[(scaler.transform(X_val), y_val)], verbose=False)
+    # predict() uses the best iteration found by early stopping
+    metrics = _regression_metrics(y_val, model.predict(scaler.transform(X_val)))
+    return {**metrics, "best_iteration": int(model.best_iteration)}
+
+
+def search(X: np.ndarray, y: np.ndarray, n_candidates: int = DEFAULT_CANDIDATES, n_splits: int = DEFAULT_SPLITS,
+           workers: Optional[int] = None, budget: float = DEFAULT_BUDGET) -> List[Dict]:
+    """
+    Random search over PARAM_GRID, scoring each candidate by time-series cross-validation.
+
+    Every (candidate, fold) fit runs in a process pool, each with an equal share of the CPU cores
+    as XGBoost threads. Fits are submitted best-effort within the time budget: once it runs out,
+    pending fits are cancelled and only candidates with every fold scored are ranked.
+
+    Args:
+        X (np.ndarray): Features, oldest row first
+        y (np.ndarray): Target
+        n_candidates (int): Hyperparameter sets sampled from PARAM_GRID (with a fixed seed)
+        n_splits (int): Time-series folds
+        workers (Optional[int]): Worker processes. If None, one per fold, up to the number of cores
+        budget (float): Seconds the search may take
+
+    Returns:
+        List[Dict]: Scored candidates (params, mean/std of the fold metrics, folds), best first
+    """
+    if len(X) <= n_splits + 1:
+        raise ValueError(f"Need more than {n_splits + 1} rows for {n_splits} time-series folds, got {len(X)}")
+
+    deadline = time.monotonic() + budget
+    cores = os.cpu_count() or 1
+    workers = workers or min(n_splits, cores)
+    n_jobs = max(1, cores // workers)
+    candidates = list(ParameterSampler(PARAM_GRID, n_iter=n_candidates, random_state=RANDOM_STATE))
+    folds = list(TimeSeriesSplit(n_splits=n_splits).split(X))
+    print(f"Searching {len(candidates)} candidates x {len(folds)} folds on {workers} workers "
+          f"({n_jobs} threads each), within {budget:.0f} seconds...")
+
+    results = [[None] * len(folds) for _ in candidates]
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            pool.submit(_fit_fold, params, X[train], y[train], X[val], y[val], n_jobs): (c, f)
+            for c, params in enumerate(candidates)
+            for f, (train, val) in enumerate(folds)
+        }
+        try:
+            for future in as_completed(futures, timeout=max(deadline - time.monotonic(), 0)):
+                c, f = futures[future]
+                try:
+                    results[c][f] = future.result()
+                except Exception as e:
+                    print(f"Error fitting candidate {c} on fold {f}: {str(e)}")
+        except TimeoutError:
+            print("Time budget exhausted, cancelling the remaining fits")
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    scored = []
+    for params, fold_results in zip(candidates, results):
+        if any(result is None for result in fold_results):
+            continue
+        summary = {"params": params, "folds": fold_results}
+        for metric in ("rmse", "mae", "r2"):
+            values = np.array([result[metric] for result in fold_results])
+            summary[f"{metric}_mean"] = float(values.mean())
+            summary[f"{metric}_std"] = float(values.std())
+        scored.append(summary)
+    if not scored:
+        raise RuntimeError("No candidate was cross-validated within the time budget")
+    return sorted(scored, key=lambda summary: summary["rmse_mean"])
+
+
+def fit_final(X: np.ndarray, y: np.ndarray, best: Dict):
+    """
+    Refit the best candidate on all the data, with as many trees as early stopping chose across folds.
+
+    Returns:
+        Tuple[XGBRegressor, MinMaxScaler, int]: The model, its scaler and its number of trees
+    """
+    n_estimators = int(np.median([result["best_iteration"] for result in best["folds"]])) + 1
+    scaler = MinMaxScaler().fit(X)
+    model = XGBRegressor(n_estimators=n_estimators, n_jobs=os.cpu_count() or 1, random_state=RANDOM_STATE,
+                         **best["params"])
+    model.fit(scaler.transform(X), y, verbose=False)
+    return model, scaler, n_estimators
+
+
+def run_pipeline(name: str, csv_path: Optional[Path] = None, n_candidates: int = DEFAULT_CANDIDATES,
+                 n_splits: int = DEFAULT_SPLITS, workers: Optional[int] = None, budget: float = DEFAULT_BUDGET,
+                 promote: bool = True) -> Dict:
+    """
+    Search, refit and save a versioned model with its metrics report.
+
+    Args:
+        name (str): Model (a key of MODEL_SPECS)
+        csv_path (Optional[Path]): Training data. If None, uses the model's usual dataset
+        n_candidates (int): Hyperparameter sets to try
+        n_splits (int): Time-series folds
+        workers (Optional[int]): Worker processes of the search
+        budget (float): Seconds the search may take
+        promote (bool): Also export the model where the API serves it
+
+    Returns:
+        Dict: The metrics report
+    """
+    spec = MODEL_SPECS[name]
+    start_time = time.monotonic()
+    X, y, data_hash = load_dataset(spec, csv_path)
+
+    ranked = search(X, y, n_candidates, n_splits, workers, budget)
+    best = ranked[0]
+    model, scaler, n_estimators = fit_final(X, y, best)
+
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    version_dir = VERSIONS_DIR / name / version
+    report = {
+        "model": name,
+        "version": version,
+        "data": {"path": str(csv_path or spec["csv_path"]), "sha256": data_hash, "rows": len(X)},
+        "features": spec["features"],
+        "target": spec["target"],
+        "best": {"params": best["params"], "n_estimators": n_estimators,
+                 **{key: value for key, value in best.items() if key.endswith(("_mean", "_std"))}},
+        "candidates": ranked,
+        "candidates_scored": len(ranked),
+        "n_splits": n_splits,
+        "elapsed_seconds": round(time.monotonic() - start_time, 1),
+        "versions": {"xgboost": xgboost.__version__, "scikit-learn": sklearn.__version__},
+    }
+
+    export_model(model, scaler, spec["features"], version_dir / "model")
+    with open(version_dir / "metrics.json", 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Metrics report saved at: {version_dir / 'metrics.json'}")
+
+    if promote:
+        export_model(model, scaler, spec["features"], SERVED_MODELS[name]["path"])
+
+    print(f"\n{name} model {version}: CV RMSE {best['rmse_mean']:.6g} ± {best['rmse_std']:.6g}, "
+          f"MAE {best['mae_mean']:.6g}, R² {best['r2_mean']:.4f} with {best['params']} and {n_estimators} trees")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validate, tune and version the network congestion and fee models")
+    parser.add_argument("models", nargs="+", choices=[*MODEL_SPECS, "all"], help="Models to train")
+    parser.add_argument("--csv", type=Path, help="Training data (defaults to each model's usual dataset)")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES, help="Hyperparameter sets to try")
+    parser.add_argument("--splits", type=int, default=DEFAULT_SPLITS, help="Time-series folds")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per fold, up to the core count)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help="Seconds for the searches, shared equally by the models")
+    parser.add_argument("--no-promote", action="store_true", help="Only save the versioned artifacts")
+    args = parser.parse_args()
+
+    names = list(MODEL_SPECS) if "all" in args.models else args.models
+    deadline = time.monotonic() + args.budget
+    for i, name in enumerate(names):
+        # Each model gets an equal share of what's left of the budget
+        budget = max(deadline - time.monotonic(), 0) / (len(names) - i)
+        print(f"\nTraining {name} model...")
+        try:
+            run_pipeline(name, args.csv, args.candidates, args.splits, args.workers, budget, not args.no_promote)
+        except Exception as e:
+            print(f"Error training {name} model: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()